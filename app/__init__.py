@@ -1,17 +1,36 @@
+import math
 from flask import Flask
 from flask_login import LoginManager
-from app.models import db, User
+from app.models import db
+from app.user_cache import user_cache
+from app.hashing import password_hasher, HashingBusy
+from app.events import broker
+from app.caching import fragment_cache
+from app.throttle import throttle, Throttled
+from app import store, database, metrics, instrumentation, replicas, schema, blueprints, blobs
 from config import config
 
 login_manager = LoginManager()
 
-def create_app(config_name='default'):
+def create_app(config_name='default', **config_overrides):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.config.update(config_overrides)
     
     # Initialize extensions
+    database.init_app(app)
+    replicas.init_app(app)
     db.init_app(app)
     login_manager.init_app(app)
+    store.init_app(app)
+    blobs.init_app(app)
+    user_cache.init_app(app)
+    password_hasher.init_app(app)
+    broker.init_app(app)
+    fragment_cache.init_app(app)
+    throttle.init_app(app)
+    metrics.init_app(app)
+    instrumentation.init_app(app)
     
     # Login manager config
     login_manager.login_view = 'auth.login'
@@ -20,21 +39,26 @@ def create_app(config_name='default'):
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
-    
-    # Register blueprints
-    from app.auth.routes import auth_bp
-    from app.main.routes import main_bp
-    from app.projects.routes import projects_bp
-    from app.invites.routes import invites_bp
-    
-    app.register_blueprint(auth_bp, url_prefix='/auth')
-    app.register_blueprint(main_bp)
-    app.register_blueprint(projects_bp, url_prefix='/projects')
-    app.register_blueprint(invites_bp, url_prefix='/invites')
-    
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+        return user_cache.load(int(user_id))
+    
+    @app.errorhandler(HashingBusy)
+    def hashing_busy(error):
+        return 'Het is even erg druk, probeer het over een paar seconden opnieuw.', 503, {'Retry-After': '2'}
+    
+    @app.errorhandler(Throttled)
+    def too_many_attempts(error):
+        retry_after = max(1, math.ceil(error.retry_after))
+        return (f'Te veel pogingen, probeer het over {retry_after} seconden opnieuw.', 429,
+                {'Retry-After': str(retry_after)})
+    
+    # Register blueprints (met LAZY_LOADING pas bij het eerste request)
+    blueprints.init_app(app)
+    
+    # CLI commando's
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # Databaseschema controleren (of bijwerken), zie SCHEMA_MODE
+    schema.init_app(app)
     
     return app
\ No newline at end of file
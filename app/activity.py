@@ -0,0 +1,98 @@
+"""Gedenormaliseerde activiteit per project.
+
+``Project.update_count``, ``last_activity_at`` en ``last_update_author_id``
+laten dashboards "N updates, laatste activiteit X" tonen en op activiteit
+sorteren via een index, zonder per kaart een COUNT over ``updates``.
+
+* ``record_update`` (``record_updates``) werkt ze bij wanneer er updates bijkomen
+* bij het verwijderen van updates worden ze na de flush opnieuw berekend
+* ``refresh_statement`` berekent ze set-based opnieuw (backfill/verify)
+"""
+from datetime import datetime
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from app.models import Project, Update
+
+
+def record_update(project, update_row):
+    """Verwerk een nieuwe update in de tellers van zijn project"""
+    record_updates(project, [update_row])
+
+
+def record_updates(project, update_rows):
+    """Verwerk meerdere nieuwe updates van één project (in volgorde) in zijn tellers"""
+    for update_row in update_rows:
+        update_row.created_at = update_row.created_at or datetime.utcnow()
+    last = update_rows[-1]
+
+    # Optellen in SQL, zodat gelijktijdige updates elkaar niet overschrijven
+    project.update_count = Project.update_count + len(update_rows)
+    project.last_activity_at = last.created_at
+    project.last_update_author_id = last.author_id
+
+
+def computed_columns():
+    """Correlated subqueries met de werkelijke waarden per project"""
+    count = select(func.count(Update.id)).where(
+        Update.project_id == Project.id
+    ).scalar_subquery()
+
+    last_update = select(func.max(Update.created_at)).where(
+        Update.project_id == Project.id
+    ).scalar_subquery()
+
+    last_author = select(Update.author_id).where(
+        Update.project_id == Project.id
+    ).order_by(Update.created_at.desc(), Update.id.desc()).limit(1).scalar_subquery()
+
+    return {
+        'update_count': count,
+        'last_activity_at': func.coalesce(last_update, Project.created_at),
+        'last_update_author_id': last_author,
+    }
+
+
+def refresh_statement(project_ids=None, id_range=None, changed=False):
+    """UPDATE dat de activiteit van (een deel van) de projecten herberekent
+
+    ``updated_at`` (leeftijd voor het archief) en ``revision`` (ETags,
+    fragment-cache) blijven staan, anders zou elke backfill ze voor alle
+    projecten verzetten. Met ``changed`` zijn er echt updates verdwenen en
+    gaat alleen de revisie omhoog.
+    """
+    statement = update(Project).values(
+        **computed_columns(),
+        updated_at=Project.updated_at,
+        revision=Project.revision + 1 if changed else Project.revision,
+    )
+    if project_ids is not None:
+        statement = statement.where(Project.id.in_(project_ids))
+    if id_range is not None:
+        statement = statement.where(Project.id.between(*id_range))
+    return statement.execution_options(synchronize_session=False)
+
+
+def mismatches_query():
+    """Projecten waarvan de opgeslagen activiteit afwijkt van de werkelijke"""
+    computed = computed_columns()
+    return select(
+        Project.id, Project.update_count, computed['update_count'].label('actual_count')
+    ).where(
+        (Project.update_count != computed['update_count']) |
+        (Project.last_activity_at != computed['last_activity_at']) |
+        (func.coalesce(Project.last_update_author_id, 0) != func.coalesce(computed['last_update_author_id'], 0))
+    ).order_by(Project.id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_after_update_delete(session, flush_context):
+    # Verwijderde updates van projecten die zelf blijven bestaan
+    deleted_projects = {obj.id for obj in session.deleted if isinstance(obj, Project)}
+    project_ids = {obj.project_id for obj in session.deleted
+                   if isinstance(obj, Update) and obj.project_id not in deleted_projects}
+
+    if project_ids:
+        session.execute(refresh_statement(sorted(project_ids), changed=True))
+        for obj in session.identity_map.values():
+            if isinstance(obj, Project) and obj.id in project_ids:
+                session.expire(obj, ['update_count', 'last_activity_at', 'last_update_author_id', 'revision'])
@@ -0,0 +1 @@
+"""JSON API (``/api/v1``) voor integraties; zie ``app.api.routes``."""
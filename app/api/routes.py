@@ -0,0 +1,212 @@
+"""JSON API voor integraties, onder ``/api/v1``.
+
+Zelfde login (sessie-cookie) en toegangsregels als de HTML-views; fouten
+komen terug als ``{"error": ...}`` met de bijbehorende statuscode.
+
+Schrijven kan alleen met een JSON-body. Een formulier op een andere site
+kan zo'n request niet versturen zonder CORS-preflight, dus hier zijn geen
+CSRF-tokens nodig.
+"""
+from datetime import datetime
+from flask import Blueprint, abort, current_app, jsonify, request
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+from app import inbox
+from app.activity import record_updates
+from app.api.serializers import invite_serializer, project_serializer, update_serializer
+from app.events import broker, project_channel
+from app.models import db, Project, Update, ClientInvite
+from app.pagination import keyset_page, request_cursor
+from app.queries import PROJECT_SORTS, accessible_projects, latest_updates
+
+api_bp = Blueprint('api', __name__)
+
+INVITE_STATUSES = ('pending', 'accepted', 'expired')
+
+
+@api_bp.before_request
+def require_login():
+    if not current_user.is_authenticated:
+        return jsonify(error='Niet ingelogd'), 401
+
+
+@api_bp.errorhandler(HTTPException)
+def json_error(error):
+    return jsonify(error=error.description), error.code
+
+
+def _owner_column():
+    return Project.freelancer_id if current_user.is_freelancer() else Project.client_id
+
+
+def _id_list(raw, maximum):
+    try:
+        ids = list(dict.fromkeys(int(value) for value in (raw or '').split(',') if value.strip()))
+    except ValueError:
+        abort(400, description='ids moet een lijst getallen zijn, bijvoorbeeld ?ids=1,2,3')
+    if not ids:
+        abort(400, description='Geef minstens één id op met ?ids=')
+    if len(ids) > maximum:
+        abort(400, description=f'Maximaal {maximum} ids per request')
+    return ids
+
+
+def _count_arg(name, maximum):
+    try:
+        value = int(request.args.get(name, 0))
+    except ValueError:
+        abort(400, description=f'{name} moet een getal zijn')
+    return max(0, min(value, maximum))
+
+
+def _projects_with_updates(project_ids, count):
+    """Projecten (in de gevraagde volgorde) met hun ``count`` nieuwste updates; 2 of 3 queries"""
+    fields = project_serializer.parse()
+    update_fields = update_serializer.parse('update_fields')
+    projects = accessible_projects(current_user, project_ids, project_serializer.options(fields))
+
+    by_project = {}
+    for update in latest_updates([project.id for project in projects], count,
+                                 update_serializer.options(update_fields)):
+        by_project.setdefault(update.project_id, []).append(update_serializer.dump(update, update_fields))
+
+    found = {project.id: project for project in projects}
+    result = []
+    for project_id in project_ids:
+        if project_id in found:
+            data = project_serializer.dump(found[project_id], fields)
+            if count:
+                data['updates'] = by_project.get(project_id, [])
+            result.append(data)
+    return result, [project_id for project_id in project_ids if project_id not in found]
+
+
+@api_bp.route('/projects')
+def projects():
+    """Eigen projecten per pagina: ``?fields=``, ``?sort=created|activity``, ``?cursor=``"""
+    fields = project_serializer.parse()
+    sort = request.args.get('sort', 'created')
+    if sort not in PROJECT_SORTS:
+        abort(400, description=f'sort moet een van {", ".join(PROJECT_SORTS)} zijn')
+
+    sort_column = PROJECT_SORTS[sort]
+    query = Project.query.filter(
+        _owner_column() == current_user.id,
+        Project.deleted_at.is_(None)
+    ).options(*project_serializer.options(fields, extra=(sort_column.key,)))
+    page = keyset_page(query, sort_column, Project.id, request_cursor(), current_app.config['PROJECTS_PER_PAGE'])
+    return jsonify(projects=[project_serializer.dump(project, fields) for project in page],
+                   next_cursor=page.next_cursor)
+
+
+@api_bp.route('/projects/batch')
+def projects_batch():
+    """Meerdere projecten met hun nieuwste updates: ``?ids=1,2,3&updates=5``
+
+    Het aantal queries hangt niet af van het aantal projecten of updates.
+    Ids zonder toegang (of die niet bestaan) staan in ``missing``.
+    """
+    project_ids = _id_list(request.args.get('ids'), current_app.config['API_BATCH_MAX_PROJECTS'])
+    count = _count_arg('updates', current_app.config['API_MAX_LATEST_UPDATES'])
+    result, missing = _projects_with_updates(project_ids, count)
+    return jsonify(projects=result, missing=missing)
+
+
+@api_bp.route('/projects/<int:project_id>')
+def project(project_id):
+    """Eén project, optioneel met ``?updates=N`` nieuwste updates"""
+    result, _ = _projects_with_updates([project_id], _count_arg('updates', current_app.config['API_MAX_LATEST_UPDATES']))
+    if not result:
+        abort(404, description='Project niet gevonden')
+    return jsonify(project=result[0])
+
+
+@api_bp.route('/projects/<int:project_id>/updates')
+def project_updates(project_id):
+    """Updates van een project per pagina, nieuwste eerst: ``?fields=``, ``?cursor=``"""
+    fields = update_serializer.parse()
+    if not accessible_projects(current_user, [project_id], project_serializer.options(('id',))):
+        abort(404, description='Project niet gevonden')
+
+    query = Update.query.filter(Update.project_id == project_id).options(*update_serializer.options(fields))
+    page = keyset_page(query, Update.created_at, Update.id, request_cursor(), current_app.config['UPDATES_PER_PAGE'])
+    return jsonify(updates=[update_serializer.dump(update, fields) for update in page],
+                   next_cursor=page.next_cursor)
+
+
+@api_bp.route('/updates/batch', methods=['POST'])
+def updates_batch():
+    """Plaats updates in meerdere projecten in één transactie
+
+    Body: ``{"updates": [{"project_id": 1, "content": "..."}, ...]}``. Alles
+    of niets: één project zonder toegang en er wordt niets geplaatst.
+    """
+    items = _update_items(request.get_json())
+    fields = update_serializer.parse()
+
+    project_ids = list(dict.fromkeys(item['project_id'] for item in items))
+    projects = {project.id: project for project in accessible_projects(current_user, project_ids)}
+    missing = [project_id for project_id in project_ids if project_id not in projects]
+    if missing:
+        abort(404, description=f'Projecten niet gevonden: {", ".join(map(str, missing))}')
+
+    # Eén tijdstip voor de hele batch; de volgorde binnen een project volgt dan het id
+    now = datetime.utcnow()
+    updates = [Update(content=item['content'], project_id=item['project_id'], author_id=current_user.id,
+                      created_at=now) for item in items]
+    db.session.add_all(updates)
+    by_project = {project_id: [update for update in updates if update.project_id == project_id]
+                  for project_id in project_ids}
+    for project_id, rows in by_project.items():
+        record_updates(projects[project_id], rows)
+    db.session.flush()
+    for project_id, rows in by_project.items():
+        inbox.update_posted(projects[project_id], rows)
+
+    # Serialiseren vóór de commit, anders laadt elke update zichzelf opnieuw
+    result = [update_serializer.dump(update, fields) for update in updates]
+    db.session.commit()
+    for project_id in project_ids:
+        broker.publish(project_channel(project_id))
+    return jsonify(updates=result), 201
+
+
+def _update_items(body):
+    """Gevalideerde ``[{"project_id", "content"}]`` uit de body; 400 bij fouten"""
+    items = body.get('updates') if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        abort(400, description='Verwacht {"updates": [{"project_id": ..., "content": ...}, ...]}')
+    maximum = current_app.config['API_BATCH_MAX_UPDATES']
+    if len(items) > maximum:
+        abort(400, description=f'Maximaal {maximum} updates per batch')
+
+    result = []
+    for index, item in enumerate(items):
+        project_id = item.get('project_id') if isinstance(item, dict) else None
+        content = item.get('content') if isinstance(item, dict) else None
+        if not isinstance(project_id, int) or isinstance(project_id, bool):
+            abort(400, description=f'updates[{index}]: project_id moet een getal zijn')
+        if not isinstance(content, str) or not content.strip():
+            abort(400, description=f'updates[{index}]: content mag niet leeg zijn')
+        result.append({'project_id': project_id, 'content': content.strip()})
+    return result
+
+
+@api_bp.route('/invites')
+def invites():
+    """Uitnodigingen van de freelancer per pagina: ``?status=pending|accepted|expired``, ``?fields=``"""
+    if not current_user.is_freelancer():
+        abort(403, description='Alleen voor freelancers')
+    fields = invite_serializer.parse()
+    status = request.args.get('status', 'pending')
+    if status not in INVITE_STATUSES:
+        abort(400, description=f'status moet een van {", ".join(INVITE_STATUSES)} zijn')
+
+    query = ClientInvite.query.filter(
+        ClientInvite.freelancer_id == current_user.id,
+        ClientInvite.status == status
+    ).options(*invite_serializer.options(fields))
+    page = keyset_page(query, ClientInvite.created_at, ClientInvite.id, request_cursor(),
+                       current_app.config['PROJECTS_PER_PAGE'])
+    return jsonify(invites=[invite_serializer.dump(invite, fields) for invite in page],
+                   next_cursor=page.next_cursor)
@@ -0,0 +1,100 @@
+"""Compacte JSON-serializers met veldselectie.
+
+``?fields=id,project_name`` kiest de velden; zonder ``fields`` krijg je
+de standaardset. Alleen de kolommen van gekozen velden worden geladen
+(``load_only``) en relaties alleen als een veld erom vraagt, zodat een
+integratie die geen ``content`` of ``description`` vraagt die ook niet
+uit de database haalt.
+"""
+from datetime import datetime
+from flask import abort, request
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from app.models import Project, Update, ClientInvite, User
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class Serializer:
+    def __init__(self, model, columns, default, required=(), relations=None):
+        self.model = model
+        self.columns = columns
+        self.default = default
+        # Kolommen die altijd geladen worden (toegang, paginering)
+        self.required = required
+        # veld -> (relatie, vreemde sleutel, geneste serializer, laadstrategie)
+        self.relations = relations or {}
+
+    @property
+    def fields(self):
+        return tuple(self.columns) + tuple(self.relations)
+
+    def parse(self, param='fields'):
+        """Gevraagde velden uit ``?<param>=``; 400 bij een onbekend veld"""
+        raw = request.args.get(param)
+        if not raw:
+            return self.default
+        fields = tuple(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+        unknown = [field for field in fields if field not in self.fields]
+        if unknown:
+            abort(400, description=f'Onbekende velden voor {param}: {", ".join(unknown)}')
+        return fields
+
+    def options(self, fields, extra=()):
+        """Laadopties voor precies deze velden"""
+        names = {field for field in fields if field in self.columns} | set(self.required) | set(extra)
+        for field in fields:
+            if field in self.relations:
+                names.add(self.relations[field][1])
+        options = [load_only(*(getattr(self.model, name) for name in sorted(names)))]
+        for field in fields:
+            if field in self.relations:
+                relation, _, nested, strategy = self.relations[field]
+                options.append(strategy(getattr(self.model, relation)).load_only(
+                    *(getattr(nested.model, name) for name in nested.default)))
+        return options
+
+    def dump(self, obj, fields):
+        data = {}
+        for field in fields:
+            if field in self.relations:
+                relation, _, nested, _ = self.relations[field]
+                related = getattr(obj, relation)
+                data[field] = nested.dump(related, nested.default) if related is not None else None
+            else:
+                data[field] = _value(getattr(obj, field))
+        return data
+
+
+user_serializer = Serializer(User, ('id', 'username'), default=('id', 'username'))
+
+project_serializer = Serializer(
+    Project,
+    ('id', 'project_name', 'client_name', 'description', 'status', 'created_at', 'updated_at', 'revision',
+     'update_count', 'last_activity_at', 'freelancer_id', 'client_id'),
+    default=('id', 'project_name', 'client_name', 'status', 'updated_at', 'update_count'),
+    required=('id', 'freelancer_id', 'client_id'),
+    relations={
+        'freelancer': ('freelancer', 'freelancer_id', user_serializer, joinedload),
+        'client': ('client', 'client_id', user_serializer, joinedload),
+    },
+)
+
+update_serializer = Serializer(
+    Update,
+    ('id', 'project_id', 'content', 'created_at', 'author_id'),
+    default=('id', 'project_id', 'content', 'created_at', 'author_id'),
+    required=('id', 'project_id', 'created_at'),
+    relations={
+        'author': ('author', 'author_id', user_serializer, selectinload),
+    },
+)
+
+# Zonder token: dat is het geheim in de uitnodigingslink
+invite_serializer = Serializer(
+    ClientInvite,
+    ('id', 'email', 'status', 'project_id', 'created_at', 'expires_at', 'delivery_status'),
+    default=('id', 'email', 'status', 'project_id', 'created_at', 'expires_at', 'delivery_status'),
+    required=('id', 'created_at'),
+)
@@ -0,0 +1,234 @@
+"""Archief voor afgeronde projecten.
+
+Projecten met status ``afgerond`` die langer dan ``ARCHIVE_AFTER_DAYS``
+niet gewijzigd zijn, verhuizen in batches naar ``project_archives``: één
+rij per project met de projectrij, zijn updates en de ids van gekoppelde
+uitnodigingen als zlib-gecomprimeerde JSON. Daarna verdwijnen ze uit
+``projects``, ``updates`` en de zoekindex, zodat de dashboards en hun
+indexen alleen nog actieve projecten dragen.
+
+``projects.detail`` valt terug op het archief (alleen-lezen);
+``restore_project`` zet een project met al zijn updates terug.
+
+Het archief bewaart het oorspronkelijke project-id. Postgres geeft een id
+nooit opnieuw uit; SQLite kan het hoogste id wel hergebruiken, daarom
+weigert ``restore_project`` als het id inmiddels bezet is.
+"""
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+from app.jobs import periodic
+from app.models import db, Project, Update, ClientInvite, ProjectArchive, User, Attachment
+from app.search import index_projects, index_updates, unindex
+
+logger = logging.getLogger(__name__)
+
+# Updates per executemany bij terugzetten, en ids per IN-lijst
+CHUNK_SIZE = 1000
+
+
+class ArchiveStats:
+    def __init__(self):
+        self.projects = 0
+        self.updates = 0
+        self.batches = 0
+
+
+def cutoff_for(days, now=None):
+    return (now or datetime.utcnow()) - timedelta(days=days)
+
+
+def _candidates(cutoff):
+    # Oudste eerst, via de partiële index ix_projects_finished_updated; verwijderde ruimt app.purge op
+    return select(Project.id).where(Project.status == 'afgerond', Project.updated_at < cutoff,
+                                    Project.deleted_at.is_(None))
+
+
+def count_candidates(cutoff):
+    """Aantal projecten dat bij deze grens gearchiveerd zou worden"""
+    return db.session.execute(select(func.count()).select_from(_candidates(cutoff).subquery())).scalar()
+
+
+def archive_projects(cutoff, batch_size=None):
+    """Archiveer alle kandidaten van vóór ``cutoff``, één transactie per batch
+
+    Een afgebroken run is veilig te herhalen: elke batch is volledig
+    gearchiveerd of helemaal niet.
+    """
+    batch_size = batch_size or current_app.config.get('ARCHIVE_BATCH_SIZE', 100)
+    stats = ArchiveStats()
+    while True:
+        project_ids = db.session.execute(
+            _candidates(cutoff).order_by(Project.updated_at, Project.id).limit(batch_size)
+        ).scalars().all()
+        if not project_ids:
+            break
+        stats.updates += _archive_batch(project_ids)
+        stats.projects += len(project_ids)
+        stats.batches += 1
+        if len(project_ids) < batch_size:
+            break
+    if stats.projects:
+        logger.info('%s projecten met %s updates gearchiveerd', stats.projects, stats.updates)
+    return stats
+
+
+def _archive_batch(project_ids):
+    projects = db.session.execute(
+        select(Project.__table__).where(Project.id.in_(project_ids))
+    ).mappings().all()
+    updates = db.session.execute(
+        select(Update.__table__).where(Update.project_id.in_(project_ids))
+        .order_by(Update.project_id, Update.created_at, Update.id)
+    ).mappings().all()
+    invites = db.session.execute(
+        select(ClientInvite.id, ClientInvite.project_id).where(ClientInvite.project_id.in_(project_ids))
+    ).all()
+
+    updates_by_project, invites_by_project = {}, {}
+    for row in updates:
+        updates_by_project.setdefault(row['project_id'], []).append(row)
+    for invite_id, project_id in invites:
+        invites_by_project.setdefault(project_id, []).append(invite_id)
+
+    now = datetime.utcnow()
+    db.session.execute(insert(ProjectArchive), [{
+        'id': project['id'], 'freelancer_id': project['freelancer_id'], 'client_id': project['client_id'],
+        'project_name': project['project_name'], 'client_name': project['client_name'],
+        'status': project['status'], 'created_at': project['created_at'],
+        'update_count': len(updates_by_project.get(project['id'], ())), 'archived_at': now,
+        'payload': pack(project, updates_by_project.get(project['id'], ()),
+                        invites_by_project.get(project['id'], ())),
+    } for project in projects])
+
+    # Uitnodigingen blijven bestaan, zonder project; het archief onthoudt de koppeling
+    if invites:
+        db.session.execute(
+            update(ClientInvite).where(ClientInvite.project_id.in_(project_ids))
+            .values(project_id=None).execution_options(synchronize_session=False)
+        )
+    db.session.execute(
+        delete(Update).where(Update.project_id.in_(project_ids)).execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        delete(Project).where(Project.id.in_(project_ids)).execution_options(synchronize_session=False)
+    )
+    unindex(db.session, project_ids, [row['id'] for row in updates])
+    db.session.commit()
+    return len(updates)
+
+
+def restore_project(project_id):
+    """Zet een gearchiveerd project terug; geeft het aantal teruggezette updates
+
+    LookupError als het niet in het archief staat, ValueError als het id
+    inmiddels door een ander project gebruikt wordt.
+    """
+    archive = db.session.get(ProjectArchive, project_id)
+    if archive is None:
+        raise LookupError(f'Project {project_id} staat niet in het archief')
+    if db.session.get(Project, project_id) is not None:
+        raise ValueError(f'Project-id {project_id} is al in gebruik')
+
+    data = unpack(archive.payload)
+    project = _decode(data['project'], Project.__table__)
+    # Nieuwe revisie en wijzigingsdatum, zodat ETags en fragment-caches niet terugspringen
+    project['revision'] += 1
+    project['updated_at'] = datetime.utcnow()
+    db.session.execute(insert(Project), [project])
+
+    updates = [_decode(row, Update.__table__) for row in data['updates']]
+    for start in range(0, len(updates), CHUNK_SIZE):
+        db.session.execute(insert(Update), updates[start:start + CHUNK_SIZE])
+
+    # Alleen uitnodigingen die intussen niet aan iets anders gekoppeld zijn
+    for start in range(0, len(data['invites']), CHUNK_SIZE):
+        db.session.execute(
+            update(ClientInvite).where(ClientInvite.id.in_(data['invites'][start:start + CHUNK_SIZE]),
+                                       ClientInvite.project_id.is_(None))
+            .values(project_id=project_id).execution_options(synchronize_session=False)
+        )
+
+    db.session.delete(archive)
+    db.session.flush()
+    index_projects(db.session, [project_id])
+    update_ids = [row['id'] for row in updates]
+    for start in range(0, len(update_ids), CHUNK_SIZE):
+        index_updates(db.session, update_ids[start:start + CHUNK_SIZE])
+    db.session.commit()
+    return len(updates)
+
+
+def archived_project(project_id):
+    """``(project, updates)`` uit het archief voor de detailpagina (nieuwste update eerst); project None als het er niet in staat"""
+    archive = db.session.get(ProjectArchive, project_id)
+    if archive is None:
+        return None, []
+
+    data = unpack(archive.payload)
+    project = SimpleNamespace(**_decode(data['project'], Project.__table__), archived_at=archive.archived_at)
+    updates = [SimpleNamespace(**_decode(row, Update.__table__)) for row in reversed(data['updates'])]
+
+    # Auteurs in één query
+    user_ids = {project.freelancer_id, project.client_id} | {row.author_id for row in updates}
+    users = {user.id: user for user in User.query.filter(User.id.in_(user_ids - {None}))}
+    project.freelancer = users.get(project.freelancer_id)
+    project.client = users.get(project.client_id)
+
+    # Bijlagen blijven bij archiveren in attachments staan
+    attachments = {}
+    for attachment in Attachment.query.filter_by(project_id=project_id).order_by(Attachment.id):
+        attachments.setdefault(attachment.update_id, []).append(attachment)
+    for row in updates:
+        row.author = users.get(row.author_id)
+        row.attachments = attachments.get(row.id, [])
+    return project, updates
+
+
+def archive_stats():
+    """``(aantal projecten, aantal updates, bytes payload)`` in het archief"""
+    return db.session.execute(select(
+        func.count(ProjectArchive.id),
+        func.coalesce(func.sum(ProjectArchive.update_count), 0),
+        func.coalesce(func.sum(func.length(ProjectArchive.payload)), 0),
+    )).one()
+
+
+def pack(project, updates, invite_ids):
+    data = {
+        'project': _encode(project),
+        'updates': [_encode(row) for row in updates],
+        'invites': list(invite_ids),
+    }
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode())
+
+
+def unpack(payload):
+    return json.loads(zlib.decompress(payload))
+
+
+def _encode(row):
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+
+def _decode(values, table):
+    """JSON-waarden terug naar kolomtypes; onbekende (inmiddels verwijderde) kolommen vallen weg"""
+    row = {}
+    for column in table.columns:
+        if column.name not in values:
+            continue
+        value = values[column.name]
+        if value is not None and isinstance(column.type, db.DateTime):
+            value = datetime.fromisoformat(value)
+        row[column.name] = value
+    return row
+
+
+@periodic('ARCHIVE_INTERVAL')
+def archive_finished_projects():
+    """Periodieke archiveerronde in de worker (uit zolang ``ARCHIVE_INTERVAL`` 0 is)"""
+    return archive_projects(cutoff_for(current_app.config['ARCHIVE_AFTER_DAYS']))
@@ -0,0 +1,272 @@
+"""ASGI-modus: ``uvicorn asgi:app`` (zie ``asgi.py`` naast ``run.py``).
+
+Onder gunicorn bezet elk request een thread tot het klaar is, ook een
+trage client of een SSE-stream van minuten. In de ASGI-modus:
+
+* de read-heavy pagina's (dashboards, projectdetail, uitnodigingen) en de
+  SSE-stream draaien als coroutines (``app.async_views``) met een async
+  SQLAlchemy-sessie (``app.async_db``); wachten op de database, op nieuwe
+  updates of op de client kost geen thread
+* alle andere routes blijven gewone Flask-views; ze draaien via de
+  WSGI-brug in een threadpool van ``ASGI_SYNC_THREADS``, net als onder
+  gunicorn
+
+Async views draaien in een gewone Flask request-context (sessie-cookie,
+``current_user``, ``url_for``, CSRF, templates, before/after-request hooks
+en metrics). Een async view kan ``SyncFallback`` gooien zolang er nog
+niets verstuurd is; het request gaat dan alsnog naar de sync view. Dat
+gebeurt ook zonder ingelogde sessie (inloggen via remember-cookie,
+redirect naar de loginpagina).
+"""
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from tempfile import SpooledTemporaryFile
+from flask import Response, g, request_started, session
+from werkzeug.exceptions import HTTPException
+from app.async_db import async_db
+from app.async_queries import load_user
+from app.blueprints import LazyBlueprints
+
+ASYNC_VIEWS = {}
+
+# Modules met ``@async_view``; AsgiApp importeert ze bij het starten
+VIEW_MODULES = ('app.async_views',)
+
+ASYNC_METHODS = ('GET', 'HEAD')
+
+# Request bodies tot deze grootte in het geheugen, daarboven in een tijdelijk bestand
+MAX_MEMORY_BODY = 1024 * 1024
+
+
+class SyncFallback(Exception):
+    """Laat de gewone (sync) view dit request afhandelen"""
+
+
+def async_view(*endpoints):
+    """Registreer ``view(session, **view_args)`` als async versie van Flask-endpoints"""
+    def register(function):
+        for endpoint in endpoints:
+            ASYNC_VIEWS[endpoint] = function
+        return function
+    return register
+
+
+class StreamingResponse(Response):
+    """Response met een async iterator als body (SSE); alleen in de ASGI-modus"""
+
+    def __init__(self, chunks, **kwargs):
+        super().__init__(**kwargs)
+        self.chunks = chunks
+
+
+class AsgiApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        for module in VIEW_MODULES:
+            import_module(module)
+        # Routeren kan pas met de volledige url_map
+        if isinstance(flask_app.wsgi_app, LazyBlueprints):
+            flask_app.wsgi_app.load()
+        async_db.init_app(flask_app)
+        # Een open SSE-stream kost hier geen thread
+        flask_app.config['LIVE_UPDATES'] = flask_app.config.get('LIVE_UPDATES') or 'sse'
+        self.executor = ThreadPoolExecutor(max_workers=flask_app.config.get('ASGI_SYNC_THREADS', 8),
+                                           thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f'ASGI-scope {scope["type"]!r} wordt niet ondersteund')
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_db.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        if scope['method'] in ASYNC_METHODS:
+            environ = build_environ(scope, io.BytesIO())
+            view, view_args = self._match(environ)
+            if view is not None:
+                try:
+                    await self._dispatch(view, view_args, environ, receive, send)
+                    return
+                except SyncFallback:
+                    pass
+            await self._run_wsgi(environ, send)
+            return
+
+        with SpooledTemporaryFile(max_size=MAX_MEMORY_BODY) as body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            await self._run_wsgi(build_environ(scope, body), send)
+
+    def _match(self, environ):
+        try:
+            endpoint, view_args = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None, None
+        return ASYNC_VIEWS.get(endpoint), view_args
+
+    async def _dispatch(self, view, view_args, environ, receive, send):
+        """Async view in een Flask request-context, als ``Flask.full_dispatch_request``"""
+        app = self.flask_app
+        async with async_db.session() as db_session:
+            with app.request_context(environ):
+                user_id = session.get('_user_id')
+                if user_id is None:
+                    raise SyncFallback()
+
+                request_started.send(app, _async_wrapper=app.ensure_sync)
+                try:
+                    user = await load_user(db_session, int(user_id))
+                    if user is None:
+                        raise SyncFallback()
+                    # Flask-Login leest current_user uit g; de sync user_loader blijft buiten schot
+                    g._login_user = user
+                    response = app.preprocess_request()
+                    if response is None:
+                        response = await view(db_session, **view_args)
+                except SyncFallback:
+                    raise
+                except Exception as error:
+                    try:
+                        response = app.handle_user_exception(error)
+                    except Exception as unhandled:
+                        await _send_response(app.handle_exception(unhandled), environ, receive, send)
+                        return
+
+                # Geen verbinding vasthouden terwijl de response (of stream) verstuurd wordt
+                await db_session.close()
+                await _send_response(app.finalize_request(response), environ, receive, send)
+
+    async def _run_wsgi(self, environ, send):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._call_wsgi, environ, send, loop)
+
+    def _call_wsgi(self, environ, send, loop):
+        """Flask in een thread van de pool; elk stuk body wacht tot het verstuurd is"""
+        status = headers = None
+
+        def start_response(status_line, response_headers, exc_info=None):
+            nonlocal status, headers
+            status = int(status_line.split(' ', 1)[0])
+            headers = [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in response_headers]
+
+        def push(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        result = self.flask_app(environ, start_response)
+        started = False
+        try:
+            for chunk in result:
+                if not started:
+                    push({'type': 'http.response.start', 'status': status, 'headers': headers})
+                    started = True
+                if chunk:
+                    push({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started:
+                push({'type': 'http.response.start', 'status': status, 'headers': headers})
+            push({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+
+async def _send_response(response, environ, receive, send):
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in response.headers.items()],
+    })
+    if isinstance(response, StreamingResponse):
+        await _stream(response.chunks, receive, send)
+        return
+    body = b'' if environ['REQUEST_METHOD'] == 'HEAD' else response.get_data()
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _stream(chunks, receive, send):
+    """Verstuur een async body tot hij op is of de client de verbinding verbreekt"""
+    async def pump():
+        async for chunk in chunks:
+            await send({'type': 'http.response.body', 'body': chunk.encode() if isinstance(chunk, str) else chunk,
+                        'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def disconnected():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await chunks.aclose()
+
+
+def build_environ(scope, body):
+    """WSGI-environ voor een ASGI http-scope"""
+    server = scope.get('server') or ('localhost', 80)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf8').decode('latin1'),
+        'PATH_INFO': path.encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for raw_name, raw_value in scope.get('headers', ()):
+        name, value = raw_name.decode('latin1'), raw_value.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+
+def create_asgi_app(config_name='default', **config_overrides):
+    from app import create_app
+    return AsgiApp(create_app(config_name, **config_overrides))
@@ -0,0 +1,114 @@
+"""Controle van de async views (ASGI-modus) tegen hun sync tegenhangers.
+
+Elke route met een ``@async_view`` wordt voor een freelancer en een client
+opgevraagd via de test client (sync view) en via ``AsgiApp`` (async view),
+met dezelfde sessie-cookie. Statuscode en ETag moeten gelijk zijn: een
+async view die bij de verkeerde rol een 500 geeft in plaats van een 403,
+valt zo op. De SSE-stream blijft erbuiten; die houdt de verbinding open.
+"""
+import asyncio
+import os
+from app.async_db import async_db
+from app.models import db, User, Project, Update, ClientInvite, ClientFreelancerRelation
+
+PASSWORD = 'async-check'
+
+
+class RouteResult:
+    def __init__(self, name, ok, detail):
+        self.name = name
+        self.ok = ok
+        self.detail = detail
+
+
+def check_async_routes(directory):
+    """Vergelijk sync en async per route en rol; geef ``RouteResult``-en"""
+    from app.asgi import create_asgi_app
+
+    # Een bestand, want de async engine heeft een eigen verbinding
+    path = os.path.join(directory, 'async-check.db')
+    # Fouten als 500 melden in plaats van ze (zoals in TESTING) door te gooien
+    asgi = create_asgi_app('testing', SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', THROTTLE_BACKEND='none',
+                           PROPAGATE_EXCEPTIONS=False)
+    app = asgi.flask_app
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        project_id, other_id = _seed()
+
+    urls = ('/dashboard', '/dashboard/freelancer', '/dashboard/client', '/dashboard?sort=activity',
+            '/dashboard/more', f'/projects/{project_id}', f'/projects/{project_id}/updates',
+            f'/projects/{other_id}', '/invites/my-invites')
+
+    checks = []
+    for role in ('freelancer', 'client'):
+        client = app.test_client()
+        client.post('/auth/login', data={'email': f'{role}@example.com', 'password': PASSWORD})
+        cookie = f"session={client.get_cookie('session').value}"
+        checks += [(role, url, cookie, client.get(url)) for url in urls]
+
+    try:
+        responses = asyncio.run(_asgi_get_all(asgi, [(url, cookie) for _, url, cookie, _ in checks]))
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        os.remove(path)
+
+    results = []
+    for (role, url, _, expected), (status, headers) in zip(checks, responses):
+        ok = status == expected.status_code and headers.get('etag') == expected.headers.get('ETag')
+        results.append(RouteResult(f'{role:10} {url}', ok, f'sync {expected.status_code}, async {status}'))
+    return results
+
+
+async def _asgi_get_all(asgi, requests):
+    try:
+        return [await _asgi_get(asgi, url, cookie) for url, cookie in requests]
+    finally:
+        await async_db.dispose()
+
+
+async def _asgi_get(asgi, url, cookie):
+    """GET via de ASGI-app; geeft status en headers (namen in kleine letters)"""
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(), 'root_path': '',
+        'scheme': 'http', 'server': ('localhost', 80),
+        'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+    }
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi(scope, receive, send)
+    return sent[0]['status'], {name.decode(): value.decode() for name, value in sent[0]['headers']}
+
+
+def _seed():
+    freelancer = User(username='async-freelancer', email='freelancer@example.com', role='freelancer')
+    client = User(username='async-client', email='client@example.com', role='client')
+    for user in (freelancer, client):
+        user.set_password(PASSWORD)
+    db.session.add_all([freelancer, client])
+    db.session.flush()
+
+    db.session.add(ClientFreelancerRelation(client_id=client.id, freelancer_id=freelancer.id))
+    project = Project(project_name='Async', client_name='Async', description='Async',
+                      freelancer_id=freelancer.id, client_id=client.id)
+    # Van een andere freelancer: voor beide rollen geen toegang
+    other = User(username='async-other', email='other@example.com', role='freelancer')
+    other.set_password(PASSWORD)
+    db.session.add_all([project, other])
+    db.session.flush()
+    other_project = Project(project_name='Ander', client_name='Ander', description='Ander', freelancer_id=other.id)
+    db.session.add(other_project)
+    db.session.add_all([Update(content=f'Update {i}', project_id=project.id, author_id=freelancer.id) for i in range(3)])
+    db.session.add(ClientInvite(email='nieuw@example.com', token=ClientInvite.generate_token(),
+                                freelancer_id=freelancer.id, project_id=project.id))
+    db.session.commit()
+    return project.id, other_project.id
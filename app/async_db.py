@@ -0,0 +1,62 @@
+"""Async SQLAlchemy voor de ASGI-modus (zie ``app.asgi``).
+
+Dezelfde database als ``db``, via een async driver: ``aiosqlite`` voor
+SQLite en ``asyncpg`` voor Postgres. ``ASYNC_DATABASE_URL`` overschrijft de
+afgeleide URL. De async views lezen alleen; writes lopen via de gewone
+(sync) views en ``db``.
+"""
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+}
+
+
+def async_url(uri):
+    """Sync database-URI → async-variant; ``sslmode`` heet bij asyncpg ``ssl``"""
+    url = make_url(uri)
+    driver = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    url = url.set(drivername=driver)
+    if driver == 'postgresql+asyncpg' and 'sslmode' in url.query:
+        url = url.difference_update_query(['sslmode']).update_query_dict({'ssl': url.query['sslmode']})
+    return url
+
+
+def async_engine_options(app, url):
+    """Pool als de sync engine, maar dan voor alle gelijktijdige async requests samen"""
+    if url.drivername.startswith('sqlite'):
+        return {}
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    result = {key: options[key] for key in ('pool_timeout', 'pool_recycle', 'pool_pre_ping') if key in options}
+    result['pool_size'] = app.config.get('ASYNC_DB_POOL_SIZE', 10)
+    result['max_overflow'] = 0
+    statement_timeout = app.config.get('ASYNC_DB_STATEMENT_TIMEOUT_MS')
+    if statement_timeout:
+        result['connect_args'] = {'server_settings': {'statement_timeout': str(statement_timeout)}}
+    return result
+
+
+class AsyncDatabase:
+    def __init__(self):
+        self.engine = None
+        self._sessionmaker = None
+
+    def init_app(self, app):
+        url = make_url(app.config.get('ASYNC_DATABASE_URL') or async_url(app.config['SQLALCHEMY_DATABASE_URI']))
+        self.engine = create_async_engine(url, **async_engine_options(app, url))
+        # Objecten blijven na het sluiten van de sessie leesbaar voor de templates
+        self._sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    def session(self):
+        return self._sessionmaker()
+
+    async def dispose(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+
+
+async_db = AsyncDatabase()
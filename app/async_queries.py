@@ -0,0 +1,123 @@
+"""Async tegenhangers van ``app.queries`` voor de views in ``app.async_views``.
+
+Zelfde filters, indexen en laadstrategieën als de sync versies. Lazy
+loading bestaat in een async sessie niet, dus alles wat een template leest
+wordt hier meegeladen.
+"""
+from flask import current_app
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import User, Project, Update, ClientInvite, ProjectArchive, InboxItem
+from app.pagination import keyset_query, to_page, decode_cursor
+from app.queries import PROJECT_SORTS, inbox_state
+from app.user_cache import user_cache
+
+
+async def load_user(session, user_id):
+    """Ingelogde gebruiker: uit de user-cache zonder I/O, anders één async SELECT"""
+    user = user_cache.cached(user_id)
+    if user is None:
+        user = await session.get(User, user_id)
+        if user is not None:
+            user_cache.remember(user)
+    return user
+
+
+async def dashboard_projects(session, user, cursor=None, sort='created'):
+    """Pagina projecten voor het dashboard, met client/freelancer en laatste auteur"""
+    if user.is_freelancer():
+        statement = select(Project).where(Project.freelancer_id == user.id, Project.deleted_at.is_(None)).options(joinedload(Project.client))
+    else:
+        statement = select(Project).where(Project.client_id == user.id, Project.deleted_at.is_(None)).options(joinedload(Project.freelancer))
+    statement = statement.options(joinedload(Project.last_update_author))
+
+    sort_column = PROJECT_SORTS[sort]
+    per_page = current_app.config['PROJECTS_PER_PAGE']
+    rows = (await session.execute(keyset_query(statement, sort_column, Project.id, cursor, per_page))).scalars().all()
+    return to_page(rows, sort_column, Project.id, per_page)
+
+
+async def project_for_detail(session, project_id):
+    """Eén project met freelancer en client, of None (ook als het verwijderd is)"""
+    return (await session.execute(
+        select(Project).where(Project.id == project_id, Project.deleted_at.is_(None))
+        .options(joinedload(Project.freelancer), joinedload(Project.client))
+    )).scalar_one_or_none()
+
+
+async def project_updates(session, project, cursor=None):
+    """Pagina updates van een project, nieuwste eerst, auteurs en bijlagen in elk één extra IN-query"""
+    statement = select(Update).where(Update.project_id == project.id).options(selectinload(Update.author),
+                                                                            selectinload(Update.attachments))
+    per_page = current_app.config['UPDATES_PER_PAGE']
+    rows = (await session.execute(keyset_query(statement, Update.created_at, Update.id, cursor, per_page))).scalars().all()
+    return to_page(rows, Update.created_at, Update.id, per_page)
+
+
+async def project_updates_after(session, project_id, cursor, limit):
+    """Updates ná de cursor, oudste eerst (voor de live stream)"""
+    value, row_id = decode_cursor(cursor)
+    return (await session.execute(
+        select(Update).where(
+            Update.project_id == project_id,
+            tuple_(Update.created_at, Update.id) > tuple_(value, row_id)
+        ).options(selectinload(Update.author), selectinload(Update.attachments))
+        .order_by(Update.created_at, Update.id).limit(limit)
+    )).scalars().all()
+
+
+async def freelancer_invites(session, freelancer, status, limit=None):
+    """Uitnodigingen van een freelancer met een bepaalde status, met project"""
+    statement = select(ClientInvite).where(
+        ClientInvite.freelancer_id == freelancer.id,
+        ClientInvite.status == status
+    ).options(joinedload(ClientInvite.project)).order_by(ClientInvite.created_at.desc())
+    if limit is not None:
+        statement = statement.limit(limit)
+    return (await session.execute(statement)).scalars().all()
+
+
+async def inbox_items(session, user, cursor=None):
+    """Pagina uit de inbox van ``user``, nieuwste eerst, met de actor"""
+    statement = select(InboxItem).where(InboxItem.user_id == user.id).options(joinedload(InboxItem.actor))
+    per_page = current_app.config['INBOX_PER_PAGE']
+    rows = (await session.execute(keyset_query(statement, InboxItem.created_at, InboxItem.id, cursor, per_page))).scalars().all()
+    return to_page(rows, InboxItem.created_at, InboxItem.id, per_page)
+
+
+async def inbox_unread(session, user):
+    return await session.scalar(
+        select(func.count(InboxItem.id)).where(InboxItem.user_id == user.id, InboxItem.read_at.is_(None))
+    )
+
+
+# --- Versiestempels, als in app.queries ----------------------------------------
+
+async def dashboard_version(session, user):
+    owner = Project.freelancer_id if user.is_freelancer() else Project.client_id
+    inbox = inbox_state(user) if user.is_client() else ()
+    count, updated_at, *inbox_parts = (await session.execute(
+        select(func.count(Project.id), func.max(Project.updated_at), *inbox).where(owner == user.id, Project.deleted_at.is_(None))
+    )).one()
+    return (count, updated_at, *inbox_parts), max(filter(None, (updated_at, *inbox_parts[1:])), default=None)
+
+
+async def project_version(session, project_id):
+    row = (await session.execute(
+        select(Project.revision, Project.updated_at).where(Project.id == project_id, Project.deleted_at.is_(None))
+    )).first()
+    if row is None:
+        archived_at = await session.scalar(select(ProjectArchive.archived_at).where(ProjectArchive.id == project_id))
+        return (('archived', archived_at), archived_at) if archived_at else None
+    return tuple(row), row.updated_at
+
+
+async def invites_version(session, freelancer):
+    projects_updated = select(func.max(Project.updated_at)).where(
+        Project.freelancer_id == freelancer.id
+    ).scalar_subquery()
+    count, updated_at, projects_at = (await session.execute(
+        select(func.count(ClientInvite.id), func.max(ClientInvite.updated_at), projects_updated)
+        .where(ClientInvite.freelancer_id == freelancer.id)
+    )).one()
+    return (count, updated_at, projects_at), max(filter(None, (updated_at, projects_at)), default=None)
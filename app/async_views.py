@@ -0,0 +1,136 @@
+"""Async versies van de read-heavy views, voor de ASGI-modus (``app.asgi``).
+
+Elke view hoort bij een bestaand Flask-endpoint en geeft dezelfde HTML
+(dezelfde templates, ETags en fragmenten); alleen de queries zijn async.
+Onder gunicorn draaien gewoon de sync views.
+"""
+import time
+from flask import abort, current_app, render_template, request
+from flask_login import current_user
+from app.asgi import StreamingResponse, SyncFallback, async_view
+from app.async_db import async_db
+from app.async_queries import (dashboard_projects, dashboard_version, freelancer_invites, inbox_items, inbox_unread,
+                               invites_version, project_for_detail, project_updates, project_updates_after,
+                               project_version)
+from app.caching import async_conditional
+from app.events import broker, format_event, project_channel
+from app.main.routes import _dashboard_sort
+from app.pagination import decode_cursor, encode_cursor, fragment_response, request_cursor, InvalidCursor
+from app.projects.routes import _check_view_access
+
+
+@async_view('main.dashboard', 'main.freelancer_dashboard', 'main.client_dashboard')
+@async_conditional(lambda session: dashboard_version(session, current_user))
+async def dashboard(session):
+    role = {'main.freelancer_dashboard': 'freelancer', 'main.client_dashboard': 'client'}.get(request.endpoint)
+    if role and current_user.role != role:
+        abort(403)
+
+    sort = _dashboard_sort()
+    projects = await dashboard_projects(session, current_user, sort=sort)
+    if current_user.is_freelancer():
+        return render_template('main/freelancer_dashboard.html', projects=projects, sort=sort)
+    return render_template('main/client_dashboard.html', projects=projects, sort=sort,
+                           inbox=await inbox_items(session, current_user),
+                           inbox_unread=await inbox_unread(session, current_user))
+
+
+@async_view('main.dashboard_more')
+async def dashboard_more(session):
+    projects = await dashboard_projects(session, current_user, request_cursor(), _dashboard_sort())
+    template = 'main/_freelancer_cards.html' if current_user.is_freelancer() else 'main/_client_cards.html'
+    return fragment_response(render_template(template, projects=projects), projects)
+
+
+@async_view('projects.detail')
+@async_conditional(project_version)
+async def detail(session, project_id):
+    project = await project_for_detail(session, project_id)
+    if project is None:
+        # Gearchiveerd (of onbekend): de sync view leest het archief
+        raise SyncFallback()
+    _check_view_access(project)
+
+    updates = await project_updates(session, project)
+
+    newest = updates.items[0] if updates else None
+    stream_cursor = encode_cursor(newest.created_at, newest.id) if newest else encode_cursor(project.created_at, 0)
+    return render_template('projects/detail.html', project=project, updates=updates, stream_cursor=stream_cursor)
+
+
+@async_view('projects.updates_more')
+async def updates_more(session, project_id):
+    project = await project_for_detail(session, project_id)
+    if project is None:
+        abort(404)
+    _check_view_access(project)
+
+    updates = await project_updates(session, project, request_cursor())
+    return fragment_response(render_template('projects/_updates.html', updates=updates), updates)
+
+
+async def _my_invites_version(session):
+    # Geen ETag voor clients: de view zelf geeft 403
+    if current_user.is_freelancer():
+        return await invites_version(session, current_user)
+    return None
+
+
+@async_view('invites.my_invites')
+@async_conditional(_my_invites_version)
+async def my_invites(session):
+    if not current_user.is_freelancer():
+        abort(403)
+
+    pending = await freelancer_invites(session, current_user, 'pending')
+    accepted = await freelancer_invites(session, current_user, 'accepted', limit=10)
+    expired = await freelancer_invites(session, current_user, 'expired', limit=10)
+    return render_template('invites/my_invites.html', pending=pending, accepted=accepted, expired=expired)
+
+
+@async_view('projects.stream')
+async def stream(session, project_id):
+    """SSE als in ``projects.stream``, maar wachten kost geen thread en geen databaseverbinding"""
+    if current_app.config.get('LIVE_UPDATES') != 'sse':
+        raise SyncFallback()
+    project = await project_for_detail(session, project_id)
+    if project is None:
+        abort(404)
+    _check_view_access(project)
+
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+    try:
+        decode_cursor(cursor or '')
+    except InvalidCursor:
+        abort(400)
+
+    subscription = broker.subscribe(project_channel(project_id))
+    heartbeat = current_app.config['SSE_HEARTBEAT']
+    deadline = time.monotonic() + current_app.config['SSE_MAX_DURATION']
+    batch_size = current_app.config['UPDATES_PER_PAGE']
+
+    async def events():
+        nonlocal cursor
+        yield 'retry: 2000\n\n'
+        changed = True
+        while True:
+            while changed:
+                async with async_db.session() as stream_session:
+                    updates = await project_updates_after(stream_session, project_id, cursor, batch_size)
+                if updates:
+                    cursor = encode_cursor(updates[-1].created_at, updates[-1].id)
+                    html = render_template('projects/_updates.html', updates=reversed(updates))
+                    yield format_event(html, event='update', event_id=cursor)
+                changed = len(updates) == batch_size
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            changed = await subscription.wait_async(min(heartbeat, remaining))
+            if not changed:
+                yield ': keepalive\n\n'
+
+    return StreamingResponse(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
@@ -0,0 +1,135 @@
+"""Bijlagen bij updates.
+
+``projects.add_update`` neemt bestanden mee. De inhoud gaat onder zijn
+sha256 naar de blob store (``app.blobs``): stuurt iemand hetzelfde bestand
+nog eens, dan komt er alleen een ``Attachment``-rij bij die naar de
+bestaande ``Blob`` wijst.
+
+Downloaden (``projects.attachment``) kent dezelfde toegangscheck als de
+detailpagina, ook voor gearchiveerde projecten. ``app.purge`` haalt de
+bijlagen van verwijderde projecten weg; ``collect_garbage`` ruimt daarna
+periodiek de blobs op waar niets meer naar wijst.
+"""
+import logging
+import mimetypes
+import os
+import shutil
+import unicodedata
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, exists, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.blobs import StagedUpload, blob_store
+from app.jobs import periodic
+from app.models import db, Attachment, Blob
+
+logger = logging.getLogger(__name__)
+
+FILENAME_LENGTH = 255
+
+# Blobs per transactie bij het opruimen
+GC_BATCH_SIZE = 100
+
+
+class InvalidAttachment(ValueError):
+    """Upload die niet geaccepteerd wordt (te veel of te grote bestanden)"""
+
+
+def clean_filename(filename):
+    """Alleen de bestandsnaam, zonder map of stuurtekens, hooguit 255 tekens met behoud van de extensie"""
+    name = os.path.basename((filename or '').replace('\\', '/'))
+    name = ''.join(char for char in name if unicodedata.category(char)[0] != 'C').strip() or 'bestand'
+    if len(name) > FILENAME_LENGTH:
+        stem, extension = os.path.splitext(name)
+        extension = extension[:20]
+        name = stem[:FILENAME_LENGTH - len(extension)] + extension
+    return name
+
+
+def check_uploads(uploads):
+    """Gooi ``InvalidAttachment`` bij te veel bestanden"""
+    maximum = current_app.config['ATTACHMENT_MAX_FILES']
+    if len(uploads) > maximum:
+        raise InvalidAttachment(f'Maximaal {maximum} bijlagen per update')
+
+
+def attach(update, uploads):
+    """Zet geüploade bestanden in de blob store en koppel ze aan ``update``; committen doet de aanroeper"""
+    if update.id is None:
+        db.session.flush()
+    store = blob_store()
+    now = datetime.utcnow()
+    attachments = []
+    for upload in uploads:
+        staged = upload.stream
+        if not isinstance(staged, StagedUpload):
+            # Geen upload via UploadRequest: eerst naar de staging kopiëren
+            staged = store.stage()
+            shutil.copyfileobj(upload.stream, staged)
+            upload.stream = staged
+
+        # Eerst de rij (die blokkeert een gelijktijdige opruimronde), dan het bestand
+        _use_blob(staged.sha256, staged.size, now)
+        store.put(staged.sha256, staged)
+
+        filename = clean_filename(upload.filename)
+        attachments.append(Attachment(
+            update_id=update.id,
+            project_id=update.project_id,
+            sha256=staged.sha256,
+            filename=filename,
+            content_type=(mimetypes.guess_type(filename)[0] or 'application/octet-stream')[:100],
+            size=staged.size,
+            created_at=now,
+        ))
+    db.session.add_all(attachments)
+    return attachments
+
+
+def _use_blob(sha256, size, now):
+    """Voeg de blob toe, of markeer een bestaande als net gebruikt"""
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    db.session.execute(
+        dialect.insert(Blob).values(sha256=sha256, size=size, last_used_at=now)
+        .on_conflict_do_update(index_elements=[Blob.sha256], set_={'last_used_at': now})
+    )
+
+
+def send_attachment(attachment):
+    """Download-response via de blob store; nooit inline, zodat een geüploade HTML-pagina niet in onze origin draait"""
+    response = blob_store().send(attachment.sha256, attachment.filename, attachment.content_type)
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def _unused(cutoff):
+    return (Blob.last_used_at < cutoff) & ~exists().where(Attachment.sha256 == Blob.sha256)
+
+
+@periodic('ATTACHMENT_GC_INTERVAL')
+def collect_garbage(grace=None):
+    """Verwijder blobs zonder bijlagen die langer dan ``ATTACHMENT_GC_GRACE`` seconden niet gebruikt zijn
+
+    Per blob eerst de rij (nog eens met dezelfde voorwaarden), dan het
+    bestand, en pas daarna de commit: een upload van dezelfde inhoud wacht
+    op die rij en zet het bestand daarna opnieuw neer.
+    """
+    grace = current_app.config.get('ATTACHMENT_GC_GRACE', 3600) if grace is None else grace
+    cutoff = datetime.utcnow() - timedelta(seconds=grace)
+    store = blob_store()
+    removed = 0
+    while True:
+        keys = db.session.execute(select(Blob.sha256).where(_unused(cutoff)).limit(GC_BATCH_SIZE)).scalars().all()
+        if not keys:
+            break
+        for key in keys:
+            result = db.session.execute(
+                delete(Blob).where(Blob.sha256 == key, _unused(cutoff)).execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                store.delete(key)
+                removed += 1
+        db.session.commit()
+    if removed:
+        logger.info('%s ongebruikte blobs opgeruimd', removed)
+    return removed
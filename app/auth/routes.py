@@ -3,10 +3,24 @@ from flask_login import login_user, logout_user, current_user
 from urllib.parse import urlparse
 from app.models import db, User
 from app.auth.forms import LoginForm, RegistrationForm
+from app.throttle import throttled, form_email
 
 auth_bp = Blueprint('auth', __name__)
 
+
+def is_local_url(target):
+    """True voor een pad op deze site; ``next``-parameters alleen hiermee volgen
+    
+    Browsers lezen ``\\`` als ``/`` en negeren tabs en regeleinden, dus
+    ``/\\evil.example`` en ``/<tab>/evil.example`` zijn net als
+    ``//evil.example`` een andere host.
+    """
+    cleaned = ''.join(char for char in target or '' if char >= ' ').replace('\\', '/')
+    return cleaned.startswith('/') and not cleaned.startswith('//') and not urlparse(cleaned).netloc
+
+
 @auth_bp.route('/register', methods=['GET', 'POST'])
+@throttled('register', account=form_email)
 def register():
     if current_user.is_authenticated:
         # Redirect naar juiste dashboard op basis van rol
@@ -35,6 +49,7 @@ def register():
 
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@throttled('login', account=form_email)
 def login():
     if current_user.is_authenticated:
         # Redirect naar juiste dashboard op basis van rol
@@ -52,11 +67,16 @@ def login():
             flash('Ongeldig emailadres of wachtwoord', 'danger')
             return redirect(url_for('auth.login'))
         
+        # Hash opnieuw als de hash-instellingen sinds de vorige login zijn gewijzigd
+        if user.password_needs_rehash():
+            user.set_password(form.password.data)
+            db.session.commit()
+        
         login_user(user, remember=form.remember_me.data)
         
         # Redirect naar juiste dashboard
         next_page = request.args.get('next')
-        if not next_page or urlparse(next_page).netloc != '':
+        if not is_local_url(next_page):
             if user.is_freelancer():
                 next_page = url_for('main.freelancer_dashboard')
             else:
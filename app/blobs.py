@@ -0,0 +1,196 @@
+"""Blob store voor bijlagen: inhoud per sha256, op lokale schijf of in S3.
+
+``create_blob_store`` kiest de store op basis van ``BLOB_STORE_URL``:
+
+* leeg of ``file:///pad``: bestanden op lokale schijf (standaard
+  ``<instance>/blobs``), verdeeld over submappen ``ab/cd/<sha256>``
+* ``s3://bucket/prefix``: S3 of een S3-compatibele store via boto3
+  (optioneel, niet in requirements.txt)
+
+Uploads worden niet in het geheugen verzameld: ``UploadRequest`` laat de
+multipart-parser elk bestand in blokken naar een stagingbestand schrijven
+(``StagedUpload``), dat onderweg zijn sha256 en grootte bijhoudt. ``put``
+verplaatst zo'n bestand naar zijn definitieve plek; staat dezelfde inhoud
+er al, dan blijft het bij die ene kopie.
+"""
+import hashlib
+import os
+import tempfile
+from urllib.parse import quote, urlparse
+from flask import Request, abort, current_app, redirect, request
+from werkzeug.utils import send_file
+
+
+class StagedUpload:
+    """Tijdelijk bestand dat bij het schrijven zijn sha256 en grootte bijhoudt
+
+    Verder een gewoon bestand (lezen, seek), zodat ook andere uploads, zoals
+    de CSV-import, er gewoon uit lezen. Bij ``close`` verdwijnt het, tenzij
+    de store het al heeft overgenomen.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix='upload-')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def close(self):
+        self._file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class UploadRequest(Request):
+    """Request waarvan geüploade bestanden direct naar de staging van de blob store stromen"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return blob_store().stage()
+
+
+def content_disposition(filename):
+    """``attachment``-header met een ASCII-terugval en de volledige naam als UTF-8"""
+    fallback = filename.encode('ascii', 'ignore').decode('ascii').replace('"', '').replace('\\', '') or 'bestand'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+class LocalBlobStore:
+    def __init__(self, root):
+        self.root = root
+        # Op hetzelfde bestandssysteem als de blobs, zodat put een rename is
+        self.staging = os.path.join(root, 'staging')
+
+    def stage(self):
+        return StagedUpload(self.staging)
+
+    def _relative(self, key):
+        return os.path.join(key[:2], key[2:4], key)
+
+    def path(self, key):
+        return os.path.join(self.root, self._relative(key))
+
+    def put(self, key, staged):
+        """Neem ``staged`` over als blob ``key``; False als die inhoud er al stond"""
+        target = self.path(key)
+        if os.path.exists(target):
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        staged.flush()
+        # Leesbaar voor een proxy die het bestand via X-Sendfile/X-Accel-Redirect levert
+        os.chmod(staged.path, 0o644)
+        os.replace(staged.path, target)
+        return True
+
+    def delete(self, key):
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def send(self, key, filename, mimetype):
+        """Download-response; Range en If-Range via werkzeug, of de proxy levert het bestand zelf
+
+        Zonder proxy gaat het bestand via ``wsgi.file_wrapper`` (onder
+        gunicorn met ``sendfile()``) in plaats van via Python-buffers.
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            abort(404)
+        accel = current_app.config.get('ATTACHMENT_ACCEL_REDIRECT')
+        response = send_file(path, request.environ, mimetype=mimetype, as_attachment=True, download_name=filename,
+                             conditional=True, etag=key, use_x_sendfile=bool(accel) or current_app.config['USE_X_SENDFILE'],
+                             response_class=current_app.response_class)
+        if accel:
+            # nginx: internal location die naar de root van deze store wijst
+            del response.headers['X-Sendfile']
+            response.headers['X-Accel-Redirect'] = f"{accel.rstrip('/')}/{self._relative(key)}"
+        elif 'X-Sendfile' not in response.headers:
+            # werkzeug zet dit alleen op antwoorden op een Range-request; zo weet een client dat hervatten kan
+            response.accept_ranges = 'bytes'
+        return response
+
+
+class S3BlobStore:
+    def __init__(self, bucket, prefix=''):
+        try:
+            import boto3
+        except ImportError as exc:
+            raise RuntimeError('BLOB_STORE_URL wijst naar S3, maar het boto3-pakket is niet geïnstalleerd') from exc
+        self.client = boto3.client('s3')
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.staging = os.path.join(tempfile.gettempdir(), 'klantsync-uploads')
+
+    def stage(self):
+        return StagedUpload(self.staging)
+
+    def _key(self, key):
+        return f'{self.prefix}/{key}' if self.prefix else key
+
+    def put(self, key, staged):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return False
+        except ClientError as error:
+            if error.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+                raise
+        staged.flush()
+        self.client.upload_file(staged.path, self.bucket, self._key(key))
+        return True
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def send(self, key, filename, mimetype):
+        """Redirect naar een kortlevende presigned URL; S3 levert het bestand en doet zelf Range"""
+        url = self.client.generate_presigned_url('get_object', ExpiresIn=60, Params={
+            'Bucket': self.bucket,
+            'Key': self._key(key),
+            'ResponseContentType': mimetype,
+            'ResponseContentDisposition': content_disposition(filename),
+        })
+        return redirect(url)
+
+
+def create_blob_store(url, default_root):
+    """Maak een blob store op basis van een URL (leeg, ``file://...`` of ``s3://...``)"""
+    if not url:
+        return LocalBlobStore(default_root)
+
+    parsed = urlparse(url)
+    if parsed.scheme == 'file':
+        return LocalBlobStore(parsed.path)
+    if parsed.scheme == 's3':
+        return S3BlobStore(parsed.netloc, parsed.path)
+
+    raise ValueError(f'Onbekende BLOB_STORE_URL: {url}')
+
+
+def init_app(app):
+    app.extensions['blob_store'] = create_blob_store(app.config.get('BLOB_STORE_URL'),
+                                                     os.path.join(app.instance_path, 'blobs'))
+    app.request_class = UploadRequest
+
+
+def blob_store():
+    """De blob store van de huidige app"""
+    return current_app.extensions['blob_store']
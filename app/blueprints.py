@@ -0,0 +1,52 @@
+"""Blueprints registreren, direct of bij het eerste request.
+
+Met ``LAZY_LOADING`` worden de routes (met hun formulieren en queries) pas
+geïmporteerd als het eerste request binnenkomt. Een worker is dan sneller
+klaar met opstarten; het eerste request betaalt de imports. CLI-commando's
+(``flask routes``, ``flask db``, ...) laden altijd direct, want die hebben
+de volledige url_map nodig.
+"""
+import threading
+from importlib import import_module
+import click
+
+BLUEPRINTS = (
+    ('app.auth.routes', 'auth_bp', '/auth'),
+    ('app.main.routes', 'main_bp', None),
+    ('app.projects.routes', 'projects_bp', '/projects'),
+    ('app.invites.routes', 'invites_bp', '/invites'),
+    ('app.api.routes', 'api_bp', '/api/v1'),
+)
+
+
+def register_blueprints(app):
+    for module, name, url_prefix in BLUEPRINTS:
+        app.register_blueprint(getattr(import_module(module), name), url_prefix=url_prefix)
+
+
+def init_app(app):
+    if app.config.get('LAZY_LOADING') and click.get_current_context(silent=True) is None:
+        app.wsgi_app = LazyBlueprints(app, app.wsgi_app)
+    else:
+        register_blueprints(app)
+
+
+class LazyBlueprints:
+    """WSGI-middleware die de blueprints vóór het eerste request registreert"""
+
+    def __init__(self, app, wsgi_app):
+        self.app = app
+        self.wsgi_app = wsgi_app
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    register_blueprints(self.app)
+                    self.loaded = True
+
+    def __call__(self, environ, start_response):
+        self.load()
+        return self.wsgi_app(environ, start_response)
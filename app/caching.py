@@ -0,0 +1,131 @@
+"""Conditional GET en fragment-caching voor gerenderde pagina's.
+
+* ``conditional(version)`` zet een ETag en Last-Modified op een view,
+  berekend uit een goedkope versiestempel (zie ``dashboard_version`` en
+  co. in ``app.queries``). Stuurt de browser dezelfde ETag terug, dan volgt
+  een 304 zonder de pagina-queries en zonder te renderen.
+* ``project_card`` (template-global) cachet gerenderde projectkaarten per
+  ``(template, project, revision)``. Elke schrijfactie op een project of een
+  van zijn updates hoogt ``Project.revision`` op; oude entries worden dus
+  nooit meer gelezen en verdwijnen via TTL/LRU.
+"""
+import hashlib
+from functools import wraps
+from flask import current_app, make_response, render_template, request, session
+from flask_login import current_user
+from markupsafe import Markup
+from app.store import MemoryStore, shared_store
+
+
+def conditional(version):
+    """View-decorator; ``version(**view_args)`` geeft ``(stempel, last_modified)`` of None"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            stamp = version(**kwargs)
+            if stamp is None:
+                return view(**kwargs)
+
+            parts, last_modified = stamp
+            etag = _etag(parts)
+            if _not_modified(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+                if last_modified:
+                    response.last_modified = last_modified
+            return _validators(response, etag)
+        return wrapper
+    return decorator
+
+
+def async_conditional(version):
+    """``conditional`` voor async views (``app.async_views``); ``version`` is ook een coroutine"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(session, **kwargs):
+            stamp = await version(session, **kwargs)
+            if stamp is None:
+                return await view(session, **kwargs)
+
+            parts, last_modified = stamp
+            etag = _etag(parts)
+            if _not_modified(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(await view(session, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if last_modified:
+                    response.last_modified = last_modified
+            return _validators(response, etag)
+        return wrapper
+    return decorator
+
+
+def _not_modified(etag):
+    # Alleen If-None-Match: de ETag hoort bij gebruiker en URL, Last-Modified niet.
+    # Openstaande flash-berichten moeten getoond worden, dus dan altijd renderen.
+    return request.if_none_match.contains_weak(etag) and not session.get('_flashes')
+
+
+def _validators(response, etag):
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+
+def _etag(parts):
+    key = (current_app.config.get('RELEASE_VERSION'), current_user.get_id(), current_user.role,
+           request.full_path, parts)
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+class FragmentCache:
+    """Gerenderde HTML-fragmenten, lokaal (LRU) of in de gedeelde store"""
+
+    prefix = 'fragment:'
+
+    def __init__(self):
+        self.backend = 'none'
+        self.ttl = 3600
+        self._local = None
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.backend = app.config.get('FRAGMENT_CACHE_BACKEND', 'local')
+        self.ttl = app.config.get('FRAGMENT_CACHE_TTL', 3600)
+        self._local = MemoryStore(max_entries=app.config.get('FRAGMENT_CACHE_SIZE', 4096))
+        app.add_template_global(self.project_card)
+
+    def _store(self):
+        return shared_store() if self.backend == 'shared' else self._local
+
+    def render(self, key, template, **context):
+        if self.backend == 'none':
+            return Markup(render_template(template, **context))
+
+        key = f'{self.prefix}{current_app.config.get("RELEASE_VERSION")}:{key}'
+        html = self._store().get(key)
+        if html is not None:
+            self.hits += 1
+            return Markup(html.decode() if isinstance(html, bytes) else html)
+
+        self.misses += 1
+        html = render_template(template, **context)
+        self._store().set(key, html, ex=self.ttl)
+        return Markup(html)
+
+    def project_card(self, template, project):
+        """Eén projectkaart, gecachet op de revisie van het project"""
+        return self.render(f'{template}:{project.id}:{project.revision}', template, project=project)
+
+    def stats(self):
+        return {'backend': self.backend, 'hits': self.hits, 'misses': self.misses}
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,702 @@
+"""Flask CLI commando's (``flask <commando>``)"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+
+def register_commands(app):
+    app.cli.add_command(check_query_plans)
+    app.cli.add_command(check_query_counts)
+    app.cli.add_command(bench_hashing)
+    app.cli.add_command(activity_cli)
+    app.cli.add_command(import_clients_command)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(check_replica_routing_command)
+    app.cli.add_command(check_async_routes_command)
+    app.cli.add_command(bench_startup)
+    app.cli.add_command(loadtest_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(purge_cli)
+    app.cli.add_command(inbox_cli)
+    app.cli.add_command(attachments_cli)
+
+
+@click.command('check-query-plans')
+@click.option('-v', '--verbose', is_flag=True, help='Toon het volledige plan van elke query.')
+@click.option('--yes-drop', is_flag=True, help='Ook een niet-tijdelijke TEST_DATABASE_URL leeggooien.')
+def check_query_plans(verbose, yes_drop):
+    """Faal als een route-query een volledige tabelscan of een sortering zonder index doet.
+
+    Draait tegen de testdatabase (TEST_DATABASE_URL, standaard SQLite in het
+    geheugen). Zet TEST_DATABASE_URL op een Postgres-database om ook de
+    Postgres-plannen te controleren; die wordt leeggegooid, dus dan is
+    --yes-drop nodig.
+    """
+    from app import create_app
+    from app.query_plans import check_route_queries, ensure_disposable
+    from config import config
+
+    try:
+        # Vóór create_app: die maakt in de testconfig de tabellen al aan
+        ensure_disposable(config['testing'].SQLALCHEMY_DATABASE_URI, yes_drop)
+        results = check_route_queries(create_app('testing'), allow_drop=yes_drop)
+    except RuntimeError as error:
+        raise click.ClickException(str(error))
+    failures = [result for result in results if not result.ok]
+
+    for result in results:
+        status = 'OK  ' if result.ok else 'SCAN' if result.full_scans else 'SORT'
+        click.echo(f'{status} {result.endpoint:28} {_one_line(result.statement)[:100]}')
+        for step in result.full_scans:
+            click.echo(f'       volledige scan: {step}')
+        for step in result.sorts:
+            click.echo(f'       sortering zonder index: {step}')
+        if verbose:
+            for step in result.plan:
+                click.echo(f'       | {step}')
+
+    click.echo(f'{len(results)} queries gecontroleerd, {len(failures)} met volledige tabelscan of sortering')
+    if failures:
+        raise SystemExit(1)
+
+
+@click.command('check-query-counts')
+@click.option('--rows', default=10, show_default=True, help='Rijen per soort in de tweede run.')
+@click.option('--yes-drop', is_flag=True, help='Ook een niet-tijdelijke TEST_DATABASE_URL leeggooien.')
+def check_query_counts(rows, yes_drop):
+    """Faal als een route bij meer rijen meer queries doet (N+1).
+
+    Draait alle routes van check-query-plans tegen 1 en tegen ROWS rijen
+    per soort (TEST_DATABASE_URL, standaard SQLite in het geheugen).
+    """
+    from app.query_counts import check_query_counts as run_check
+
+    try:
+        results = run_check(rows, allow_drop=yes_drop)
+    except RuntimeError as error:
+        raise click.ClickException(str(error))
+    failures = [result for result in results if not result.ok]
+
+    click.echo(f'     {"endpoint":28} {"1 rij":>6} {f"{rows} rijen":>9}')
+    for result in results:
+        click.echo(f'{"OK  " if result.ok else "N+1 "} {result.endpoint:28} {result.few:>6} {result.many:>9}')
+
+    click.echo(f'{len(results)} endpoints gecontroleerd, {len(failures)} met meer queries bij meer rijen')
+    if failures:
+        raise SystemExit(1)
+
+
+@click.command('bench-hashing')
+@click.option('--pool-sizes', default='0,1,2,4', show_default=True, help='Komma-gescheiden pool sizes (0 = inline).')
+@click.option('--logins', default=200, show_default=True, help='Aantal logins per meting.')
+@click.option('--concurrency', default=16, show_default=True, help='Gelijktijdige request-threads.')
+@click.option('--iterations', type=int, help='PBKDF2-iteraties (standaard uit de config).')
+def bench_hashing(pool_sizes, logins, concurrency, iterations):
+    """Meet login-doorvoer (wachtwoordcontroles per seconde) per pool size."""
+    from app.hashing import PasswordHasher, HashingBusy
+
+    iterations = iterations or current_app.config.get('PASSWORD_HASH_ITERATIONS')
+    click.echo(f'{logins} logins, {concurrency} threads, {iterations or "standaard"} iteraties')
+    click.echo(f'{"pool":>6} {"logins/s":>10} {"busy":>6} {"p95 ms":>8}')
+
+    for size in [int(part) for part in pool_sizes.split(',')]:
+        hasher = PasswordHasher(iterations, pool_size=size, max_queue=concurrency, timeout=60)
+        pwhash = hasher.hash('benchmark-wachtwoord')
+        hasher.check(pwhash, 'benchmark-wachtwoord')  # pool opwarmen
+
+        def login(_):
+            start = time.perf_counter()
+            try:
+                hasher.check(pwhash, 'benchmark-wachtwoord')
+            except HashingBusy:
+                return None
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as threads:
+            timings = list(threads.map(login, range(logins)))
+        elapsed = time.perf_counter() - start
+        hasher.shutdown()
+
+        done = sorted(t for t in timings if t is not None)
+        p95 = done[int(len(done) * 0.95) - 1] * 1000 if done else 0
+        click.echo(f'{size:>6} {len(done) / elapsed:>10.1f} {len(timings) - len(done):>6} {p95:>8.1f}')
+
+
+activity_cli = AppGroup('activity', help='Gedenormaliseerde projectactiviteit.')
+
+
+@activity_cli.command('backfill')
+@click.option('--batch-size', default=1000, show_default=True, help='Projecten per transactie.')
+def activity_backfill(batch_size):
+    """Herbereken update-tellers en laatste activiteit voor alle projecten."""
+    from sqlalchemy import func
+    from app.models import db, Project
+    from app.activity import refresh_statement
+
+    max_id = db.session.query(func.max(Project.id)).scalar() or 0
+    for start in range(1, max_id + 1, batch_size):
+        end = start + batch_size - 1
+        result = db.session.execute(refresh_statement(id_range=(start, end)))
+        db.session.commit()
+        click.echo(f'projecten {start}-{min(end, max_id)}: {result.rowcount} bijgewerkt')
+
+
+@activity_cli.command('verify')
+@click.option('--limit', default=20, show_default=True, help='Maximaal aantal afwijkingen om te tonen.')
+def activity_verify(limit):
+    """Controleer of de opgeslagen activiteit klopt; faalt bij afwijkingen."""
+    from app.models import db
+    from app.activity import mismatches_query
+
+    rows = db.session.execute(mismatches_query()).all()
+    for row in rows[:limit]:
+        click.echo(f'project {row.id}: {row.update_count} opgeslagen, {row.actual_count} werkelijk')
+
+    click.echo(f'{len(rows)} projecten wijken af')
+    if rows:
+        raise SystemExit(1)
+
+
+@click.command('import-clients')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--freelancer', 'freelancer_email', required=True, help='Email van de freelancer.')
+def import_clients_command(csv_file, freelancer_email):
+    """Importeer (email, project)-regels uit CSV_FILE voor een freelancer."""
+    from app.models import User
+    from app.projects.importer import parse_csv, import_clients, InvalidImportFile
+
+    freelancer = User.query.filter_by(email=freelancer_email.lower(), role='freelancer').first()
+    if freelancer is None:
+        raise click.ClickException(f'Geen freelancer met email {freelancer_email}')
+
+    try:
+        rows = parse_csv(csv_file, current_app.config['IMPORT_MAX_ROWS'])
+    except InvalidImportFile as error:
+        raise click.ClickException(str(error))
+
+    results = import_clients(freelancer.id, rows)
+    for row in results:
+        message = f': {row.message}' if row.message else ''
+        click.echo(f'regel {row.line:>5}  {row.email:40} {row.status}{message}')
+
+    failed = sum(1 for row in results if not row.ok)
+    click.echo(f'{len(results) - failed} geïmporteerd, {failed} fouten')
+
+
+@click.command('check-replica-routing')
+def check_replica_routing_command():
+    """Controleer de read-replica-routing met drie lokale SQLite-databases.
+
+    Leesrequests moeten van een replica komen; writes, het request direct
+    na een write en ``@use_primary``-views van de primary.
+    """
+    import tempfile
+    from app.replica_check import check_replica_routing
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = check_replica_routing(directory)
+
+    for result in results:
+        click.echo(f'{"OK  " if result.ok else "FOUT"} {result.name:48} {result.detail}')
+
+    failures = [result for result in results if not result.ok]
+    if failures:
+        raise SystemExit(f'{len(failures)} van {len(results)} controles mislukt')
+    click.echo(f'{len(results)} controles geslaagd')
+
+
+@click.command('check-async-routes')
+def check_async_routes_command():
+    """Controleer of de async views (ASGI-modus) dezelfde status en ETag geven als de sync views.
+
+    Per rol (freelancer en client), dus ook de 403 bij een pagina voor de andere rol.
+    """
+    import tempfile
+    from app.async_check import check_async_routes
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = check_async_routes(directory)
+
+    for result in results:
+        click.echo(f'{"OK  " if result.ok else "FOUT"} {result.name:48} {result.detail}')
+
+    failures = [result for result in results if not result.ok]
+    if failures:
+        raise SystemExit(f'{len(failures)} van {len(results)} controles mislukt')
+    click.echo(f'{len(results)} controles geslaagd')
+
+
+@click.command('bench-startup')
+@click.option('--runs', default=5, show_default=True, help='Verse processen per modus (mediaan).')
+@click.option('--mode', type=click.Choice(['lazy', 'eager', 'both']), default='both', show_default=True)
+@click.option('--top', default=15, show_default=True, help='Aantal packages en modules in de importtijd-tabel.')
+@click.option('--max-boot-ms', type=float, help='Faal als de boot-tijd (mediaan) hierboven ligt.')
+def bench_startup(runs, mode, top, max_boot_ms):
+    """Meet boot-tijd en tijd tot het eerste request van ``run:app``.
+
+    Faalt ook als een worker met LAZY_LOADING bij het opstarten toch
+    modules uit ``LAZY_MODULES`` laadt.
+    """
+    import tempfile
+    from app.startup_profile import prepare_database, measure, by_package, LAZY_MODULES
+
+    modes = ['eager', 'lazy'] if mode == 'both' else [mode]
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = prepare_database(os.path.join(directory, 'startup.db'))
+        results = [measure(database_url, name, runs=runs) for name in modes]
+
+    for result in results:
+        click.echo(f'\n{result.mode}: importtijd per package (eigen tijd)')
+        for package, seconds in by_package(result.imports)[:top]:
+            click.echo(f'  {seconds * 1000:8.1f} ms  {package}')
+        click.echo(f'{result.mode}: traagste modules (cumulatief)')
+        slowest = sorted(result.imports.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (_, cumulative) in slowest[:top]:
+            click.echo(f'  {cumulative * 1000:8.1f} ms  {name}')
+
+    click.echo(f'\n{"modus":8} {"boot ms":>9} {"1e request ms":>14} {"status":>7}')
+    failures = []
+    for result in results:
+        click.echo(f'{result.mode:8} {result.boot * 1000:9.1f} {result.first_request * 1000:14.1f} {result.status:7}')
+        if not result.ok:
+            failures.append(f'{result.mode}: status {result.status}, geladen bij boot: '
+                            f'{", ".join(result.loaded) or "-"} (verwacht lazy: {", ".join(LAZY_MODULES)})')
+        if max_boot_ms is not None and result.boot * 1000 > max_boot_ms:
+            failures.append(f'{result.mode}: boot {result.boot * 1000:.0f} ms > {max_boot_ms:.0f} ms')
+
+    if failures:
+        raise SystemExit('\n'.join(failures))
+
+
+
+loadtest_cli = AppGroup('loadtest', help='Synthetische data en belastingstests.')
+
+
+@loadtest_cli.command('seed')
+@click.option('--freelancers', default=100, show_default=True)
+@click.option('--clients', default=1000, show_default=True)
+@click.option('--projects', 'projects_per_freelancer', default=20, show_default=True, help='Projecten per freelancer.')
+@click.option('--updates', 'updates_per_project', default=50, show_default=True,
+              help='Gemiddeld aantal updates per project (0 tot 2x dit aantal).')
+@click.option('--invites', 'invites_per_freelancer', default=2, show_default=True, help='Open uitnodigingen per freelancer.')
+@click.option('--prefix', default='seed', show_default=True, help='Voorvoegsel van gebruikersnamen en e-mailadressen.')
+@click.option('--seed', 'random_seed', default=0, show_default=True, help='Seed voor de random-generator.')
+@click.option('--yes', is_flag=True, help='Niet om bevestiging vragen.')
+def loadtest_seed(freelancers, clients, projects_per_freelancer, updates_per_project, invites_per_freelancer,
+                  prefix, random_seed, yes):
+    """Vul de database van deze config met synthetische data (bulk-inserts)."""
+    from app.models import db
+    from app.search import rebuild
+    from app.seed import generate, SEED_PASSWORD
+
+    uri = current_app.config['SQLALCHEMY_DATABASE_URI']
+    if not yes:
+        click.confirm(f'Synthetische data toevoegen aan {db.engine.url.render_as_string(hide_password=True)}?',
+                      abort=True)
+
+    def progress(step, done, total):
+        click.echo(f'\r{step}: {done}/{total}', nl=done >= total)
+
+    start = time.perf_counter()
+    counts = generate(freelancers, clients, projects_per_freelancer, updates_per_project, invites_per_freelancer,
+                      prefix=prefix, seed=random_seed, progress=progress)
+    click.echo(f'{counts.users} gebruikers, {counts.projects} projecten, {counts.relations} relaties, '
+               f'{counts.invites} uitnodigingen en {counts.updates} updates in {time.perf_counter() - start:.1f}s')
+
+    start = time.perf_counter()
+    rebuild(db.session, progress=progress)
+    click.echo(f'zoekindex opgebouwd in {time.perf_counter() - start:.1f}s')
+    click.echo(f'inloggen als {prefix}-freelancer-0@example.com met wachtwoord {SEED_PASSWORD}'
+               f'{" (" + uri + ")" if uri.startswith("sqlite") else ""}')
+
+
+@loadtest_cli.command('run')
+@click.option('--users', default=8, show_default=True, help='Gelijktijdige virtuele gebruikers.')
+@click.option('--iterations', default=20, show_default=True, help='Rondes dashboard → detail → update per gebruiker.')
+@click.option('--freelancers', type=int, help='Aantal geseede freelancers om over te verdelen (standaard: één per gebruiker).')
+@click.option('--prefix', default='seed', show_default=True)
+@click.option('--url', help='Test een draaiende server (bijv. http://127.0.0.1:8000) in plaats van de test client.')
+@click.option('--gunicorn', 'start_gunicorn', is_flag=True, help='Start zelf gunicorn tegen de database van deze config.')
+@click.option('--uvicorn', 'start_uvicorn', is_flag=True, help='Start zelf de ASGI-modus (uvicorn) tegen deze database.')
+@click.option('--workers', default=2, show_default=True, help='Serverprocessen (met --gunicorn/--uvicorn).')
+@click.option('--threads', default=8, show_default=True, help='Threads per proces voor sync views (met --gunicorn/--uvicorn).')
+@click.option('--save', 'save_path', type=click.Path(dir_okay=False), help='Bewaar het resultaat als baseline (JSON).')
+@click.option('--compare', 'compare_path', type=click.Path(exists=True, dir_okay=False), help='Vergelijk met een baseline.')
+@click.option('--max-regression', type=float, help='Faal als een p95 meer dan dit percentage slechter is dan de baseline.')
+def loadtest_run(users, iterations, freelancers, prefix, url, start_gunicorn, start_uvicorn, workers, threads,
+                 save_path, compare_path, max_regression):
+    """Draai login → dashboard → detail → add_update en rapporteer p50/p95/p99."""
+    from app.loadtest import TestClientDriver, HttpDriver, run, wait_for_server, save_baseline, compare
+    from app.throttle import throttle
+
+    server = None
+    kind = 'uvicorn' if start_uvicorn else 'gunicorn' if start_gunicorn else None
+    if kind:
+        url, server = _start_server(kind, workers, threads)
+    try:
+        if url:
+            if server:
+                wait_for_server(url, server)
+            result = run(lambda: HttpDriver(url), kind or 'http', users, iterations,
+                         prefix=prefix, freelancers=freelancers)
+        else:
+            app = current_app._get_current_object()
+            # Alle virtuele gebruikers loggen in vanaf hetzelfde adres; de test meet de app, niet de limieten
+            app.config['THROTTLE_BACKEND'] = 'none'
+            throttle.init_app(app)
+            result = run(lambda: TestClientDriver(app), 'test-client', users, iterations,
+                         prefix=prefix, freelancers=freelancers)
+    finally:
+        if server:
+            _stop_server(server)
+
+    summary = result.as_dict()
+    click.echo(f'{result.driver}: {users} gebruikers x {iterations} rondes, {result.requests} requests '
+               f'in {result.elapsed:.1f}s ({summary["throughput_rps"]} req/s)')
+    click.echo(f'{"stap":12} {"aantal":>7} {"fout":>5} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"req/s":>8}')
+    for name, step in summary['steps'].items():
+        click.echo(f'{name:12} {step["count"]:7} {step["errors"]:5} {step["p50_ms"]:8.1f} {step["p95_ms"]:8.1f} '
+                   f'{step["p99_ms"]:8.1f} {step["rps"]:8.1f}')
+
+    failures = [f'{name}: {step["errors"]} fouten' for name, step in summary['steps'].items() if step['errors']]
+    if compare_path:
+        baseline, rows = compare(result, compare_path)
+        click.echo(f'\nt.o.v. baseline {baseline.get("commit") or "?"} ({baseline["driver"]}, {baseline["created_at"]}):')
+        for name, old, new, change in rows:
+            click.echo(f'{name:12} p95 {old:8.1f} → {new:8.1f} ms ({change:+.0f}%)')
+            if max_regression is not None and change > max_regression:
+                failures.append(f'{name}: p95 {change:+.0f}% (max {max_regression:+.0f}%)')
+
+    if save_path:
+        save_baseline(result, save_path)
+        click.echo(f'baseline bewaard in {save_path}')
+    if failures:
+        raise SystemExit('\n'.join(failures))
+
+
+@loadtest_cli.command('capacity')
+@click.option('--server', 'servers', type=click.Choice(['gunicorn', 'uvicorn']), multiple=True,
+              help='Te vergelijken servers (standaard beide).')
+@click.option('--streams', default=64, show_default=True, help='Gelijktijdige SSE-verbindingen.')
+@click.option('--probes', default=20, show_default=True, help='Dashboard-requests naast de open streams.')
+@click.option('--workers', default=2, show_default=True, help='Serverprocessen.')
+@click.option('--threads', default=8, show_default=True, help='Threads per proces (gunicorn: per verbinding; uvicorn: sync views).')
+@click.option('--timeout', default=5, show_default=True, help='Seconden voor een stream of request als mislukt telt.')
+@click.option('--prefix', default='seed', show_default=True)
+@click.option('--save', 'save_path', type=click.Path(dir_okay=False), help='Bewaar de resultaten (JSON).')
+def loadtest_capacity(servers, streams, probes, workers, threads, timeout, prefix, save_path):
+    """Vergelijk hoeveel open verbindingen gunicorn (gthread) en de ASGI-modus aankunnen."""
+    import json
+    from app.loadtest import capacity, wait_for_server
+
+    results = []
+    for kind in servers or ('gunicorn', 'uvicorn'):
+        url, server = _start_server(kind, workers, threads)
+        try:
+            wait_for_server(url, server)
+            results.append(capacity(url, kind, streams, probes, prefix=prefix, timeout=timeout))
+        finally:
+            _stop_server(server)
+
+    click.echo(f'{"server":10} {"streams open":>14} {"dashboard ok":>13} {"p50 ms":>8} {"p95 ms":>8}')
+    for result in results:
+        summary = result.as_dict()['dashboard']
+        click.echo(f'{result.server:10} {result.opened:>6} / {result.streams:<6} '
+                   f'{summary["count"] - summary["errors"]:>6} / {summary["count"]:<5} '
+                   f'{summary["p50_ms"]:8.1f} {summary["p95_ms"]:8.1f}')
+    if save_path:
+        with open(save_path, 'w', encoding='utf-8') as handle:
+            json.dump([result.as_dict() for result in results], handle, indent=2)
+        click.echo(f'resultaten bewaard in {save_path}')
+
+
+def _start_server(kind, workers, threads):
+    """Start gunicorn (gthread) of uvicorn (ASGI-modus) tegen de database van deze config"""
+    import socket
+    import subprocess
+    import sys
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    # LIVE_UPDATES=sse ook onder gunicorn: de capacity-meting gaat juist over open streams
+    env = dict(os.environ, FLASK_ENV='production', SCHEMA_MODE='verify', THROTTLE_BACKEND='none', LIVE_UPDATES='sse',
+               DATABASE_URL=current_app.config['SQLALCHEMY_DATABASE_URI'],
+               WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads), ASGI_SYNC_THREADS=str(threads))
+    if kind == 'uvicorn':
+        command = ['uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                   '--workers', str(workers), '--log-level', 'warning']
+    else:
+        command = ['gunicorn', 'run:app', '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(workers), '--worker-class', 'gthread', '--threads', str(threads)]
+    # Eigen procesgroep, zodat stoppen ook workers en pool-processen meeneemt
+    server = subprocess.Popen([sys.executable, '-m'] + command, env=env, cwd=os.path.dirname(current_app.root_path),
+                              start_new_session=True)
+    return f'http://127.0.0.1:{port}', server
+
+
+def _stop_server(server):
+    import signal
+
+    os.killpg(server.pid, signal.SIGTERM)
+    server.wait()
+
+
+jobs_cli = AppGroup('jobs', help='Achtergrondjobs (mail, verloopronde).')
+
+
+@jobs_cli.command('work')
+@click.option('--once', is_flag=True, help='Eén ronde draaien en stoppen.')
+@click.option('--batch-size', type=int, help='Jobs per claim (standaard JOBS_BATCH_SIZE).')
+def jobs_work(once, batch_size):
+    """Start een worker die jobs en periodieke taken uitvoert (stopt netjes op SIGTERM)."""
+    import signal
+    from app.jobs import Worker
+
+    worker = Worker(current_app._get_current_object(), batch_size=batch_size)
+    if once:
+        click.echo(f'{worker.run_once()} jobs uitgevoerd')
+        return
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+@jobs_cli.command('sweep')
+def jobs_sweep():
+    """Markeer verlopen uitnodigingen nu (anders elke INVITE_SWEEP_INTERVAL in de worker)."""
+    from app.invites.tasks import sweep_expired_invites
+
+    click.echo(f'{sweep_expired_invites()} uitnodigingen verlopen')
+
+
+@jobs_cli.command('status')
+def jobs_status():
+    """Aantal jobs per soort en status."""
+    from app.jobs import queue_stats
+
+    stats = queue_stats()
+    for (kind, status), count in sorted(stats.items()):
+        click.echo(f'{kind:24} {status:8} {count:8}')
+    if not stats:
+        click.echo('Geen jobs')
+
+
+@jobs_cli.command('retry-dead')
+@click.option('--kind', help='Alleen jobs van deze soort.')
+def jobs_retry_dead(kind):
+    """Plan definitief mislukte jobs opnieuw in."""
+    from app.jobs import retry_dead
+
+    click.echo(f'{retry_dead(kind)} jobs opnieuw ingepland')
+
+
+archive_cli = AppGroup('archive', help='Archief van afgeronde projecten.')
+
+
+@archive_cli.command('run')
+@click.option('--older-than-days', type=int, help='Niet gewijzigd sinds zoveel dagen (standaard ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=int, help='Projecten per transactie (standaard ARCHIVE_BATCH_SIZE).')
+@click.option('--dry-run', is_flag=True, help='Alleen tellen, niets verplaatsen.')
+def archive_run(older_than_days, batch_size, dry_run):
+    """Verplaats afgeronde projecten met hun updates naar het archief."""
+    from app.archive import archive_projects, count_candidates, cutoff_for
+
+    days = older_than_days if older_than_days is not None else current_app.config['ARCHIVE_AFTER_DAYS']
+    cutoff = cutoff_for(days)
+    if dry_run:
+        click.echo(f'{count_candidates(cutoff)} projecten afgerond en niet gewijzigd sinds {cutoff:%d-%m-%Y}')
+        return
+    stats = archive_projects(cutoff, batch_size)
+    click.echo(f'{stats.projects} projecten met {stats.updates} updates gearchiveerd in {stats.batches} batches')
+
+
+@archive_cli.command('restore')
+@click.argument('project_id', type=int)
+def archive_restore(project_id):
+    """Zet een gearchiveerd project met al zijn updates terug."""
+    from app.archive import restore_project
+
+    try:
+        updates = restore_project(project_id)
+    except (LookupError, ValueError) as error:
+        raise click.ClickException(str(error))
+    click.echo(f'Project {project_id} teruggezet met {updates} updates')
+
+
+@archive_cli.command('status')
+def archive_status():
+    """Omvang van het archief."""
+    from app.archive import archive_stats
+
+    projects, updates, size = archive_stats()
+    click.echo(f'{projects} projecten, {updates} updates, {size / 1024:.1f} KiB gecomprimeerd')
+
+
+purge_cli = AppGroup('purge', help='Opruimen van verwijderde projecten.')
+
+
+@purge_cli.command('run')
+@click.option('--project-id', type=int, help='Alleen dit project.')
+@click.option('--batch-size', type=int, help='Updates per transactie (standaard PURGE_BATCH_SIZE).')
+def purge_run(project_id, batch_size):
+    """Verwijder verwijderde projecten met hun updates definitief (hervat waar een vorige run stopte)."""
+    from app.purge import PurgeStats, purge_deleted, purge_project
+
+    def progress(project_id, done, remaining):
+        click.echo(f'project {project_id}: {done} updates verwijderd, {remaining} over')
+
+    if project_id:
+        stats = purge_project(project_id, batch_size, progress, PurgeStats())
+    else:
+        stats = purge_deleted(batch_size, progress)
+    click.echo(f'{stats.projects} projecten opgeruimd: {stats.updates} updates in {stats.batches} batches, '
+               f'{stats.invites} uitnodigingen ontkoppeld, {stats.inbox_items} inbox-items en '
+               f'{stats.attachments} bijlagen verwijderd')
+
+
+@purge_cli.command('status')
+def purge_status():
+    """Verwijderde projecten die nog opgeruimd moeten worden."""
+    from app.purge import pending_purges
+
+    rows = pending_purges()
+    for project_id, name, deleted_at, remaining in rows:
+        click.echo(f'{project_id:>8}  {deleted_at:%d-%m-%Y %H:%M}  {remaining:>8} updates over  {name}')
+    click.echo(f'{len(rows)} projecten wachten op opruimen')
+
+
+inbox_cli = AppGroup('inbox', help='Activiteiten-inbox per gebruiker.')
+
+
+@inbox_cli.command('rebuild')
+@click.option('--batch-size', default=10000, show_default=True, help='Bronrijen per transactie.')
+def inbox_rebuild(batch_size):
+    """Bouw alle inboxen opnieuw op uit projecten, updates en uitnodigingen."""
+    from app.inbox import rebuild
+
+    def progress(table, done, total):
+        click.echo(f'{table}: {done}/{total}')
+
+    rebuild(batch_size, progress)
+    click.echo('Inboxen opnieuw opgebouwd')
+
+
+attachments_cli = AppGroup('attachments', help='Bijlagen en de blob store.')
+
+
+@attachments_cli.command('gc')
+@click.option('--grace', type=int, help='Alleen blobs die zoveel seconden niet gebruikt zijn (standaard ATTACHMENT_GC_GRACE).')
+def attachments_gc(grace):
+    """Verwijder blobs waar geen bijlage meer naar wijst."""
+    from app.attachments import collect_garbage
+
+    click.echo(f'{collect_garbage(grace)} blobs verwijderd')
+
+
+@attachments_cli.command('stats')
+def attachments_stats():
+    """Aantal bijlagen en hoeveel opslag deduplicatie scheelt."""
+    from sqlalchemy import func, select
+    from app.models import db, Attachment, Blob
+
+    count, total = db.session.execute(select(func.count(Attachment.id), func.coalesce(func.sum(Attachment.size), 0))).one()
+    blobs, stored = db.session.execute(select(func.count(Blob.sha256), func.coalesce(func.sum(Blob.size), 0))).one()
+    click.echo(f'{count} bijlagen ({total / 1024 / 1024:.1f} MiB), {blobs} blobs ({stored / 1024 / 1024:.1f} MiB opgeslagen)')
+
+
+search_cli = AppGroup('search', help='Full-text zoekindex.')
+
+
+@search_cli.command('rebuild')
+@click.option('--batch-size', default=10000, show_default=True, help='Rijen per transactie.')
+def search_rebuild(batch_size):
+    """Bouw de zoekindex opnieuw op uit projecten en updates."""
+    from app.models import db
+    from app.search import rebuild
+
+    def progress(table, done, total):
+        click.echo(f'{table}: {done}/{total}')
+
+    rebuild(db.session, batch_size, progress)
+    click.echo('Zoekindex opnieuw opgebouwd')
+
+
+@search_cli.command('bench')
+@click.option('--updates', default=1000000, show_default=True, help='Aantal synthetische updates.')
+@click.option('--queries', default=100, show_default=True, help='Aantal zoekopdrachten om te meten.')
+@click.option('--yes-drop', is_flag=True, help='Ook een niet-tijdelijke TEST_DATABASE_URL leeggooien.')
+def search_bench(updates, queries, yes_drop):
+    """Meet zoeklatency op een testdatabase met veel updates.
+
+    Vult de testdatabase (TEST_DATABASE_URL, standaard SQLite in het
+    geheugen) met synthetische data, bouwt de index en meet p50/p95/p99.
+    De database wordt leeggegooid; voor een niet-tijdelijke is --yes-drop nodig.
+    """
+    import random
+    from sqlalchemy import insert
+    from app import create_app
+    from app.models import db, User, Project, Update
+    from app.query_plans import ensure_disposable
+    from app.search import rebuild, search
+    from config import config
+
+    try:
+        # Vóór create_app: die maakt in de testconfig de tabellen al aan
+        ensure_disposable(config['testing'].SQLALCHEMY_DATABASE_URI, yes_drop)
+    except RuntimeError as error:
+        raise click.ClickException(str(error))
+
+    words = ['website', 'logo', 'factuur', 'ontwerp', 'offerte', 'planning', 'feedback', 'deadline',
+             'kleur', 'tekst', 'foto', 'menu', 'server', 'domein', 'email', 'nieuwsbrief', 'campagne',
+             'budget', 'review', 'oplevering', 'bug', 'koppeling', 'betaling', 'contract']
+    rng = random.Random(42)
+
+    app = create_app('testing')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        freelancer = User(username='bench', email='bench@example.com', role='freelancer', password_hash='-')
+        db.session.add(freelancer)
+        db.session.commit()
+
+        project_count = max(1, updates // 1000)
+        db.session.execute(insert(Project), [{
+            'project_name': f'Project {i} {rng.choice(words)}', 'client_name': f'Klant {i}',
+            'description': ' '.join(rng.choices(words, k=12)), 'freelancer_id': freelancer.id,
+        } for i in range(project_count)])
+
+        start = time.perf_counter()
+        for offset in range(0, updates, 10000):
+            db.session.execute(insert(Update), [{
+                'content': ' '.join(rng.choices(words, k=20)),
+                'project_id': rng.randint(1, project_count), 'author_id': freelancer.id,
+            } for _ in range(min(10000, updates - offset))])
+            db.session.commit()
+        click.echo(f'{updates} updates aangemaakt in {time.perf_counter() - start:.1f}s')
+
+        start = time.perf_counter()
+        rebuild(db.session, batch_size=50000)
+        click.echo(f'index opgebouwd in {time.perf_counter() - start:.1f}s')
+
+        timings = []
+        for _ in range(queries):
+            query = ' '.join(rng.sample(words, rng.randint(1, 3)))
+            start = time.perf_counter()
+            search(freelancer, query)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        pick = lambda p: timings[min(len(timings) - 1, int(len(timings) * p))]
+        click.echo(f'{queries} zoekopdrachten: p50 {pick(0.50):.1f} ms, p95 {pick(0.95):.1f} ms, '
+                   f'p99 {pick(0.99):.1f} ms')
+        db.drop_all()
+
+
+def _one_line(statement):
+    return ' '.join(statement.split())
@@ -0,0 +1,81 @@
+"""Engine-instellingen die niet als platte waarde in ``config.py`` passen.
+
+* ``InstrumentedQueuePool`` meet hoe lang requests op een verbinding uit de
+  pool wachten (``db_pool_checkout_wait_seconds``) en telt timeouts; samen
+  met de pool-gauges laat ``/metrics`` zien of de pool te klein is
+* SQLite krijgt WAL-mode, zodat lezers niet op een schrijver wachten
+  (``busy_timeout`` zit in ``connect_args``, zie ``config.engine_options``)
+"""
+import logging
+import sqlite3
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from app.metrics import metrics
+from app.models import db
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool die wachttijd en timeouts bij het uitchecken registreert"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.inc('db_pool_checkout_timeouts_total')
+            raise
+        finally:
+            metrics.observe('db_pool_checkout_wait_seconds', time.perf_counter() - start)
+
+
+# SQLAlchemy logt de pool onder de module van de klasse; net zo stil houden als 'sqlalchemy'
+logging.getLogger(f'{__name__}.{InstrumentedQueuePool.__name__}').setLevel(logging.WARNING)
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+
+def _is_memory_sqlite(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:')
+
+
+def pool_options(uri):
+    """Engine-opties voor de pool; SQLite in het geheugen houdt zijn eigen pool"""
+    return {} if _is_memory_sqlite(uri) else {'poolclass': InstrumentedQueuePool}
+
+
+def init_app(app):
+    """Vóór ``db.init_app``: pool-klasse kiezen en waarschuwen bij een SQLite-fallback"""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    for key, value in pool_options(uri).items():
+        options.setdefault(key, value)
+
+    if app.config.get('SQLITE_FALLBACK'):
+        app.logger.warning('DATABASE_URL ontbreekt: productie draait op SQLite (%s). '
+                           'Alle schrijfacties van alle workers lopen dan na elkaar.', uri)
+
+    for name, attribute, help in (
+        ('db_pool_size', 'size', 'Vaste grootte van de connection pool'),
+        ('db_pool_checked_out', 'checkedout', 'Verbindingen die nu in gebruik zijn'),
+        ('db_pool_overflow', 'overflow', 'Verbindingen boven de vaste poolgrootte'),
+    ):
+        metrics.gauge(name, _pool_gauge(app, attribute), help=help)
+    metrics.describe('db_pool_checkout_wait_seconds', 'Wachttijd op een verbinding uit de pool')
+    metrics.describe('db_pool_checkout_timeouts_total', 'Checkouts die op pool_timeout zijn gestrand')
+
+
+def _pool_gauge(app, attribute):
+    def read():
+        with app.app_context():
+            method = getattr(db.engine.pool, attribute, None)
+            return method() if method else None
+    return read
@@ -0,0 +1,228 @@
+"""Pub/sub voor live updates (Server-Sent Events).
+
+Berichten zijn alleen seintjes ("er is iets nieuw op dit kanaal"). De
+SSE-stream haalt daarna zelf de nieuwe rijen op vanaf zijn cursor, dus een
+gemist of dubbel seintje kost hooguit een extra query en nooit data.
+
+Backends (``EVENTS_BACKEND``):
+
+* ``local``: alleen binnen dit proces; genoeg voor één worker of SQLite
+* ``postgres``: ``NOTIFY`` via de database. Per worker houdt één
+  achtergrondthread een ``LISTEN``-verbinding open en verdeelt de seintjes
+  over de lokale streams, dus niet één databaseverbinding per stream.
+
+Leeg betekent automatisch: ``postgres`` op Postgres, anders ``local``.
+"""
+import asyncio
+import logging
+import os
+import select
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from sqlalchemy import func
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+PG_CHANNEL = 'klantsync_events'
+
+# Kanalen waarvan LocalHub de versie onthoudt (laatst gepubliceerd); oudere vallen weg
+MAX_CHANNELS = 10000
+
+
+def project_channel(project_id):
+    return f'project:{project_id}'
+
+
+def format_event(data, event=None, event_id=None):
+    """Eén SSE-bericht; elke regel van ``data`` krijgt een eigen ``data:``"""
+    lines = []
+    if event_id:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.extend(f'data: {line}' for line in data.splitlines() or [''])
+    return '\n'.join(lines) + '\n\n'
+
+
+class LocalHub:
+    """Versienummer per kanaal; wachtende streams worden gewekt als het verandert
+
+    Sync streams wachten op een Condition (één thread per stream); async
+    streams (ASGI-modus) op een future in hun eigen event loop, zonder thread.
+
+    Er wordt naar elk project gepubliceerd, ook zonder kijkers, dus de
+    versies staan in een LRU van ``max_channels`` kanalen. Valt het kanaal
+    van een wachtende stream eruit, dan ziet die één keer een andere versie
+    en doet hij een extra query; data mist hij niet.
+    """
+
+    def __init__(self, max_channels=MAX_CHANNELS):
+        self._condition = threading.Condition()
+        self._versions = OrderedDict()
+        self._max_channels = max_channels
+        # Eén teller voor alle kanalen: een weggevallen kanaal komt nooit terug op een al geziene versie
+        self._sequence = 0
+        self._futures = defaultdict(set)
+
+    def notify(self, channel):
+        with self._condition:
+            self._sequence += 1
+            self._versions[channel] = self._sequence
+            self._versions.move_to_end(channel)
+            while len(self._versions) > self._max_channels:
+                self._versions.popitem(last=False)
+            self._condition.notify_all()
+            futures = self._futures.pop(channel, ())
+        # notify kan uit elke thread komen (sync view, LISTEN-thread)
+        for loop, future in futures:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def version(self, channel):
+        with self._condition:
+            return self._versions.get(channel, 0)
+
+    def wait(self, channel, seen, timeout):
+        with self._condition:
+            self._condition.wait_for(lambda: self._versions.get(channel, 0) != seen, timeout)
+            return self._versions.get(channel, 0)
+
+    async def wait_async(self, channel, seen, timeout):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._condition:
+            if self._versions.get(channel, 0) != seen:
+                return self._versions.get(channel, 0)
+            self._futures[channel].add((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                waiters = self._futures.get(channel)
+                if waiters is not None:
+                    waiters.discard((loop, future))
+                    if not waiters:
+                        del self._futures[channel]
+        return self.version(channel)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Subscription:
+    def __init__(self, hub, channel):
+        self.hub = hub
+        self.channel = channel
+        self.seen = hub.version(channel)
+
+    def wait(self, timeout):
+        """True als er sinds de vorige keer iets gepubliceerd is"""
+        return self._seen(self.hub.wait(self.channel, self.seen, timeout))
+
+    async def wait_async(self, timeout):
+        """``wait`` voor async streams"""
+        return self._seen(await self.hub.wait_async(self.channel, self.seen, timeout))
+
+    def _seen(self, version):
+        changed = version != self.seen
+        self.seen = version
+        return changed
+
+
+class LocalBackend:
+    def __init__(self):
+        self.hub = LocalHub()
+
+    def publish(self, channel):
+        self.hub.notify(channel)
+
+    def subscribe(self, channel):
+        return Subscription(self.hub, channel)
+
+
+class PostgresBackend:
+    """``NOTIFY`` bij publiceren, één ``LISTEN``-thread per proces"""
+
+    reconnect_delay = 2
+
+    def __init__(self):
+        self.hub = LocalHub()
+        self._engine = None
+        self._listener_pid = None
+        self._lock = threading.Lock()
+
+    def publish(self, channel):
+        with db.engine.connect() as connection:
+            connection.execute(func.pg_notify(PG_CHANNEL, channel).select())
+            connection.commit()
+
+    def subscribe(self, channel):
+        self._ensure_listener()
+        return Subscription(self.hub, channel)
+
+    def _ensure_listener(self):
+        # Per proces starten: threads overleven een fork van gunicorn niet
+        with self._lock:
+            if self._listener_pid != os.getpid():
+                self._engine = db.engine
+                threading.Thread(target=self._listen_forever, name='events-listener', daemon=True).start()
+                self._listener_pid = os.getpid()
+
+    def _connect(self):
+        # Eigen verbinding buiten de pool, zodat LISTEN geen poolplek bezet houdt
+        dialect = self._engine.dialect
+        cargs, cparams = dialect.create_connect_args(self._engine.url)
+        connection = dialect.connect(*cargs, **cparams)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {PG_CHANNEL}')
+        return connection
+
+    def _listen_forever(self):
+        while True:
+            try:
+                connection = self._connect()
+                try:
+                    while True:
+                        if select.select([connection], [], [], 30) == ([], [], []):
+                            continue
+                        connection.poll()
+                        while connection.notifies:
+                            self.hub.notify(connection.notifies.pop(0).payload)
+                finally:
+                    connection.close()
+            except Exception:
+                logger.exception('LISTEN-verbinding verbroken, opnieuw verbinden')
+                time.sleep(self.reconnect_delay)
+
+
+class EventBroker:
+    def __init__(self):
+        self.backend = LocalBackend()
+
+    def init_app(self, app):
+        name = app.config.get('EVENTS_BACKEND')
+        if not name:
+            uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+            name = 'postgres' if uri.startswith('postgresql') else 'local'
+
+        if name == 'postgres':
+            self.backend = PostgresBackend()
+        elif name == 'local':
+            self.backend = LocalBackend()
+        else:
+            raise ValueError(f'Onbekende EVENTS_BACKEND: {name}')
+
+    def publish(self, channel):
+        self.backend.publish(channel)
+
+    def subscribe(self, channel):
+        return self.backend.subscribe(channel)
+
+
+broker = EventBroker()
@@ -0,0 +1,101 @@
+"""Wachtwoord-hashing buiten de request-thread.
+
+PBKDF2 is bewust traag en puur CPU-werk. Met ``PASSWORD_HASH_POOL_SIZE > 0``
+draait het in een process pool, zodat een login-piek niet alle
+gunicorn-threads bezet houdt. De wachtrij is begrensd: zit hij vol, dan
+volgt direct ``HashingBusy`` (503) in plaats van een steeds langere rij.
+Dat geldt ook voor een hash die niet binnen ``PASSWORD_HASH_TIMEOUT`` klaar is.
+
+Het aantal iteraties is per deployment in te stellen. Hashes met andere
+parameters blijven geldig en worden bij de eerstvolgende login opnieuw
+gehasht (``needs_rehash``).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+
+class HashingBusy(Exception):
+    """De hash-wachtrij is vol, of het hashen duurde langer dan ``PASSWORD_HASH_TIMEOUT``"""
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _check(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+class PasswordHasher:
+    def __init__(self, iterations=None, pool_size=0, max_queue=32, timeout=10):
+        self.configure(iterations, pool_size, max_queue, timeout)
+
+    def init_app(self, app):
+        self.configure(
+            iterations=app.config.get('PASSWORD_HASH_ITERATIONS'),
+            pool_size=app.config.get('PASSWORD_HASH_POOL_SIZE', 0),
+            max_queue=app.config.get('PASSWORD_HASH_MAX_QUEUE', 32),
+            timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10),
+        )
+
+    def configure(self, iterations, pool_size, max_queue, timeout):
+        self.iterations = int(iterations or DEFAULT_PBKDF2_ITERATIONS)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.method = f'pbkdf2:sha256:{self.iterations}'
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def check(self, pwhash, password):
+        return self._run(_check, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True als de hash met andere parameters dan de huidige is gemaakt"""
+        return pwhash.split('$', 1)[0] != self.method
+
+    def _run(self, func, *args):
+        if not self.pool_size:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._pool().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Nog in de wachtrij: niet meer uitvoeren; de slot komt vrij via de callback
+            future.cancel()
+            raise HashingBusy() from None
+
+    def _pool(self):
+        # Per proces aanmaken: een pool overleeft een fork van gunicorn niet.
+        # Via forkserver: forken vanuit een proces met threads (gthread, uvicorn)
+        # kan een vastgehouden lock meekopiëren, waarna de pool-processen blijven hangen.
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.pool_size,
+                                                     mp_context=multiprocessing.get_context('forkserver'))
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown()
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
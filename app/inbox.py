@@ -0,0 +1,173 @@
+"""Activiteiten-inbox per gebruiker, gevuld bij het schrijven (fan-out on write).
+
+Een client met projecten bij meerdere freelancers wil één "wat is er
+nieuw"-overzicht. Dat bij het lezen samenstellen betekent de updatestromen
+van al zijn projecten samenvoegen. In plaats daarvan krijgt elke ontvanger
+bij het schrijven een eigen rij in ``inbox_items``: de feed is één
+indexscan op ``(user_id, created_at, id)`` en het aantal ongelezen items
+komt uit een partiële index.
+
+* ``update_posted``: nieuwe updates → de andere partij van het project
+* ``project_changed``: project aangemaakt of bewerkt → de client
+  (``projects_created`` voor een bulk-import)
+* ``invite_accepted``: uitnodiging geaccepteerd → de freelancer
+
+Deze functies voegen de rijen toe in de transactie van de wijziging;
+committen doet de aanroeper. ``rebuild`` bouwt alle inboxen opnieuw op
+uit projecten, updates en uitnodigingen; bewerkingen staan nergens in de
+geschiedenis, dus ``project_updated``-items blijven daarbij staan.
+"""
+from datetime import datetime
+from sqlalchemy import bindparam, delete, func, insert, literal, null, select, update
+from app.models import db, Project, Update, ClientInvite, InboxItem, User
+
+SUMMARY_LENGTH = 200
+
+COLUMNS = ('user_id', 'kind', 'actor_id', 'project_id', 'ref_id', 'project_name', 'summary', 'created_at')
+
+
+def _recipients(project, actor_id):
+    return [user_id for user_id in dict.fromkeys((project.freelancer_id, project.client_id))
+            if user_id is not None and user_id != actor_id]
+
+
+def _summary(text):
+    text = ' '.join((text or '').split())
+    return text if len(text) <= SUMMARY_LENGTH else text[:SUMMARY_LENGTH - 1] + '…'
+
+
+def _add(rows):
+    if rows:
+        db.session.execute(insert(InboxItem), rows)
+
+
+def update_posted(project, updates):
+    """Nieuwe updates van één project (na ``record_update``/``record_updates``)"""
+    if any(row.id is None for row in updates):
+        db.session.flush()
+    _add([{
+        'user_id': user_id, 'kind': 'update', 'actor_id': row.author_id, 'project_id': project.id,
+        'ref_id': row.id, 'project_name': project.project_name, 'summary': _summary(row.content),
+        'created_at': row.created_at,
+    } for row in updates for user_id in _recipients(project, row.author_id)])
+
+
+def project_changed(project, kind, actor_id):
+    """``project_created`` of ``project_updated``"""
+    if project.id is None:
+        db.session.flush()
+    _add([{
+        'user_id': user_id, 'kind': kind, 'actor_id': actor_id, 'project_id': project.id,
+        'ref_id': project.id, 'project_name': project.project_name, 'created_at': datetime.utcnow(),
+    } for user_id in _recipients(project, actor_id)])
+
+
+def projects_created(actor_id, projects, created_at):
+    """``project_created`` voor een bulk-import: ``(project_id, project_name, client_id)`` per project"""
+    _add([{
+        'user_id': client_id, 'kind': 'project_created', 'actor_id': actor_id, 'project_id': project_id,
+        'ref_id': project_id, 'project_name': project_name, 'created_at': created_at,
+    } for project_id, project_name, client_id in projects if client_id is not None and client_id != actor_id])
+
+
+def invite_accepted(invite, client):
+    project = invite.project if invite.project_id and invite.project.deleted_at is None else None
+    _add([{
+        'user_id': invite.freelancer_id, 'kind': 'invite_accepted', 'actor_id': client.id,
+        'project_id': project.id if project else None, 'ref_id': invite.id,
+        'project_name': project.project_name if project else None, 'created_at': datetime.utcnow(),
+    }])
+
+
+def mark_read(user):
+    """Markeer alle ongelezen items van ``user`` als gelezen; geeft het aantal"""
+    return db.session.execute(
+        update(InboxItem).where(InboxItem.user_id == user.id, InboxItem.read_at.is_(None))
+        .values(read_at=datetime.utcnow()).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+# --- Opnieuw opbouwen -----------------------------------------------------------
+
+# Bewerkingen van een project staan nergens in de geschiedenis: die items blijven bij een rebuild staan
+KEPT_KINDS = ('project_updated',)
+
+
+def _update_rows(start, end):
+    """Items voor de updates in een id-bereik; de samenvatting via ``_summary``, net als bij het schrijven"""
+    rows = db.session.execute(
+        select(Update.id, Update.author_id, Update.project_id, Update.content, Update.created_at, Project.project_name,
+               Project.freelancer_id, Project.client_id)
+        .join(Project, Project.id == Update.project_id)
+        .where(Update.id.between(start, end), Project.deleted_at.is_(None))
+    ).all()
+    _add([{
+        'user_id': user_id, 'kind': 'update', 'actor_id': row.author_id, 'project_id': row.project_id,
+        'ref_id': row.id, 'project_name': row.project_name, 'summary': _summary(row.content),
+        'created_at': row.created_at,
+    } for row in rows for user_id in _recipients(row, row.author_id)])
+
+
+def _insert_from(statement, id_column):
+    def fill(start, end):
+        db.session.execute(insert(InboxItem).from_select(COLUMNS, statement.where(id_column.between(start, end))))
+    return fill
+
+
+def _sources():
+    """Per brontabel het id en een functie die de items voor een id-bereik toevoegt"""
+    projects = (
+        select(Project.client_id, literal('project_created'), Project.freelancer_id, Project.id, Project.id,
+               Project.project_name, null(), Project.created_at)
+        .where(Project.client_id.is_not(None), Project.deleted_at.is_(None))
+    )
+    invites = (
+        select(ClientInvite.freelancer_id, literal('invite_accepted'), User.id, Project.id,
+               ClientInvite.id, Project.project_name, null(), ClientInvite.updated_at)
+        .join(User, User.email == func.lower(ClientInvite.email))
+        .outerjoin(Project, (Project.id == ClientInvite.project_id) & Project.deleted_at.is_(None))
+        .where(ClientInvite.status == 'accepted')
+    )
+    return {
+        'updates': (Update.id, _update_rows),
+        'projects': (Project.id, _insert_from(projects, Project.id)),
+        'invites': (ClientInvite.id, _insert_from(invites, ClientInvite.id)),
+    }
+
+
+def rebuild(batch_size=10000, progress=None):
+    """Gooi alle inboxen leeg en bouw ze in batches opnieuw op uit de geschiedenis
+
+    Wat een gebruiker al gelezen had (tot zijn laatst gelezen item), blijft gelezen.
+    ``project_updated``-items zijn niet af te leiden en blijven staan, behalve
+    die van verwijderde projecten.
+    """
+    read_until = db.session.execute(
+        select(InboxItem.user_id, func.max(InboxItem.created_at))
+        .where(InboxItem.read_at.is_not(None)).group_by(InboxItem.user_id)
+    ).all()
+    live_projects = select(Project.id).where(Project.deleted_at.is_(None))
+    db.session.execute(delete(InboxItem).where(
+        InboxItem.kind.not_in(KEPT_KINDS) | InboxItem.project_id.is_(None) | InboxItem.project_id.not_in(live_projects)
+    ))
+    db.session.commit()
+
+    for name, (id_column, fill) in _sources().items():
+        max_id = db.session.execute(select(func.max(id_column))).scalar() or 0
+        for start in range(1, max_id + 1, batch_size):
+            end = start + batch_size - 1
+            fill(start, end)
+            db.session.commit()
+            if progress:
+                progress(name, min(end, max_id), max_id)
+
+    if read_until:
+        db.session.connection().execute(
+            InboxItem.__table__.update().where(
+                InboxItem.__table__.c.user_id == bindparam('reader'),
+                InboxItem.__table__.c.created_at <= bindparam('until'),
+                InboxItem.__table__.c.read_at.is_(None),
+            ).values(read_at=datetime.utcnow()),
+            [{'reader': user_id, 'until': until} for user_id, until in read_until],
+        )
+        db.session.commit()
@@ -0,0 +1,129 @@
+"""Metingen per request: queries, SQL-tijd, rendertijd en totale duur.
+
+Per endpoint (``projects.detail``, ``main.dashboard``, ...) komen er vier
+histogrammen in ``/metrics``:
+
+* ``http_request_duration_seconds``: van request-start tot de response
+  terug is bij Flask (bij gestreamde responses dus tot de headers)
+* ``http_request_queries``: aantal SQL-statements
+* ``http_request_sql_seconds``: tijd in de database
+* ``http_request_render_seconds``: tijd in ``render_template``
+
+Statements die langer duren dan ``SLOW_QUERY_MS`` gaan genormaliseerd (zonder
+waarden) naar de log ``app.instrumentation``, met het endpoint dat ze deed.
+"""
+import logging
+import re
+import time
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask import before_render_template, request_finished, request_started, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s")
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+def normalize_statement(statement):
+    """SQL op één regel, met letterlijke waarden en IN-lijsten als ``?``"""
+    statement = ' '.join(statement.split())
+    return _LISTS.sub('(?)', _LITERALS.sub('?', statement))
+
+
+def init_app(app):
+    if not app.config.get('REQUEST_METRICS', True):
+        return
+    request_started.connect(_request_started, app)
+    request_finished.connect(_request_finished, app)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+
+    metrics.describe('http_request_duration_seconds', 'Duur van een request per endpoint')
+    metrics.describe('http_request_queries', 'SQL-statements per request per endpoint')
+    metrics.describe('http_request_sql_seconds', 'Tijd in de database per request per endpoint')
+    metrics.describe('http_request_render_seconds', 'Tijd in render_template per request per endpoint')
+    metrics.describe('db_slow_queries_total', 'Statements boven SLOW_QUERY_MS per endpoint')
+
+
+class RequestStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.render = 0.0
+        self.render_depth = 0
+        self.render_start = 0.0
+
+
+def _endpoint():
+    # Geen endpoint (404): één label, anders groeit de registry met elke URL
+    return request.endpoint or 'none'
+
+
+def _request_started(sender, **extra):
+    g._request_stats = RequestStats()
+
+
+def _request_finished(sender, response, **extra):
+    stats = g.pop('_request_stats', None)
+    if stats is None:
+        return
+    endpoint = _endpoint()
+    metrics.observe('http_request_duration_seconds', time.perf_counter() - stats.start, endpoint=endpoint)
+    metrics.observe('http_request_queries', stats.queries, buckets=QUERY_BUCKETS, endpoint=endpoint)
+    metrics.observe('http_request_sql_seconds', stats.sql, endpoint=endpoint)
+    metrics.observe('http_request_render_seconds', stats.render, endpoint=endpoint)
+
+
+def _render_started(sender, template, context, **extra):
+    stats = g.get('_request_stats')
+    if stats is None:
+        return
+    # Geneste renders (projectkaarten in een dashboard) tellen mee in de buitenste
+    if stats.render_depth == 0:
+        stats.render_start = time.perf_counter()
+    stats.render_depth += 1
+
+
+def _render_finished(sender, template, context, **extra):
+    stats = g.get('_request_stats')
+    if stats is None or stats.render_depth == 0:
+        return
+    stats.render_depth -= 1
+    if stats.render_depth == 0:
+        stats.render += time.perf_counter() - stats.render_start
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_query_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+
+    endpoint = None
+    if has_request_context():
+        endpoint = _endpoint()
+        stats = g.get('_request_stats')
+        if stats is not None:
+            stats.queries += 1
+            stats.sql += elapsed
+
+    if not has_app_context():
+        return
+    threshold = current_app.config.get('SLOW_QUERY_MS')
+    if threshold and elapsed * 1000 >= threshold:
+        metrics.inc('db_slow_queries_total', endpoint=endpoint or 'none')
+        logger.warning('Trage query (%.1f ms) in %s: %s', elapsed * 1000, endpoint or 'geen request',
+                       normalize_statement(statement))
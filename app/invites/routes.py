@@ -1,31 +1,56 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, abort, request
 from flask_login import login_required, current_user, login_user
 from app.models import db, ClientInvite, User, ClientFreelancerRelation
+from app.queries import freelancer_invites, invites_version
+from app.caching import conditional
+from app.replicas import use_primary
+from app.jobs import enqueue
+from app.invites.tasks import DELIVER_INVITE
+from app.throttle import throttled
+from app import inbox
 from datetime import datetime
 
 invites_bp = Blueprint('invites', __name__)
 
 @invites_bp.route('/my-invites')
 @login_required
+@conditional(lambda: invites_version(current_user) if current_user.is_freelancer() else None)
 def my_invites():
     """Overzicht van alle uitnodigingen (alleen voor freelancers)"""
     if not current_user.is_freelancer():
         abort(403)
     
-    pending = ClientInvite.query.filter_by(
-        freelancer_id=current_user.id,
-        status='pending'
-    ).order_by(ClientInvite.created_at.desc()).all()
+    pending = freelancer_invites(current_user, 'pending')
+    accepted = freelancer_invites(current_user, 'accepted', limit=10)
+    expired = freelancer_invites(current_user, 'expired', limit=10)
     
-    accepted = ClientInvite.query.filter_by(
-        freelancer_id=current_user.id,
-        status='accepted'
-    ).order_by(ClientInvite.created_at.desc()).limit(10).all()
+    return render_template('invites/my_invites.html', pending=pending, accepted=accepted, expired=expired)
+
+
+@invites_bp.route('/<int:invite_id>/resend', methods=['POST'])
+@login_required
+def resend_invite(invite_id):
+    """Mislukte uitnodigingsmail opnieuw inplannen"""
+    invite = ClientInvite.query.get_or_404(invite_id)
+    if invite.freelancer_id != current_user.id:
+        abort(403)
     
-    return render_template('invites/my_invites.html', pending=pending, accepted=accepted)
+    if invite.status != 'pending' or invite.is_expired():
+        flash('❌ Deze uitnodiging is niet meer geldig', 'danger')
+    elif invite.delivery_status in ('queued', 'retrying'):
+        flash('ℹ️ De uitnodiging staat al in de wachtrij', 'info')
+    else:
+        invite.delivery_status = 'queued'
+        invite.delivery_error = None
+        enqueue(DELIVER_INVITE, invite_id=invite.id)
+        db.session.commit()
+        flash(f'📧 Uitnodiging opnieuw verstuurd naar {invite.email}', 'success')
+    
+    return redirect(url_for('invites.my_invites'))
 
 
 @invites_bp.route('/accept/<token>', methods=['GET', 'POST'])
+@use_primary
 def accept_invite(token):
     """Client accepteert uitnodiging en registreert"""
     invite = ClientInvite.query.filter_by(token=token).first_or_404()
@@ -54,10 +79,11 @@ def accept_invite(token):
             db.session.add(relation)
             
             # Koppel aan project als die er is
-            if invite.project_id:
+            if invite.project_id and invite.project.deleted_at is None:
                 project = invite.project
                 project.client_id = current_user.id
             
+            inbox.invite_accepted(invite, current_user)
             db.session.commit()
             
             flash(f'✅ Je bent gekoppeld aan {invite.freelancer.username}!', 'success')
@@ -71,6 +97,7 @@ def accept_invite(token):
 
 
 @invites_bp.route('/register-from-invite/<token>', methods=['POST'])
+@throttled('register', account=lambda token: f'invite:{token}')
 def register_from_invite(token):
     """Verwerk registratie via invite"""
     invite = ClientInvite.query.filter_by(token=token).first_or_404()
@@ -125,10 +152,11 @@ def register_from_invite(token):
     db.session.add(relation)
     
     # Koppel aan project
-    if invite.project_id:
+    if invite.project_id and invite.project.deleted_at is None:
         project = invite.project
         project.client_id = user.id
     
+    inbox.invite_accepted(invite, user)
     db.session.commit()
     
     # Log client in
@@ -0,0 +1,69 @@
+"""Achtergrondtaken voor uitnodigingen: mail bezorgen en verlopen markeren."""
+import logging
+from datetime import datetime
+from flask import current_app, url_for
+from sqlalchemy import select, update
+from app.jobs import handler, periodic
+from app.mail import send_mail
+from app.models import db, ClientInvite
+
+logger = logging.getLogger(__name__)
+
+DELIVER_INVITE = 'deliver_invite'
+
+
+def invite_link(invite):
+    """Absolute link naar de uitnodiging, ook buiten een request (worker)"""
+    with current_app.test_request_context(base_url=current_app.config['APP_BASE_URL']):
+        return url_for('invites.accept_invite', token=invite.token, _external=True)
+
+
+def _delivery_failed(job, payload, error, dead):
+    invite = db.session.get(ClientInvite, payload['invite_id'])
+    if invite is not None:
+        invite.delivery_status = 'failed' if dead else 'retrying'
+        invite.delivery_attempts = job.attempts
+        invite.delivery_error = str(error)[:255]
+
+
+@handler(DELIVER_INVITE, on_failure=_delivery_failed)
+def deliver_invite(invite_id):
+    invite = db.session.get(ClientInvite, invite_id)
+    if invite is None or invite.status != 'pending' or invite.delivery_status == 'sent':
+        return
+
+    send_mail(
+        invite.email,
+        f'{invite.freelancer.username} nodigt je uit voor KlantSync',
+        f'Hallo,\n\n{invite.freelancer.username} wil de voortgang van '
+        f'{invite.project.project_name if invite.project else "jullie projecten"} met je delen via KlantSync.\n\n'
+        f'Maak hier je account aan (geldig tot {invite.expires_at.strftime("%d-%m-%Y")}):\n'
+        f'{invite_link(invite)}\n',
+    )
+    invite.delivery_status = 'sent'
+    invite.delivery_attempts += 1
+    invite.delivery_error = None
+
+
+@periodic('INVITE_SWEEP_INTERVAL')
+def sweep_expired_invites(batch_size=None, now=None):
+    """Zet verlopen openstaande uitnodigingen in blokken op ``expired``; geeft het aantal"""
+    batch_size = batch_size or current_app.config.get('INVITE_SWEEP_BATCH', 1000)
+    now = now or datetime.utcnow()
+    total = 0
+    while True:
+        batch = select(ClientInvite.id).where(
+            ClientInvite.status == 'pending', ClientInvite.expires_at < now
+        ).limit(batch_size).scalar_subquery()
+        result = db.session.execute(
+            update(ClientInvite).where(ClientInvite.id.in_(batch))
+            .values(status='expired', updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            break
+    if total:
+        logger.info('%s verlopen uitnodigingen gemarkeerd', total)
+    return total
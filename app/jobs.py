@@ -0,0 +1,229 @@
+"""Lichtgewicht job-queue in de database, met een worker-proces.
+
+* ``enqueue`` zet een job in dezelfde transactie als de rest van het
+  request: de job bestaat alleen als het request commit (en andersom)
+* de worker (``flask jobs work``) claimt batches jobs met één
+  ``UPDATE ... RETURNING``; op Postgres slaan meerdere workers elkaars
+  rijen over (``FOR UPDATE SKIP LOCKED``)
+* een mislukte job krijgt een nieuwe poging na ``JOBS_RETRY_BASE * 2^n``
+  seconden; na ``max_attempts`` pogingen blijft hij als ``dead`` staan
+* geslaagde jobs worden verwijderd
+* periodieke taken (``periodic``) draaien in de worker-loop
+
+Jobs worden minstens één keer uitgevoerd: handlers moeten een herhaling
+verdragen.
+"""
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from importlib import import_module
+from flask import current_app
+from sqlalchemy import func, insert, select, update
+from app.models import db, Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+PERIODIC = []
+
+# Modules met ``@handler``/``@periodic``; de worker importeert ze bij het starten
+TASK_MODULES = ('app.invites.tasks', 'app.archive', 'app.purge', 'app.attachments')
+
+
+class JobHandler:
+    def __init__(self, kind, function, on_failure=None):
+        self.kind = kind
+        self.function = function
+        self.on_failure = on_failure
+
+
+def handler(kind, on_failure=None):
+    """Registreer ``function(**payload)`` voor jobs van soort ``kind``
+
+    ``on_failure(job, payload, error, dead)`` draait na een mislukte poging,
+    in de transactie die de job opnieuw inplant of als dead markeert.
+    """
+    def register(function):
+        HANDLERS[kind] = JobHandler(kind, function, on_failure)
+        return function
+    return register
+
+
+def periodic(interval_setting):
+    """Registreer een taak die de worker elke ``config[interval_setting]`` seconden draait"""
+    def register(function):
+        PERIODIC.append((interval_setting, function))
+        return function
+    return register
+
+
+def enqueue(kind, run_at=None, max_attempts=None, **payload):
+    """Voeg een job toe aan de sessie; committen doet de aanroeper"""
+    job = Job(kind=kind, payload=json.dumps(payload), run_at=run_at or datetime.utcnow(),
+              max_attempts=max_attempts or current_app.config.get('JOBS_MAX_ATTEMPTS', 5))
+    db.session.add(job)
+    return job
+
+
+def enqueue_many(kind, payloads):
+    """Bulk-variant van ``enqueue`` (één executemany-insert)"""
+    if not payloads:
+        return
+    now = datetime.utcnow()
+    max_attempts = current_app.config.get('JOBS_MAX_ATTEMPTS', 5)
+    db.session.execute(insert(Job), [{
+        'kind': kind, 'payload': json.dumps(payload), 'status': 'queued', 'attempts': 0,
+        'max_attempts': max_attempts, 'run_at': now, 'created_at': now, 'updated_at': now,
+    } for payload in payloads])
+
+
+def claim(worker_id, limit):
+    """Zet tot ``limit`` jobs die aan de beurt zijn op running; geeft hun ids"""
+    now = datetime.utcnow()
+    candidates = select(Job.id).where(
+        Job.status == 'queued', Job.run_at <= now
+    ).order_by(Job.run_at, Job.id).limit(limit).with_for_update(skip_locked=True)
+
+    claimed = db.session.execute(
+        update(Job).where(Job.id.in_(candidates.scalar_subquery()), Job.status == 'queued')
+        .values(status='running', locked_by=worker_id, locked_at=now, updated_at=now)
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.session.commit()
+    return sorted(claimed)
+
+
+def run_job(job_id, retry_base):
+    """Voer één geclaimde job uit; True als hij slaagde"""
+    job = db.session.get(Job, job_id)
+    job_handler = HANDLERS.get(job.kind)
+    payload = json.loads(job.payload)
+    try:
+        if job_handler is None:
+            raise LookupError(f'Geen handler voor jobsoort {job.kind!r}')
+        job_handler.function(**payload)
+        db.session.delete(job)
+        db.session.commit()
+        return True
+    except Exception as error:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.attempts += 1
+        job.last_error = f'{type(error).__name__}: {error}'[:2000]
+        job.locked_by = job.locked_at = None
+        dead = job.attempts >= job.max_attempts
+        if dead:
+            job.status = 'dead'
+            logger.error('Job %s (%s) definitief mislukt na %s pogingen: %s',
+                         job.id, job.kind, job.attempts, job.last_error)
+        else:
+            job.status = 'queued'
+            job.run_at = datetime.utcnow() + timedelta(seconds=retry_base * 2 ** (job.attempts - 1))
+            logger.warning('Job %s (%s) mislukt, poging %s van %s: %s',
+                           job.id, job.kind, job.attempts, job.max_attempts, job.last_error)
+        if job_handler and job_handler.on_failure:
+            job_handler.on_failure(job, payload, error, dead)
+        db.session.commit()
+        return False
+
+
+def requeue_stale(timeout):
+    """Jobs van een gestopte worker (running, maar te lang geleden geclaimd) opnieuw inplannen"""
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    result = db.session.execute(
+        update(Job).where(Job.status == 'running', Job.locked_at < cutoff)
+        .values(status='queued', locked_by=None, locked_at=None, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def retry_dead(kind=None):
+    """Dead jobs opnieuw inplannen, met een nieuwe reeks pogingen"""
+    statement = update(Job).where(Job.status == 'dead')
+    if kind:
+        statement = statement.where(Job.kind == kind)
+    result = db.session.execute(
+        statement.values(status='queued', attempts=0, run_at=datetime.utcnow(), updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def queue_stats():
+    """``{(soort, status): aantal}``"""
+    rows = db.session.execute(select(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status))
+    return {(kind, status): count for kind, status, count in rows}
+
+
+def load_tasks():
+    for module in TASK_MODULES:
+        import_module(module)
+
+
+class Worker:
+    def __init__(self, app, batch_size=None, poll_interval=None):
+        load_tasks()
+        self.app = app
+        self.batch_size = batch_size or app.config.get('JOBS_BATCH_SIZE', 10)
+        self.poll_interval = poll_interval or app.config.get('JOBS_POLL_INTERVAL', 2)
+        self.retry_base = app.config.get('JOBS_RETRY_BASE', 30)
+        self.lock_timeout = app.config.get('JOBS_LOCK_TIMEOUT', 600)
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+        self._next_periodic = {}
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def run_once(self):
+        """Eén ronde: periodieke taken en één batch jobs; geeft het aantal uitgevoerde jobs"""
+        with self.app.app_context():
+            self._run_periodic()
+            processed = 0
+            for job_id in claim(self.worker_id, self.batch_size):
+                run_job(job_id, self.retry_base)
+                processed += 1
+            db.session.remove()
+            return processed
+
+    def run(self):
+        logger.info('Worker %s gestart', self.worker_id)
+        while not self.stopping:
+            try:
+                processed = self.run_once()
+            except Exception:
+                logger.exception('Fout in de worker-loop')
+                processed = 0
+            if not processed:
+                # Niets te doen: even wachten, in stapjes zodat een stop snel werkt
+                deadline = time.monotonic() + self.poll_interval
+                while not self.stopping and time.monotonic() < deadline:
+                    time.sleep(min(0.2, self.poll_interval))
+        logger.info('Worker %s gestopt', self.worker_id)
+
+    def _run_periodic(self):
+        now = time.monotonic()
+        tasks = [(self.lock_timeout, _requeue_stale_task)] + [
+            (self.app.config.get(setting), function) for setting, function in PERIODIC]
+        for interval, function in tasks:
+            if not interval or self._next_periodic.get(function, 0) > now:
+                continue
+            self._next_periodic[function] = now + interval
+            try:
+                function()
+            except Exception:
+                db.session.rollback()
+                logger.exception('Periodieke taak %s mislukt', function.__name__)
+
+
+def _requeue_stale_task():
+    requeued = requeue_stale(current_app.config.get('JOBS_LOCK_TIMEOUT', 600))
+    if requeued:
+        logger.warning('%s vastgelopen jobs opnieuw ingepland', requeued)
@@ -0,0 +1,313 @@
+"""Belastingstest van de echte app: login → dashboard → detail → add_update.
+
+Elke virtuele gebruiker is een thread die als een geseede freelancer
+(``app.seed``) inlogt en daarna ``iterations`` keer zijn dashboard opent,
+een van zijn projecten bekijkt en er een update aan toevoegt. Redirects
+worden niet gevolgd, zodat elke meting precies één endpoint is.
+
+Twee drivers:
+
+* ``TestClientDriver``: de Flask test client in dit proces (geen netwerk,
+  geen gunicorn; meet de app zelf)
+* ``HttpDriver``: HTTP naar een draaiende server, bijvoorbeeld gunicorn
+  tegen een lokale database
+
+Per stap komen er p50/p95/p99 en doorvoer uit; ``save_baseline`` en
+``compare`` bewaren en vergelijken resultaten tussen commits.
+
+``capacity`` meet iets anders: hoeveel langlopende verbindingen (SSE-streams)
+een server openhoudt, en of gewone requests daarnaast nog snel antwoord
+krijgen. Zo zijn gunicorn (een thread per verbinding) en de ASGI-modus te
+vergelijken.
+"""
+import http.client
+import json
+import random
+import re
+import socket
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from app.pagination import encode_cursor
+from app.seed import SEED_PASSWORD, freelancer_email
+
+STEPS = ('login', 'dashboard', 'detail', 'add_update')
+
+_CSRF = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+_PROJECT_LINK = re.compile(r'href="/projects/(\d+)"')
+
+
+class TestClientDriver:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.get_data(as_text=True)
+
+
+class HttpDriver:
+    """HTTP zonder redirects te volgen, met een eigen cookie-jar
+
+    Ook ``Secure``-cookies gaan terug over http, zodat een lokale server in
+    productieconfiguratie getest kan worden.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = {}
+        self.opener = urllib.request.build_opener(_NoRedirect)
+
+    def request(self, method, path, data=None, timeout=60):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        if self.cookies:
+            request.add_header('Cookie', '; '.join(f'{name}={value}' for name, value in self.cookies.items()))
+        try:
+            response = self.opener.open(request, timeout=timeout)
+        except urllib.error.HTTPError as error:
+            response = error
+        with response:
+            for header in response.headers.get_all('Set-Cookie') or []:
+                name, _, rest = header.partition('=')
+                self.cookies[name.strip()] = rest.split(';', 1)[0]
+            return response.status, response.read().decode('utf-8', 'replace')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class StepStats:
+    def __init__(self, name):
+        self.name = name
+        self.timings = []
+        self.errors = 0
+
+    def percentile(self, fraction):
+        if not self.timings:
+            return 0.0
+        ordered = sorted(self.timings)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def summary(self, elapsed):
+        return {
+            'count': len(self.timings), 'errors': self.errors,
+            'p50_ms': round(self.percentile(0.50) * 1000, 2),
+            'p95_ms': round(self.percentile(0.95) * 1000, 2),
+            'p99_ms': round(self.percentile(0.99) * 1000, 2),
+            'rps': round(len(self.timings) / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+class LoadResult:
+    def __init__(self, driver, users, iterations, elapsed, steps):
+        self.driver = driver
+        self.users = users
+        self.iterations = iterations
+        self.elapsed = elapsed
+        self.steps = steps
+
+    @property
+    def requests(self):
+        return sum(len(step.timings) for step in self.steps.values())
+
+    def as_dict(self):
+        return {
+            'commit': _commit(), 'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'driver': self.driver, 'users': self.users, 'iterations': self.iterations,
+            'elapsed_s': round(self.elapsed, 3),
+            'throughput_rps': round(self.requests / self.elapsed, 2) if self.elapsed else 0.0,
+            'steps': {name: step.summary(self.elapsed) for name, step in self.steps.items()},
+        }
+
+
+def run(make_driver, driver_name, users, iterations, prefix='seed', freelancers=None, seed=0):
+    """Draai ``users`` virtuele gebruikers parallel; geeft een ``LoadResult``"""
+    steps = {name: StepStats(name) for name in STEPS}
+    lock = threading.Lock()
+
+    def record(name, start, ok):
+        elapsed = time.perf_counter() - start
+        with lock:
+            steps[name].timings.append(elapsed)
+            if not ok:
+                steps[name].errors += 1
+
+    def virtual_user(index):
+        rng = random.Random(seed + index)
+        driver = make_driver()
+        email = freelancer_email(prefix, index % freelancers if freelancers else index)
+
+        _, page = driver.request('GET', '/auth/login')
+        start = time.perf_counter()
+        status, _ = driver.request('POST', '/auth/login', _form(page, email=email, password=SEED_PASSWORD))
+        record('login', start, status == 302)
+        if status != 302:
+            return
+
+        for _ in range(iterations):
+            start = time.perf_counter()
+            status, page = driver.request('GET', '/dashboard')
+            record('dashboard', start, status == 200)
+            project_ids = _PROJECT_LINK.findall(page)
+            if not project_ids:
+                continue
+            project_id = rng.choice(project_ids)
+
+            start = time.perf_counter()
+            status, page = driver.request('GET', f'/projects/{project_id}')
+            record('detail', start, status == 200)
+
+            start = time.perf_counter()
+            status, _ = driver.request('POST', f'/projects/{project_id}/add-update',
+                                       _form(page, content=f'Belastingstest {index}-{rng.random():.6f}'))
+            record('add_update', start, status == 302)
+
+    threads = [threading.Thread(target=virtual_user, args=(index,)) for index in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return LoadResult(driver_name, users, iterations, time.perf_counter() - started, steps)
+
+
+class CapacityResult:
+    def __init__(self, server, streams, opened, probes, elapsed):
+        self.server = server
+        self.streams = streams
+        self.opened = opened
+        self.probes = probes
+        self.elapsed = elapsed
+
+    def as_dict(self):
+        return {
+            'commit': _commit(), 'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'server': self.server, 'streams': self.streams, 'streams_open': self.opened,
+            'dashboard': self.probes.summary(self.elapsed),
+        }
+
+
+def capacity(base_url, server_name, streams, probes, prefix='seed', timeout=5):
+    """Open ``streams`` SSE-verbindingen tegelijk en doe daarnaast ``probes`` dashboard-requests
+
+    Een stream telt als open als hij binnen ``timeout`` seconden antwoordt;
+    een dashboard-request dat niet binnen ``timeout`` antwoordt telt als fout.
+    """
+    driver = HttpDriver(base_url)
+    _, page = driver.request('GET', '/auth/login')
+    driver.request('POST', '/auth/login', _form(page, email=freelancer_email(prefix, 0), password=SEED_PASSWORD))
+    _, page = driver.request('GET', '/dashboard')
+    project_ids = _PROJECT_LINK.findall(page)
+    if not project_ids:
+        raise RuntimeError(f'Geen projecten voor {freelancer_email(prefix, 0)}; eerst "flask loadtest seed"')
+    cookie = '; '.join(f'{name}={value}' for name, value in driver.cookies.items())
+    address = urllib.parse.urlsplit(base_url)
+    # Alleen updates vanaf nu: de stream begint meteen te wachten
+    cursor = encode_cursor(datetime.utcnow(), 0)
+
+    stop = threading.Event()
+    opened = []
+    lock = threading.Lock()
+
+    def hold_stream(index):
+        connection = http.client.HTTPConnection(address.hostname, address.port, timeout=timeout)
+        try:
+            connection.request('GET', f'/projects/{project_ids[index % len(project_ids)]}/stream?cursor={cursor}',
+                               headers={'Cookie': cookie})
+            response = connection.getresponse()
+            if response.status != 200 or not response.fp.readline():
+                return
+            with lock:
+                opened.append(index)
+            # Open houden (keepalives lezen) tot de meting klaar is
+            while not stop.is_set():
+                try:
+                    if not response.fp.readline():
+                        return
+                except socket.timeout:
+                    continue
+        except OSError:
+            return
+        finally:
+            connection.close()
+
+    holders = [threading.Thread(target=hold_stream, args=(index,), daemon=True) for index in range(streams)]
+    for holder in holders:
+        holder.start()
+    # Wachten tot elke stream open is of zijn timeout gehad heeft
+    deadline = time.monotonic() + timeout + 1
+    while len(opened) < streams and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    stats = StepStats('dashboard')
+    probe_driver = HttpDriver(base_url)
+    probe_driver.cookies = dict(driver.cookies)
+    started = time.perf_counter()
+    for _ in range(probes):
+        start = time.perf_counter()
+        try:
+            status, _ = probe_driver.request('GET', '/dashboard', timeout=timeout)
+            ok = status == 200
+        except OSError:
+            ok = False
+        stats.timings.append(time.perf_counter() - start)
+        if not ok:
+            stats.errors += 1
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    return CapacityResult(server_name, streams, len(opened), stats, elapsed)
+
+
+def _form(page, **fields):
+    token = _CSRF.search(page)
+    if token:
+        fields['csrf_token'] = token.group(1)
+    return fields
+
+
+def wait_for_server(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server gestopt met exitcode {process.returncode}')
+        try:
+            HttpDriver(base_url).request('GET', '/')
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server op {base_url} reageert niet binnen {timeout}s')
+
+
+def save_baseline(result, path):
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(result.as_dict(), handle, indent=2)
+
+
+def compare(result, path):
+    """``(stap, oude p95, nieuwe p95, verschil in %)`` per stap uit de baseline"""
+    with open(path, encoding='utf-8') as handle:
+        baseline = json.load(handle)
+    current = result.as_dict()['steps']
+    rows = []
+    for name, old in baseline['steps'].items():
+        new = current.get(name)
+        if not new or not old['p95_ms']:
+            continue
+        rows.append((name, old['p95_ms'], new['p95_ms'], (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100))
+    return baseline, rows
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
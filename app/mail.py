@@ -0,0 +1,32 @@
+"""E-mail versturen vanuit jobs.
+
+``MAIL_BACKEND``: ``smtp`` (standaard zodra ``MAIL_SERVER`` gezet is) of
+``log``, dat het bericht alleen logt. Zo werkt lokaal alles zonder
+mailserver en staat de uitnodigingslink in de worker-log.
+"""
+import logging
+import smtplib
+from email.message import EmailMessage
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+def send_mail(to, subject, body):
+    config = current_app.config
+    message = EmailMessage()
+    message['From'] = config['MAIL_SENDER']
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content(body)
+
+    if config['MAIL_BACKEND'] == 'log':
+        logger.info('Mail aan %s: %s\n%s', to, subject, body)
+        return
+
+    with smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=config['MAIL_TIMEOUT']) as smtp:
+        if config['MAIL_USE_TLS']:
+            smtp.starttls()
+        if config['MAIL_USERNAME']:
+            smtp.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+        smtp.send_message(message)
@@ -1,6 +1,12 @@
-from flask import Blueprint, render_template, abort
+from flask import Blueprint, render_template, abort, request, redirect, url_for, flash
 from flask_login import login_required, current_user
-from app.models import Project
+from app.models import db
+from app.auth.routes import is_local_url
+from app.queries import (freelancer_projects, client_projects, dashboard_projects, dashboard_version, PROJECT_SORTS,
+                         inbox_items, inbox_unread, inbox_version)
+from app.pagination import request_cursor, fragment_response
+from app.caching import conditional
+from app.inbox import mark_read
 
 main_bp = Blueprint('main', __name__)
 
@@ -11,33 +17,93 @@ def index():
 
 @main_bp.route('/dashboard')
 @login_required
+@conditional(lambda: dashboard_version(current_user))
 def dashboard():
     """Redirect naar juiste dashboard op basis van rol"""
+    sort = _dashboard_sort()
     if current_user.is_freelancer():
         return render_template('main/freelancer_dashboard.html', 
-                             projects=current_user.owned_projects.order_by(Project.created_at.desc()).all())
+                             projects=freelancer_projects(current_user, sort=sort), sort=sort)
     else:
         return render_template('main/client_dashboard.html',
-                             projects=current_user.assigned_projects.order_by(Project.created_at.desc()).all())
+                             projects=client_projects(current_user, sort=sort), sort=sort,
+                             inbox=inbox_items(current_user), inbox_unread=inbox_unread(current_user))
 
 
 @main_bp.route('/dashboard/freelancer')
 @login_required
+@conditional(lambda: dashboard_version(current_user))
 def freelancer_dashboard():
     """Dashboard voor freelancers"""
     if not current_user.is_freelancer():
         abort(403)  # Forbidden
     
-    projects = current_user.owned_projects.order_by(Project.created_at.desc()).all()
-    return render_template('main/freelancer_dashboard.html', projects=projects)
+    sort = _dashboard_sort()
+    projects = freelancer_projects(current_user, sort=sort)
+    return render_template('main/freelancer_dashboard.html', projects=projects, sort=sort)
 
 
 @main_bp.route('/dashboard/client')
 @login_required
+@conditional(lambda: dashboard_version(current_user))
 def client_dashboard():
     """Dashboard voor clients"""
     if not current_user.is_client():
         abort(403)  # Forbidden
     
-    projects = current_user.assigned_projects.order_by(Project.created_at.desc()).all()
-    return render_template('main/client_dashboard.html', projects=projects)
\ No newline at end of file
+    sort = _dashboard_sort()
+    projects = client_projects(current_user, sort=sort)
+    return render_template('main/client_dashboard.html', projects=projects, sort=sort,
+                           inbox=inbox_items(current_user), inbox_unread=inbox_unread(current_user))
+
+
+@main_bp.route('/dashboard/more')
+@login_required
+def dashboard_more():
+    """Volgende pagina projectkaarten als HTML-fragment ("Meer laden")"""
+    projects = dashboard_projects(current_user, request_cursor(), _dashboard_sort())
+    
+    if current_user.is_freelancer():
+        template = 'main/_freelancer_cards.html'
+    else:
+        template = 'main/_client_cards.html'
+    
+    return fragment_response(render_template(template, projects=projects), projects)
+
+
+@main_bp.route('/inbox')
+@login_required
+@conditional(lambda: inbox_version(current_user))
+def inbox():
+    """Activiteit in alle projecten van de gebruiker, nieuwste eerst"""
+    return render_template('main/inbox.html', inbox=inbox_items(current_user),
+                           inbox_unread=inbox_unread(current_user))
+
+
+@main_bp.route('/inbox/more')
+@login_required
+def inbox_more():
+    """Volgende pagina inbox-items als HTML-fragment ("Meer laden")"""
+    items = inbox_items(current_user, request_cursor())
+    return fragment_response(render_template('main/_inbox_items.html', items=items), items)
+
+
+@main_bp.route('/inbox/read', methods=['POST'])
+@login_required
+def inbox_read():
+    """Markeer de hele inbox als gelezen"""
+    count = mark_read(current_user)
+    db.session.commit()
+    if count:
+        flash(f'✅ {count} items als gelezen gemarkeerd', 'success')
+    
+    next_page = request.form.get('next')
+    if not is_local_url(next_page):
+        next_page = url_for('main.inbox')
+    return redirect(next_page)
+
+
+def _dashboard_sort():
+    """Sortering uit ``?sort=``: 'created' (standaard) of 'activity'"""
+    sort = request.args.get('sort', 'created')
+    return sort if sort in PROJECT_SORTS else 'created'
@@ -0,0 +1,125 @@
+"""Eenvoudige metrics-registry met een Prometheus-endpoint.
+
+Tellers, histogrammen en gauges (callbacks die bij het uitlezen worden
+aangeroepen) per proces. ``/metrics`` geeft ze in het Prometheus-tekstformaat,
+alleen met ``Authorization: Bearer <METRICS_TOKEN>``; zonder token in de
+config bestaat het endpoint niet (404).
+
+Elke gunicorn-worker heeft zijn eigen registry; een scrape ziet dus één
+worker tegelijk. Voor tuning (wachttijd op de pool, ...) is dat genoeg.
+"""
+import hmac
+import threading
+from flask import abort, current_app, request
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._help = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': buckets, 'counts': [0] * len(buckets),
+                                                     'count': 0, 'sum': 0.0}
+            for index, bound in enumerate(histogram['buckets']):
+                if value <= bound:
+                    histogram['counts'][index] += 1
+            histogram['count'] += 1
+            histogram['sum'] += value
+
+    def gauge(self, name, callback, help=None):
+        """Registreer een waarde die pas bij het uitlezen wordt opgehaald"""
+        self._gauges[name] = callback
+        if help:
+            self._help[name] = help
+
+    def describe(self, name, help):
+        self._help[name] = help
+
+    def counter_value(self, name, **labels):
+        return self._counters.get(_key(name, labels), 0)
+
+    def histogram_value(self, name, **labels):
+        """``(aantal, som)`` van een histogram, of ``(0, 0.0)``"""
+        histogram = self._histograms.get(_key(name, labels))
+        return (histogram['count'], histogram['sum']) if histogram else (0, 0.0)
+
+    def render(self):
+        """Alle metrics in het Prometheus-tekstformaat"""
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: dict(value, counts=list(value['counts'])) for key, value in self._histograms.items()}
+
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        for name in sorted({name for name, _ in counters}):
+            header(name, 'counter')
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+
+        for name in sorted({name for name, _ in histograms}):
+            header(name, 'histogram')
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(histogram['buckets'], histogram['counts']):
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {count}')
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {histogram["count"]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {histogram["sum"]:.6f}')
+                lines.append(f'{name}_count{_format_labels(labels)} {histogram["count"]}')
+
+        for name, callback in sorted(self._gauges.items()):
+            value = callback()
+            if value is None:
+                continue
+            header(name, 'gauge')
+            lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+def init_app(app):
+    app.add_url_rule('/metrics', 'metrics', _metrics_endpoint)
+
+
+def _metrics_endpoint():
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        abort(404)
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        abort(401)
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
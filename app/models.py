@@ -1,10 +1,12 @@
 from datetime import datetime, timedelta
 import secrets
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.hashing import password_hasher
+from app.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(UserMixin, db.Model):
     """User model voor zowel freelancers als clients"""
@@ -40,10 +42,13 @@ class User(UserMixin, db.Model):
                                      lazy='dynamic')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
     
     def is_freelancer(self):
         return self.role == 'freelancer'
@@ -66,10 +71,38 @@ class Project(db.Model):
     status = db.Column(db.String(20), default='actief')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    freelancer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    client_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
+    freelancer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    # Gedenormaliseerde activiteit, bijgehouden door app.activity
+    update_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_activity_at = db.Column(db.DateTime, nullable=False,
+                                 default=lambda ctx: ctx.get_current_parameters().get('created_at') or datetime.utcnow())
+    last_update_author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    # Versiestempels voor ETags en fragment-caching; elke UPDATE (ook set-based) hoogt revision op
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1', onupdate=text('revision + 1'))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Verwijderd maar nog niet opgeruimd (app.purge); overal onzichtbaar
+    deleted_at = db.Column(db.DateTime, nullable=True)
     
     updates = db.relationship('Update', backref='project', lazy='dynamic', cascade='all, delete-orphan')
+    last_update_author = db.relationship('User', foreign_keys=[last_update_author_id])
+    
+    # Dashboards: projecten per freelancer/client, op aanmaakdatum of activiteit (keyset op kolom, id)
+    __table_args__ = (
+        db.Index('ix_projects_freelancer_created', 'freelancer_id', 'created_at', 'id'),
+        db.Index('ix_projects_client_created', 'client_id', 'created_at', 'id'),
+        db.Index('ix_projects_freelancer_activity', 'freelancer_id', 'last_activity_at', 'id'),
+        db.Index('ix_projects_client_activity', 'client_id', 'last_activity_at', 'id'),
+        # Archiveerkandidaten (app.archive); partieel, zodat gewone updates de index niet raken
+        db.Index('ix_projects_finished_updated', 'updated_at',
+                 sqlite_where=text("status = 'afgerond'"), postgresql_where=text("status = 'afgerond'")),
+        # Op te ruimen projecten (app.purge)
+        db.Index('ix_projects_deleted', 'deleted_at',
+                 sqlite_where=text('deleted_at IS NOT NULL'), postgresql_where=text('deleted_at IS NOT NULL')),
+    )
     
     def __repr__(self):
         return f'<Project {self.project_name}>'
@@ -84,7 +117,16 @@ class Update(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
-    author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    
+    # Bijlagen blijven staan als de update naar het archief gaat, dus geen foreign key (zie Attachment)
+    attachments = db.relationship('Attachment', primaryjoin='Update.id == foreign(Attachment.update_id)',
+                                  order_by='[Attachment.update_id, Attachment.id]', viewonly=True)
+    
+    # Tijdlijn van een project, nieuwste eerst (keyset op created_at, id)
+    __table_args__ = (
+        db.Index('ix_updates_project_created', 'project_id', 'created_at', 'id'),
+    )
     
     def __repr__(self):
         return f'<Update {self.id} by User {self.author_id}>'
@@ -113,10 +155,24 @@ class ClientInvite(db.Model):
     email = db.Column(db.String(120), nullable=False, index=True)
     token = db.Column(db.String(100), unique=True, nullable=False, index=True)
     freelancer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=True, index=True)
     status = db.Column(db.String(20), default='pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime, default=lambda: datetime.utcnow() + timedelta(days=7))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Bezorging van de uitnodigingsmail (app.invites.tasks): queued, sent, retrying of failed;
+    # leeg voor uitnodigingen van vóór de mail (alleen de link)
+    delivery_status = db.Column(db.String(20), default='queued')
+    delivery_attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    delivery_error = db.Column(db.String(255))
+    
+    # Mijn uitnodigingen: per freelancer en status, nieuwste eerst
+    # Verloopronde: openstaande uitnodigingen op vervaldatum
+    __table_args__ = (
+        db.Index('ix_client_invites_freelancer_status_created', 'freelancer_id', 'status', 'created_at'),
+        db.Index('ix_client_invites_status_expires', 'status', 'expires_at'),
+    )
     
     freelancer = db.relationship('User', foreign_keys=[freelancer_id], backref='sent_invites')
     project = db.relationship('Project', backref='invites')
@@ -129,4 +185,125 @@ class ClientInvite(db.Model):
         return datetime.utcnow() > self.expires_at
     
     def __repr__(self):
-        return f'<Invite {self.email} by Freelancer:{self.freelancer_id}>'
\ No newline at end of file
+        return f'<Invite {self.email} by Freelancer:{self.freelancer_id}>'
+
+
+class Job(db.Model):
+    """Achtergrondtaak in de wachtrij (zie app.jobs)"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    # queued, running of dead (na max_attempts mislukte pogingen); geslaagde jobs worden verwijderd
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # De worker pakt de oudste jobs die aan de beurt zijn
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+
+class ProjectArchive(db.Model):
+    """Gearchiveerd project met zijn updates als gecomprimeerde JSON (zie app.archive)"""
+    __tablename__ = 'project_archives'
+    
+    # Zelfde id als het oorspronkelijke project, zodat links blijven werken
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    freelancer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    project_name = db.Column(db.String(100), nullable=False)
+    client_name = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    update_count = db.Column(db.Integer, nullable=False, default=0)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    
+    # Archieflijst per freelancer/client, laatst gearchiveerd eerst
+    __table_args__ = (
+        db.Index('ix_project_archives_freelancer_archived', 'freelancer_id', 'archived_at'),
+        db.Index('ix_project_archives_client_archived', 'client_id', 'archived_at'),
+    )
+    
+    def __repr__(self):
+        return f'<ProjectArchive {self.project_name}>'
+
+
+class InboxItem(db.Model):
+    """Activiteit voor één ontvanger, bij het schrijven uitgewaaierd (zie app.inbox)"""
+    __tablename__ = 'inbox_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # update, project_created, project_updated of invite_accepted
+    kind = db.Column(db.String(20), nullable=False)
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    # Geen foreign keys: items blijven staan als een project gearchiveerd wordt (app.purge ruimt ze op)
+    project_id = db.Column(db.Integer, nullable=True)
+    ref_id = db.Column(db.Integer, nullable=True)
+    # Momentopname, zodat de feed zonder joins op projects/updates rendert
+    project_name = db.Column(db.String(100), nullable=True)
+    summary = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime, nullable=True)
+    
+    actor = db.relationship('User', foreign_keys=[actor_id])
+    
+    # Feed per gebruiker, nieuwste eerst (keyset op created_at, id); ongelezen via een partiële index
+    __table_args__ = (
+        db.Index('ix_inbox_items_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_inbox_items_user_unread', 'user_id',
+                 sqlite_where=text('read_at IS NULL'), postgresql_where=text('read_at IS NULL')),
+        db.Index('ix_inbox_items_project', 'project_id'),
+    )
+    
+    def __repr__(self):
+        return f'<InboxItem {self.kind} for User {self.user_id}>'
+
+
+class Blob(db.Model):
+    """Inhoud van een bijlage in de blob store, één keer opgeslagen per sha256 (zie app.attachments)"""
+    __tablename__ = 'blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    # Bijgewerkt bij elk hergebruik; de opruimronde laat recent gebruikte blobs met rust
+    last_used_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Blob {self.sha256[:12]}>'
+
+
+class Attachment(db.Model):
+    """Bestand bij een update; de inhoud staat als ``Blob`` in de blob store"""
+    __tablename__ = 'attachments'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Geen foreign keys: bij archiveren verhuist de update, de bijlage blijft (app.purge ruimt ze op)
+    update_id = db.Column(db.Integer, nullable=False)
+    project_id = db.Column(db.Integer, nullable=False, index=True)
+    sha256 = db.Column(db.String(64), db.ForeignKey('blobs.sha256'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Bijlagen van een reeks updates (selectinload) op volgorde uit de index, zonder sortering
+    __table_args__ = (
+        db.Index('ix_attachments_update', 'update_id', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<Attachment {self.filename} on Update {self.update_id}>'
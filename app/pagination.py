@@ -0,0 +1,93 @@
+"""Keyset (cursor) paginatie op ``(sorteerkolom, id)``.
+
+In plaats van OFFSET, dat bij elke volgende pagina meer rijen overslaat,
+onthoudt de cursor de laatste ``(waarde, id)`` van de vorige pagina. De
+volgende pagina begint direct daarna via de index, dus elke pagina kost
+evenveel, hoe ver je ook doorbladert.
+"""
+import base64
+from datetime import datetime
+from flask import request, abort, make_response
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    """Cursor kon niet gedecodeerd worden"""
+
+
+class Page:
+    """Eén pagina resultaten plus de cursor voor de volgende pagina"""
+
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def encode_cursor(value, row_id):
+    raw = f'{value.isoformat()}|{row_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, row_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(value), int(row_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def request_cursor():
+    """Cursor uit ``?cursor=`` van het huidige request; 400 als hij ongeldig is"""
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor:
+            abort(400)
+    return cursor
+
+
+def keyset_page(query, sort_column, id_column, cursor=None, per_page=20):
+    """Haal één pagina op, aflopend gesorteerd op ``(sort_column, id_column)``"""
+    rows = keyset_query(query, sort_column, id_column, cursor, per_page).all()
+    return to_page(rows, sort_column, id_column, per_page)
+
+
+def keyset_query(query, sort_column, id_column, cursor=None, per_page=20):
+    """Filter, volgorde en limit van ``keyset_page``; werkt op een Query en op ``select()``"""
+    if cursor:
+        value, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(value, row_id))
+    return query.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1)
+
+
+def to_page(rows, sort_column, id_column, per_page):
+    """``Page`` uit de ``per_page + 1`` rijen van ``keyset_query``"""
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return Page(rows, next_cursor)
+
+
+def fragment_response(html, page):
+    """HTML-fragment voor "Meer laden", met de volgende cursor in een header"""
+    response = make_response(html)
+    if page.next_cursor:
+        response.headers['X-Next-Cursor'] = page.next_cursor
+    return response
@@ -0,0 +1,123 @@
+"""Streaming export van alle projecten en updates van een freelancer.
+
+De projectenlijst is klein en wordt in één keer opgehaald. De updates
+kunnen in de tienduizenden lopen; die komen per project met ``yield_per``
+in batches uit de database (via de ``(project_id, created_at, id)``-index,
+dus zonder sortering achteraf) en gaan direct de response in. Het
+geheugengebruik blijft zo constant en de eerste bytes gaan meteen weg.
+
+Gearchiveerde projecten (``app.archive``) horen er ook bij, in dezelfde
+volgorde en kolommen; hun updates komen in één keer uit de payload.
+"""
+import csv
+import io
+import json
+from types import SimpleNamespace
+from sqlalchemy import literal, select, union_all
+from app.archive import _decode, unpack
+from app.models import db, Project, Update, User, ProjectArchive
+
+BATCH_SIZE = 1000
+
+CSV_COLUMNS = [
+    'project_id', 'project_name', 'client_name', 'status', 'project_created_at',
+    'update_id', 'update_created_at', 'author', 'content',
+]
+
+
+def _projects(freelancer_id):
+    """Actieve en gearchiveerde projecten, oudste eerst"""
+    active = select(Project.id, Project.project_name, Project.client_name, Project.status, Project.created_at,
+                    literal(False).label('archived')).where(
+        Project.freelancer_id == freelancer_id, Project.deleted_at.is_(None))
+    archived = select(ProjectArchive.id, ProjectArchive.project_name, ProjectArchive.client_name,
+                      ProjectArchive.status, ProjectArchive.created_at, literal(True)).where(
+        ProjectArchive.freelancer_id == freelancer_id)
+    rows = union_all(active, archived).subquery()
+    return db.session.execute(select(rows).order_by(rows.c.created_at, rows.c.id)).all()
+
+
+def _update_batches(project):
+    """Updates van een project in batches, oudste eerst"""
+    if project.archived:
+        return [_archived_updates(project.id)]
+    return db.session.execute(
+        select(Update.id, Update.created_at, User.username, Update.content)
+        .join(User, User.id == Update.author_id)
+        .where(Update.project_id == project.id)
+        .order_by(Update.created_at, Update.id)
+        .execution_options(yield_per=BATCH_SIZE)
+    ).partitions()
+
+
+def _archived_updates(project_id):
+    payload = db.session.execute(select(ProjectArchive.payload).where(ProjectArchive.id == project_id)).scalar()
+    # Al in volgorde (created_at, id) gearchiveerd
+    rows = [_decode(row, Update.__table__) for row in unpack(payload)['updates']]
+    usernames = dict(db.session.execute(
+        select(User.id, User.username).where(User.id.in_({row['author_id'] for row in rows}))
+    ).all()) if rows else {}
+    return [SimpleNamespace(id=row['id'], created_at=row['created_at'], username=usernames.get(row['author_id']),
+                            content=row['content']) for row in rows]
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def csv_chunks(freelancer_id):
+    """CSV per batch regels; projecten zonder updates krijgen één regel"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue()
+
+    for project in _projects(freelancer_id):
+        buffer.seek(0)
+        buffer.truncate()
+        project_fields = [project.id, project.project_name, project.client_name, project.status,
+                          _iso(project.created_at)]
+
+        written = 0
+        for partition in _update_batches(project):
+            for update in partition:
+                writer.writerow(project_fields + [update.id, _iso(update.created_at),
+                                                  update.username, update.content])
+            written += len(partition)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if not written:
+            writer.writerow(project_fields + [None, None, None, None])
+            yield buffer.getvalue()
+
+
+def json_chunks(freelancer_id):
+    """JSON-array van projecten met geneste updates, stuk voor stuk geschreven"""
+    yield '['
+    for index, project in enumerate(_projects(freelancer_id)):
+        header = json.dumps({
+            'id': project.id,
+            'project_name': project.project_name,
+            'client_name': project.client_name,
+            'status': project.status,
+            'created_at': _iso(project.created_at),
+        })
+        # Laat het object open om de updates er achteraan in te schrijven
+        yield (',' if index else '') + header[:-1] + ', "updates": ['
+
+        first = True
+        for partition in _update_batches(project):
+            parts = []
+            for update in partition:
+                parts.append(json.dumps({
+                    'id': update.id,
+                    'created_at': _iso(update.created_at),
+                    'author': update.username,
+                    'content': update.content,
+                }))
+            yield ('' if first else ',') + ','.join(parts)
+            first = False
+        yield ']}'
+    yield ']'
@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, TextAreaField, SelectField, SubmitField, RadioField
 from wtforms.validators import DataRequired, Length, Email, Optional
 
@@ -38,4 +39,13 @@ class ProjectForm(FlaskForm):
         Email(message='Ongeldig emailadres')
     ])
     
-    submit = SubmitField('Project Opslaan')
\ No newline at end of file
+    submit = SubmitField('Project Opslaan')
+
+
+class ImportClientsForm(FlaskForm):
+    csv_file = FileField('CSV-bestand', validators=[
+        FileRequired(message='Kies een bestand'),
+        FileAllowed(['csv'], message='Alleen .csv bestanden')
+    ])
+    
+    submit = SubmitField('Importeren')
\ No newline at end of file
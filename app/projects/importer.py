@@ -0,0 +1,201 @@
+"""Bulk-import van clients en projecten voor een freelancer.
+
+Doet hetzelfde als ``new_project`` met ``client_mode='new'``, maar voor
+duizenden ``(email, project)``-regels tegelijk:
+
+* bestaande gebruikers, relaties en openstaande uitnodigingen worden
+  set-based opgezocht (``IN`` per blok e-mailadressen)
+* projecten, relaties en uitnodigingen gaan in gebatchte executemany-inserts
+* nieuwe uitnodigingen krijgen een mail-job (``app.jobs``) in dezelfde insert-ronde
+* projecten voor bestaande clients krijgen een inbox-item (``app.inbox``)
+* alles in één transactie, met per regel een resultaat
+"""
+import csv
+import io
+from datetime import datetime
+from email_validator import validate_email, EmailNotValidError
+from sqlalchemy import insert, select, update
+from app.models import db, User, Project, ClientInvite, ClientFreelancerRelation
+from app.search import index_projects
+from app.jobs import enqueue_many
+from app import inbox
+from app.invites.tasks import DELIVER_INVITE
+
+LOOKUP_CHUNK = 500
+
+REQUIRED_COLUMNS = {'email', 'project'}
+
+
+class InvalidImportFile(ValueError):
+    """Het bestand zelf is onbruikbaar (geen header, te veel regels, ...)"""
+
+
+class ImportRow:
+    """Eén regel uit het importbestand plus wat ermee gebeurd is"""
+
+    def __init__(self, line, email, project_name, client_name=None, description=None):
+        self.line = line
+        self.email = email
+        self.project_name = project_name
+        self.client_name = client_name or email
+        self.description = description or ''
+        self.status = None
+        self.message = ''
+        self.project_id = None
+
+    def fail(self, message):
+        self.status = 'fout'
+        self.message = message
+
+    @property
+    def ok(self):
+        return self.status != 'fout'
+
+
+def parse_csv(text_stream, max_rows):
+    """Lees ``email,project[,client_name,description]`` met header"""
+    reader = csv.DictReader(text_stream)
+    columns = {name.strip().lower() for name in reader.fieldnames or []}
+    if not REQUIRED_COLUMNS <= columns:
+        raise InvalidImportFile('Het bestand moet minimaal de kolommen "email" en "project" hebben')
+
+    rows = []
+    for line, record in enumerate(reader, start=2):
+        record = {(key or '').strip().lower(): (value or '').strip() for key, value in record.items()}
+        rows.append(ImportRow(line, record['email'].lower(), record['project'],
+                              record.get('client_name'), record.get('description')))
+        if len(rows) > max_rows:
+            raise InvalidImportFile(f'Maximaal {max_rows} regels per import')
+    return rows
+
+
+def parse_upload(file_storage, max_rows):
+    """Zelfde als ``parse_csv``, voor een geüpload bestand"""
+    return parse_csv(io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig'), max_rows)
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        yield values[start:start + LOOKUP_CHUNK]
+
+
+def _validate(rows):
+    for row in rows:
+        if not row.project_name:
+            row.fail('Projectnaam ontbreekt')
+            continue
+        try:
+            validate_email(row.email, check_deliverability=False)
+        except EmailNotValidError:
+            row.fail('Ongeldig emailadres')
+
+
+def import_clients(freelancer_id, rows):
+    """Importeer de regels in één transactie en vul per regel status en melding"""
+    _validate(rows)
+    valid = [row for row in rows if row.ok]
+    if not valid:
+        return rows
+
+    emails = {row.email for row in valid}
+
+    # Set-based opzoeken: gebruikers, bestaande relaties, openstaande uitnodigingen
+    users = {}
+    for chunk in _chunks(emails):
+        for user_id, email, role in db.session.execute(
+                select(User.id, User.email, User.role).where(User.email.in_(chunk))):
+            users[email] = (user_id, role)
+
+    client_ids = [user_id for user_id, role in users.values() if role == 'client']
+    related = set()
+    for chunk in _chunks(client_ids):
+        related.update(db.session.execute(
+            select(ClientFreelancerRelation.client_id).where(
+                ClientFreelancerRelation.freelancer_id == freelancer_id,
+                ClientFreelancerRelation.client_id.in_(chunk))
+        ).scalars())
+
+    pending = {}
+    for chunk in _chunks(emails - users.keys()):
+        for invite_id, email in db.session.execute(
+                select(ClientInvite.id, ClientInvite.email).where(
+                    ClientInvite.freelancer_id == freelancer_id,
+                    ClientInvite.status == 'pending',
+                    ClientInvite.email.in_(chunk))):
+            pending[email] = invite_id
+
+    for row in valid:
+        user = users.get(row.email)
+        if user and user[1] != 'client':
+            row.fail('Dit emailadres hoort bij een freelancer-account')
+    valid = [row for row in valid if row.ok]
+    if not valid:
+        return rows
+
+    # Projecten in één executemany, ids in dezelfde volgorde terug
+    now = datetime.utcnow()
+    project_ids = db.session.execute(
+        insert(Project).returning(Project.id, sort_by_parameter_order=True),
+        [{
+            'project_name': row.project_name,
+            'client_name': row.client_name,
+            'description': row.description,
+            'status': 'actief',
+            'freelancer_id': freelancer_id,
+            'client_id': users[row.email][0] if row.email in users else None,
+            'created_at': now,
+            'last_activity_at': now,
+        } for row in valid]
+    ).scalars().all()
+
+    new_relations = []
+    linked = []
+    new_invites = {}
+    reused_invites = {}
+    for row, project_id in zip(valid, project_ids):
+        row.project_id = project_id
+
+        if row.email in users:
+            client_id = users[row.email][0]
+            if client_id not in related:
+                related.add(client_id)
+                new_relations.append({'client_id': client_id, 'freelancer_id': freelancer_id})
+            linked.append((project_id, row.project_name, client_id))
+            row.status = 'gekoppeld'
+        elif row.email in pending:
+            # Net als new_project: de bestaande uitnodiging wijst naar het nieuwste project
+            reused_invites[pending[row.email]] = project_id
+            row.status = 'uitnodiging hergebruikt'
+        elif row.email in new_invites:
+            new_invites[row.email]['project_id'] = project_id
+            row.status = 'uitnodiging hergebruikt'
+        else:
+            new_invites[row.email] = {
+                'email': row.email,
+                'token': ClientInvite.generate_token(),
+                'freelancer_id': freelancer_id,
+                'project_id': project_id,
+                'status': 'pending',
+            }
+            row.status = 'uitgenodigd'
+
+    if new_relations:
+        db.session.execute(insert(ClientFreelancerRelation), new_relations)
+    inbox.projects_created(freelancer_id, linked, now)
+    if new_invites:
+        invite_ids = db.session.execute(
+            insert(ClientInvite).returning(ClientInvite.id, sort_by_parameter_order=True),
+            list(new_invites.values())
+        ).scalars().all()
+        enqueue_many(DELIVER_INVITE, [{'invite_id': invite_id} for invite_id in invite_ids])
+    if reused_invites:
+        db.session.execute(update(ClientInvite), [
+            {'id': invite_id, 'project_id': project_id} for invite_id, project_id in reused_invites.items()
+        ])
+
+    # Core-inserts slaan de ORM-hooks over: zelf indexeren
+    index_projects(db.session, project_ids)
+
+    db.session.commit()
+    return rows
@@ -1,7 +1,25 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, abort, request
+import time
+from datetime import datetime
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, request, Response, stream_with_context, current_app
 from flask_login import login_required, current_user
+from werkzeug.exceptions import RequestEntityTooLarge
 from app.models import db, Project, Update, User, ClientInvite, ClientFreelancerRelation
-from app.projects.forms import ProjectForm
+from app.projects.forms import ProjectForm, ImportClientsForm
+from app.queries import (project_for_detail, project_updates, project_updates_after, project_version, freelancer_clients,
+                         attachment_for_download)
+from app.pagination import request_cursor, fragment_response, encode_cursor, decode_cursor, InvalidCursor
+from app.activity import record_update
+from app.projects.export import csv_chunks, json_chunks
+from app.search import search as search_index
+from app.events import broker, project_channel, format_event
+from app.caching import conditional
+from app.replicas import use_primary
+from app.jobs import enqueue
+from app.invites.tasks import DELIVER_INVITE
+from app.archive import archived_project
+from app.purge import soft_delete
+from app.attachments import InvalidAttachment, attach, check_uploads, send_attachment
+from app import inbox
 
 projects_bp = Blueprint('projects', __name__)
 
@@ -15,9 +33,7 @@ def new_project():
     form = ProjectForm()
     
     # Haal alle clients van deze freelancer op
-    my_client_relations = ClientFreelancerRelation.query.filter_by(freelancer_id=current_user.id).all()
-    my_client_ids = [r.client_id for r in my_client_relations]
-    my_clients = User.query.filter(User.id.in_(my_client_ids)).all() if my_client_ids else []
+    my_clients = freelancer_clients(current_user)
     
     # Populate dropdown
     form.existing_client_id.choices = [(0, '-- Geen client toewijzen --')] + [(c.id, f"{c.username} ({c.email})") for c in my_clients]
@@ -80,6 +96,9 @@ def new_project():
                         project_id=project.id
                     )
                     db.session.add(invite)
+                    db.session.flush()
+                    # Mail gaat via de worker, in dezelfde transactie ingepland
+                    enqueue(DELIVER_INVITE, invite_id=invite.id)
                     flash(f'📧 Uitnodiging verstuurd naar {client_email}', 'info')
                 else:
                     # Update bestaande invite met project_id
@@ -87,6 +106,7 @@ def new_project():
                     flash(f'ℹ️ Bestaande uitnodiging gekoppeld aan dit project', 'info')
         
         db.session.add(project)
+        inbox.project_changed(project, 'project_created', current_user.id)
         db.session.commit()
         
         return redirect(url_for('main.dashboard'))
@@ -94,11 +114,165 @@ def new_project():
     return render_template('projects/new.html', form=form, my_clients=my_clients)
 
 
+@projects_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_clients_csv():
+    """Bulk-import van (email, project)-regels uit een CSV-bestand"""
+    if not current_user.is_freelancer():
+        flash('Alleen freelancers kunnen clients importeren', 'danger')
+        return redirect(url_for('main.dashboard'))
+    
+    form = ImportClientsForm()
+    results = None
+    
+    if form.validate_on_submit():
+        # Pas hier laden: de importer haalt email_validator (en dnspython) binnen
+        from app.projects.importer import parse_upload, import_clients, InvalidImportFile
+        try:
+            rows = parse_upload(form.csv_file.data, current_app.config['IMPORT_MAX_ROWS'])
+        except InvalidImportFile as error:
+            flash(f'❌ {error}', 'danger')
+            return redirect(url_for('projects.import_clients_csv'))
+        
+        results = import_clients(current_user.id, rows)
+        imported = sum(1 for row in results if row.ok)
+        flash(f'✅ {imported} van {len(results)} regels geïmporteerd', 'success' if imported == len(results) else 'warning')
+    
+    return render_template('projects/import.html', form=form, results=results)
+
+
+@projects_bp.route('/search')
+@login_required
+def search():
+    """Zoeken in projecten en updates waar de gebruiker toegang toe heeft"""
+    query = request.args.get('q', '').strip()
+    hits = search_index(current_user, query) if query else []
+    return render_template('projects/search.html', query=query, hits=hits)
+
+
 @projects_bp.route('/<int:project_id>')
 @login_required
+@conditional(project_version)
 def detail(project_id):
-    project = Project.query.get_or_404(project_id)
+    project = project_for_detail(project_id, or_404=False)
+    if project is None:
+        return _archived_detail(project_id)
+    _check_view_access(project)
+    
+    updates = project_updates(project)
+    
+    # Live stream begint na de nieuwste update op de pagina
+    newest = updates.items[0] if updates else None
+    stream_cursor = encode_cursor(newest.created_at, newest.id) if newest else encode_cursor(project.created_at, 0)
+    
+    return render_template('projects/detail.html', project=project, updates=updates,
+                           stream_cursor=stream_cursor)
+
+
+def _archived_detail(project_id):
+    """Alleen-lezen weergave van een gearchiveerd project, of 404"""
+    project, updates = archived_project(project_id)
+    if project is None:
+        abort(404)
+    _check_view_access(project)
+    return render_template('projects/archived.html', project=project, updates=updates)
+
+
+@projects_bp.route('/<int:project_id>/updates')
+@login_required
+def updates_more(project_id):
+    """Volgende pagina updates als HTML-fragment ("Meer laden")"""
+    project = project_for_detail(project_id)
+    _check_view_access(project)
+    
+    updates = project_updates(project, request_cursor())
+    
+    return fragment_response(render_template('projects/_updates.html', updates=updates), updates)
+
+
+@projects_bp.route('/<int:project_id>/updates/new')
+@login_required
+def updates_new(project_id):
+    """Updates ná de cursor als HTML-fragment, nieuwste eerst (live updates zonder SSE)
+    
+    Eén korte request per interval in plaats van een thread per open tab.
+    De nieuwe cursor staat in ``X-Next-Cursor``; 204 als er niets nieuws is.
+    """
+    project = project_for_detail(project_id)
+    _check_view_access(project)
+    
+    try:
+        updates = project_updates_after(project_id, request.args.get('cursor', ''),
+                                        current_app.config['UPDATES_PER_PAGE'])
+    except InvalidCursor:
+        abort(400)
+    if not updates:
+        return Response(status=204)
     
+    response = Response(render_template('projects/_updates.html', updates=reversed(updates)))
+    response.headers['X-Next-Cursor'] = encode_cursor(updates[-1].created_at, updates[-1].id)
+    return response
+
+
+@projects_bp.route('/<int:project_id>/stream')
+@login_required
+@use_primary
+def stream(project_id):
+    """Server-Sent Events: nieuwe updates na de cursor, als HTML-fragmenten
+    
+    Na een verbroken verbinding stuurt de browser de laatste event-id mee
+    (``Last-Event-ID``), zodat er niets gemist wordt.
+    """
+    if current_app.config.get('LIVE_UPDATES') != 'sse':
+        # 204: de browser stopt met opnieuw verbinden (een pagina van vóór het omzetten)
+        return Response(status=204)
+    project = project_for_detail(project_id)
+    _check_view_access(project)
+    
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+    try:
+        decode_cursor(cursor or '')
+    except InvalidCursor:
+        abort(400)
+    
+    # Eerst abonneren, dan pas ophalen: zo valt er niets tussen de wal en het schip
+    subscription = broker.subscribe(project_channel(project_id))
+    heartbeat = current_app.config['SSE_HEARTBEAT']
+    deadline = time.monotonic() + current_app.config['SSE_MAX_DURATION']
+    batch_size = current_app.config['UPDATES_PER_PAGE']
+    
+    def events():
+        nonlocal cursor
+        yield 'retry: 2000\n\n'
+        changed = True
+        while True:
+            while changed:
+                updates = project_updates_after(project_id, cursor, batch_size)
+                if updates:
+                    cursor = encode_cursor(updates[-1].created_at, updates[-1].id)
+                    html = render_template('projects/_updates.html', updates=reversed(updates))
+                    yield format_event(html, event='update', event_id=cursor)
+                changed = len(updates) == batch_size
+            
+            # Geen databaseverbinding vasthouden tijdens het wachten
+            db.session.remove()
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            changed = subscription.wait(min(heartbeat, remaining))
+            if not changed:
+                yield ': keepalive\n\n'
+    
+    db.session.remove()
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+def _check_view_access(project):
+    """403 tenzij de ingelogde gebruiker de freelancer of client van het project is"""
     if current_user.is_freelancer():
         if project.freelancer_id != current_user.id:
             abort(403)
@@ -107,16 +281,12 @@ def detail(project_id):
             abort(403)
     else:
         abort(403)
-    
-    updates = project.updates.order_by(Update.created_at.desc()).all()
-    
-    return render_template('projects/detail.html', project=project, updates=updates)
 
 
 @projects_bp.route('/<int:project_id>/add-update', methods=['POST'])
 @login_required
 def add_update(project_id):
-    project = Project.query.get_or_404(project_id)
+    project = project_for_detail(project_id)
     
     has_access = False
     if current_user.is_freelancer() and project.freelancer_id == current_user.id:
@@ -127,29 +297,56 @@ def add_update(project_id):
     if not has_access:
         abort(403)
     
-    content = request.form.get('content')
+    # Vóór het eerste gebruik van request.form; bestanden stromen naar de blob store (app.blobs)
+    request.max_content_length = current_app.config['ATTACHMENT_MAX_SIZE']
+    try:
+        content = (request.form.get('content') or '').strip()
+        uploads = [upload for upload in request.files.getlist('attachments') if upload.filename]
+        check_uploads(uploads)
+    except RequestEntityTooLarge:
+        flash(f"❌ Bijlagen zijn te groot (maximaal {current_app.config['ATTACHMENT_MAX_SIZE'] // (1024 * 1024)} MB per update)", 'danger')
+        return redirect(url_for('projects.detail', project_id=project_id))
+    except InvalidAttachment as error:
+        flash(f'❌ {error}', 'danger')
+        return redirect(url_for('projects.detail', project_id=project_id))
     
-    if not content or len(content.strip()) == 0:
+    if not content and not uploads:
         flash('Update mag niet leeg zijn', 'danger')
         return redirect(url_for('projects.detail', project_id=project_id))
     
     update = Update(
-        content=content.strip(),
+        content=content,
         project_id=project_id,
         author_id=current_user.id
     )
     
     db.session.add(update)
+    if uploads:
+        attach(update, uploads)
+    record_update(project, update)
+    inbox.update_posted(project, [update])
     db.session.commit()
+    broker.publish(project_channel(project_id))
     
     flash('✅ Update geplaatst!', 'success')
     return redirect(url_for('projects.detail', project_id=project_id))
 
 
+@projects_bp.route('/<int:project_id>/attachments/<int:attachment_id>')
+@login_required
+def attachment(project_id, attachment_id):
+    """Bijlage downloaden (met Range); zelfde toegang als de detailpagina, ook na archiveren"""
+    attachment, owners = attachment_for_download(project_id, attachment_id)
+    if attachment is None or owners is None:
+        abort(404)
+    _check_view_access(owners)
+    return send_attachment(attachment)
+
+
 @projects_bp.route('/<int:project_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_project(project_id):
-    project = Project.query.get_or_404(project_id)
+    project = project_for_detail(project_id)
     
     if not current_user.is_freelancer() or project.freelancer_id != current_user.id:
         abort(403)
@@ -157,9 +354,7 @@ def edit_project(project_id):
     form = ProjectForm(obj=project)
     
     # Haal clients op voor dropdown
-    my_client_relations = ClientFreelancerRelation.query.filter_by(freelancer_id=current_user.id).all()
-    my_client_ids = [r.client_id for r in my_client_relations]
-    my_clients = User.query.filter(User.id.in_(my_client_ids)).all() if my_client_ids else []
+    my_clients = freelancer_clients(current_user)
     
     form.existing_client_id.choices = [(0, '-- Geen client toewijzen --')] + [(c.id, f"{c.username} ({c.email})") for c in my_clients]
     
@@ -194,6 +389,8 @@ def edit_project(project_id):
                     
                     flash(f'✅ Project bijgewerkt en gekoppeld aan {existing_client.username}', 'success')
         
+        if db.session.is_modified(project):
+            inbox.project_changed(project, 'project_updated', current_user.id)
         db.session.commit()
         flash('✅ Project succesvol bijgewerkt!', 'success')
         return redirect(url_for('projects.detail', project_id=project.id))
@@ -209,15 +406,39 @@ def edit_project(project_id):
 @projects_bp.route('/<int:project_id>/delete', methods=['POST'])
 @login_required
 def delete_project(project_id):
-    project = Project.query.get_or_404(project_id)
+    project = project_for_detail(project_id)
     
     if not current_user.is_freelancer() or project.freelancer_id != current_user.id:
         abort(403)
     
     project_name = project.project_name
     
-    db.session.delete(project)
+    # Updates en uitnodigingen ruimt de worker in batches op (app.purge)
+    soft_delete(project)
     db.session.commit()
     
     flash(f'🗑️ Project "{project_name}" verwijderd', 'success')
-    return redirect(url_for('main.dashboard'))
\ No newline at end of file
+    return redirect(url_for('main.dashboard'))
+
+
+@projects_bp.route('/export.<fmt>')
+@login_required
+def export(fmt):
+    """Alle projecten en updates van de freelancer als CSV of JSON (gestreamd)"""
+    if not current_user.is_freelancer():
+        abort(403)
+    
+    formats = {
+        'csv': (csv_chunks, 'text/csv; charset=utf-8'),
+        'json': (json_chunks, 'application/json'),
+    }
+    if fmt not in formats:
+        abort(404)
+    
+    chunks, mimetype = formats[fmt]
+    filename = f"klantsync-export-{datetime.utcnow().strftime('%Y%m%d')}.{fmt}"
+    
+    return Response(stream_with_context(chunks(current_user.id)), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}',
+        'X-Accel-Buffering': 'no',  # geen buffering in nginx: eerste bytes direct door
+    })
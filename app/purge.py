@@ -0,0 +1,146 @@
+"""Opruimen van verwijderde projecten.
+
+``projects.delete_project`` doet alleen een soft-delete (``soft_delete``):
+het project krijgt ``deleted_at``, verdwijnt direct uit dashboards, detail,
+zoeken en export, en er komt een ``purge_project``-job in de queue. Het
+request raakt de updates niet aan, hoe veel het er ook zijn.
+
+De job (``purge_project``) verwijdert de updates in batches van
+``PURGE_BATCH_SIZE`` met set-based DELETEs, één transactie per batch,
+ontkoppelt daarna de uitnodigingen (als de ORM-cascade voorheen deed),
+haalt de inbox-items en bijlagen van het project weg en verwijdert tot
+slot het project zelf. De blobs van die bijlagen ruimt
+``app.attachments.collect_garbage`` later op. Een onderbroken purge gaat bij een
+nieuwe poging verder waar hij was. De periodieke ronde pakt projecten op
+waarvan de job verloren ging of dood is.
+"""
+import logging
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+from app.jobs import enqueue, handler, periodic
+from app.models import db, Project, Update, ClientInvite, InboxItem, Attachment
+from app.search import unindex
+
+logger = logging.getLogger(__name__)
+
+PURGE_PROJECT = 'purge_project'
+
+
+class PurgeStats:
+    def __init__(self):
+        self.projects = 0
+        self.updates = 0
+        self.invites = 0
+        self.inbox_items = 0
+        self.attachments = 0
+        self.batches = 0
+
+
+def soft_delete(project):
+    """Markeer een project als verwijderd en plan het opruimen in; committen doet de aanroeper"""
+    project.deleted_at = datetime.utcnow()
+    unindex(db.session, [project.id])
+    enqueue(PURGE_PROJECT, project_id=project.id)
+
+
+@handler(PURGE_PROJECT)
+def purge_project(project_id, batch_size=None, progress=None, stats=None):
+    """Ruim één verwijderd project op; ``progress(project_id, verwijderd, over)`` na elke batch"""
+    batch_size = batch_size or current_app.config.get('PURGE_BATCH_SIZE', 1000)
+    stats = stats or PurgeStats()
+    row = db.session.execute(select(Project.deleted_at).where(Project.id == project_id)).first()
+    if row is None or row.deleted_at is None:
+        # Al opgeruimd, of niet (meer) verwijderd
+        return stats
+
+    removed = 0
+    while True:
+        update_ids = db.session.execute(
+            select(Update.id).where(Update.project_id == project_id)
+            .order_by(Update.created_at, Update.id).limit(batch_size)
+        ).scalars().all()
+        if not update_ids:
+            break
+        db.session.execute(
+            delete(Update).where(Update.id.in_(update_ids)).execution_options(synchronize_session=False)
+        )
+        unindex(db.session, update_ids=update_ids)
+        db.session.commit()
+        removed += len(update_ids)
+        stats.updates += len(update_ids)
+        stats.batches += 1
+        if progress:
+            progress(project_id, removed, remaining_updates(project_id))
+
+    while True:
+        invite_ids = select(ClientInvite.id).where(ClientInvite.project_id == project_id).limit(batch_size)
+        result = db.session.execute(
+            update(ClientInvite).where(ClientInvite.id.in_(invite_ids.scalar_subquery()))
+            .values(project_id=None).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        stats.invites += result.rowcount
+        if result.rowcount < batch_size:
+            break
+
+    while True:
+        item_ids = select(InboxItem.id).where(InboxItem.project_id == project_id).limit(batch_size)
+        result = db.session.execute(
+            delete(InboxItem).where(InboxItem.id.in_(item_ids.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        stats.inbox_items += result.rowcount
+        if result.rowcount < batch_size:
+            break
+
+    while True:
+        attachment_ids = select(Attachment.id).where(Attachment.project_id == project_id).limit(batch_size)
+        result = db.session.execute(
+            delete(Attachment).where(Attachment.id.in_(attachment_ids.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        stats.attachments += result.rowcount
+        if result.rowcount < batch_size:
+            break
+
+    db.session.execute(
+        delete(Project).where(Project.id == project_id, Project.deleted_at.is_not(None))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    stats.projects += 1
+    logger.info('Verwijderd project %s opgeruimd (%s updates)', project_id, removed)
+    return stats
+
+
+def remaining_updates(project_id):
+    return db.session.execute(select(func.count(Update.id)).where(Update.project_id == project_id)).scalar()
+
+
+def pending_purges():
+    """``(id, naam, verwijderd op, updates over)`` per nog op te ruimen project, oudste eerst"""
+    remaining = select(func.count(Update.id)).where(Update.project_id == Project.id).scalar_subquery()
+    return db.session.execute(
+        select(Project.id, Project.project_name, Project.deleted_at, remaining)
+        .where(Project.deleted_at.is_not(None)).order_by(Project.deleted_at, Project.id)
+    ).all()
+
+
+def purge_deleted(batch_size=None, progress=None):
+    """Ruim alle verwijderde projecten op"""
+    stats = PurgeStats()
+    project_ids = db.session.execute(
+        select(Project.id).where(Project.deleted_at.is_not(None)).order_by(Project.deleted_at, Project.id)
+    ).scalars().all()
+    for project_id in project_ids:
+        purge_project(project_id, batch_size, progress, stats)
+    return stats
+
+
+@periodic('PURGE_INTERVAL')
+def purge_leftovers():
+    """Vangnet voor projecten waarvan de purge-job verloren ging of dood is"""
+    return purge_deleted()
@@ -0,0 +1,227 @@
+"""Query-laag voor dashboards, projectdetails, uitnodigingen en de inbox.
+
+De templates lezen relaties zoals ``project.client``, ``update.author`` en
+``invite.project``. Zonder expliciete laadstrategie kost elke rij daarvoor een
+extra SELECT. De functies hieronder laden die relaties mee, zodat het aantal
+queries per pagina vast is, hoeveel rijen er ook zijn.
+"""
+from flask import current_app
+from sqlalchemy import func, select, tuple_, union_all
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import db, User, Project, Update, ClientInvite, ClientFreelancerRelation, ProjectArchive, InboxItem, Attachment
+from app.pagination import keyset_page, decode_cursor
+
+
+# Sorteringen voor dashboards; elke kolom heeft een (eigenaar, kolom, id)-index
+PROJECT_SORTS = {
+    'created': Project.created_at,
+    'activity': Project.last_activity_at,
+}
+
+
+def freelancer_projects(freelancer, cursor=None, sort='created'):
+    """Pagina projecten van een freelancer, met client in dezelfde query"""
+    query = Project.query.filter(
+        Project.freelancer_id == freelancer.id,
+        Project.deleted_at.is_(None)
+    ).options(
+        joinedload(Project.client),
+        joinedload(Project.last_update_author)
+    )
+    return keyset_page(query, PROJECT_SORTS[sort], Project.id, cursor,
+                       current_app.config['PROJECTS_PER_PAGE'])
+
+
+def client_projects(client, cursor=None, sort='created'):
+    """Pagina projecten van een client, met freelancer in dezelfde query"""
+    query = Project.query.filter(
+        Project.client_id == client.id,
+        Project.deleted_at.is_(None)
+    ).options(
+        joinedload(Project.freelancer),
+        joinedload(Project.last_update_author)
+    )
+    return keyset_page(query, PROJECT_SORTS[sort], Project.id, cursor,
+                       current_app.config['PROJECTS_PER_PAGE'])
+
+
+def dashboard_projects(user, cursor=None, sort='created'):
+    """Pagina projecten voor het dashboard van de ingelogde gebruiker"""
+    if user.is_freelancer():
+        return freelancer_projects(user, cursor, sort)
+    return client_projects(user, cursor, sort)
+
+
+def project_for_detail(project_id, or_404=True):
+    """Eén project met freelancer en client; 404 (of None) als het niet bestaat of verwijderd is"""
+    query = Project.query.filter(
+        Project.id == project_id,
+        Project.deleted_at.is_(None)
+    ).options(
+        joinedload(Project.freelancer),
+        joinedload(Project.client)
+    )
+    return query.first_or_404() if or_404 else query.one_or_none()
+
+
+def project_updates(project, cursor=None):
+    """Pagina updates van een project, nieuwste eerst, auteurs en bijlagen in elk één extra IN-query"""
+    query = Update.query.filter(
+        Update.project_id == project.id
+    ).options(
+        selectinload(Update.author),
+        selectinload(Update.attachments)
+    )
+    return keyset_page(query, Update.created_at, Update.id, cursor,
+                       current_app.config['UPDATES_PER_PAGE'])
+
+
+def project_updates_after(project_id, cursor, limit):
+    """Updates ná de cursor, oudste eerst (voor de live stream)"""
+    value, row_id = decode_cursor(cursor)
+    return Update.query.filter(
+        Update.project_id == project_id,
+        tuple_(Update.created_at, Update.id) > tuple_(value, row_id)
+    ).options(
+        selectinload(Update.author),
+        selectinload(Update.attachments)
+    ).order_by(Update.created_at, Update.id).limit(limit).all()
+
+
+def freelancer_invites(freelancer, status, limit=None):
+    """Uitnodigingen van een freelancer met een bepaalde status, met project"""
+    query = ClientInvite.query.filter(
+        ClientInvite.freelancer_id == freelancer.id,
+        ClientInvite.status == status
+    ).options(
+        joinedload(ClientInvite.project)
+    ).order_by(ClientInvite.created_at.desc())
+
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def freelancer_clients(freelancer):
+    """Alle clients die aan een freelancer gekoppeld zijn, in één join
+
+    Op naam gesorteerd in Python: geen index levert users via de koppeltabel
+    op volgorde, en het zijn de clients van één freelancer.
+    """
+    clients = User.query.join(
+        ClientFreelancerRelation, ClientFreelancerRelation.client_id == User.id
+    ).filter(
+        ClientFreelancerRelation.freelancer_id == freelancer.id
+    ).all()
+    return sorted(clients, key=lambda user: user.username)
+
+
+def accessible_projects(user, project_ids, options=()):
+    """Projecten uit ``project_ids`` waarvan ``user`` de freelancer of client is, in één query"""
+    owner = Project.freelancer_id if user.is_freelancer() else Project.client_id
+    return Project.query.filter(
+        Project.id.in_(project_ids),
+        owner == user.id,
+        Project.deleted_at.is_(None)
+    ).options(*options).all()
+
+
+def latest_updates(project_ids, limit, options=()):
+    """De ``limit`` nieuwste updates van elk project, in één query
+
+    Per project een index-seek met LIMIT (samengevoegd met UNION ALL), zodat
+    een project met tienduizenden updates niet helemaal gelezen wordt. De
+    hooguit ``limit`` rijen per project worden in Python op volgorde gezet.
+    """
+    if not project_ids or limit <= 0:
+        return []
+    newest = [
+        select(Update.id).where(Update.project_id == project_id)
+        .order_by(Update.created_at.desc(), Update.id.desc()).limit(limit).subquery()
+        for project_id in project_ids
+    ]
+    ids = union_all(*(select(subquery.c.id) for subquery in newest)) if len(newest) > 1 else select(newest[0].c.id)
+    updates = Update.query.filter(Update.id.in_(ids)).options(*options).all()
+    updates.sort(key=lambda update: (update.created_at, update.id), reverse=True)
+    updates.sort(key=lambda update: update.project_id)
+    return updates
+
+
+def attachment_for_download(project_id, attachment_id):
+    """``(bijlage, (freelancer_id, client_id))`` van een actief of gearchiveerd project; None voor wat ontbreekt"""
+    attachment = Attachment.query.filter_by(id=attachment_id, project_id=project_id).first()
+    if attachment is None:
+        return None, None
+    owners = db.session.execute(
+        select(Project.freelancer_id, Project.client_id).where(Project.id == project_id, Project.deleted_at.is_(None))
+    ).first() or db.session.execute(
+        select(ProjectArchive.freelancer_id, ProjectArchive.client_id).where(ProjectArchive.id == project_id)
+    ).first()
+    return attachment, owners
+
+
+def inbox_items(user, cursor=None):
+    """Pagina uit de inbox van ``user``, nieuwste eerst, met de actor in dezelfde query"""
+    query = InboxItem.query.filter(
+        InboxItem.user_id == user.id
+    ).options(
+        joinedload(InboxItem.actor)
+    )
+    return keyset_page(query, InboxItem.created_at, InboxItem.id, cursor,
+                       current_app.config['INBOX_PER_PAGE'])
+
+
+def inbox_unread(user):
+    """Aantal ongelezen inbox-items (partiële index op ongelezen items)"""
+    return InboxItem.query.with_entities(func.count(InboxItem.id)).filter(
+        InboxItem.user_id == user.id,
+        InboxItem.read_at.is_(None)
+    ).scalar()
+
+
+# --- Versiestempels voor conditional GET (zie app.caching) --------------------
+
+def inbox_state(user):
+    """Aantal ongelezen en tijdstip van het nieuwste inbox-item, als scalar subqueries"""
+    unread = select(func.count(InboxItem.id)).where(
+        InboxItem.user_id == user.id, InboxItem.read_at.is_(None)
+    ).scalar_subquery()
+    newest = select(func.max(InboxItem.created_at)).where(InboxItem.user_id == user.id).scalar_subquery()
+    return unread, newest
+
+
+def dashboard_version(user):
+    """Aantal projecten en laatste wijziging op het dashboard van ``user``; voor clients ook de inbox"""
+    owner = Project.freelancer_id if user.is_freelancer() else Project.client_id
+    inbox = inbox_state(user) if user.is_client() else ()
+    count, updated_at, *inbox_parts = Project.query.with_entities(
+        func.count(Project.id), func.max(Project.updated_at), *inbox
+    ).filter(owner == user.id, Project.deleted_at.is_(None)).one()
+    return (count, updated_at, *inbox_parts), max(filter(None, (updated_at, *inbox_parts[1:])), default=None)
+
+
+def inbox_version(user):
+    """Ongelezen items en nieuwste item in de inbox van ``user``"""
+    unread, newest = db.session.execute(select(*inbox_state(user))).one()
+    return (unread, newest), newest
+
+
+def project_version(project_id):
+    """Revisie van een project; voor een gearchiveerd project de archiefdatum; anders None"""
+    row = Project.query.with_entities(Project.revision, Project.updated_at).filter_by(
+        id=project_id, deleted_at=None).first()
+    if row is None:
+        archived_at = ProjectArchive.query.with_entities(ProjectArchive.archived_at).filter_by(id=project_id).scalar()
+        return (('archived', archived_at), archived_at) if archived_at else None
+    return tuple(row), row.updated_at
+
+
+def invites_version(freelancer):
+    """Uitnodigingen van een freelancer plus de namen van zijn projecten"""
+    projects_updated = select(func.max(Project.updated_at)).where(
+        Project.freelancer_id == freelancer.id
+    ).scalar_subquery()
+    count, updated_at, projects_at = ClientInvite.query.with_entities(
+        func.count(ClientInvite.id), func.max(ClientInvite.updated_at), projects_updated
+    ).filter(ClientInvite.freelancer_id == freelancer.id).one()
+    return (count, updated_at, projects_at), max(filter(None, (updated_at, projects_at)), default=None)
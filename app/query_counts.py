@@ -0,0 +1,116 @@
+"""Controle dat het aantal queries per pagina niet met het aantal rijen groeit.
+
+Draait dezelfde routes als ``app.query_plans`` twee keer: tegen een
+database met één rij per soort (projecten, updates, bijlagen,
+uitnodigingen, inbox-items) en tegen een met ``rows`` rijen per soort. Per
+endpoint telt het de statements van het duurste request. Groeit dat aantal,
+dan laadt een template ergens per rij een relatie na (N+1).
+
+Caches (gebruikers, projectkaarten) staan uit: die verbergen een N+1 zodra
+ze warm zijn. Alle rijen passen op de eerste pagina, dus de "Meer
+laden"-routes komen niet langs; die gebruiken dezelfde queryfuncties.
+"""
+from itertools import count
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from app.models import db, User, Project, Update, ClientInvite, ClientFreelancerRelation, InboxItem, Blob, Attachment
+from app.query_plans import PASSWORD, _drive_routes, ensure_disposable
+
+
+class CountResult:
+    def __init__(self, endpoint, few, many):
+        self.endpoint = endpoint
+        self.few = few
+        self.many = many
+
+    @property
+    def ok(self):
+        return self.many <= self.few
+
+
+def check_query_counts(rows=10, allow_drop=False):
+    """Queries per endpoint bij 1 en bij ``rows`` rijen; geeft ``CountResult``-en"""
+    from config import config
+
+    # Vóór create_app: die maakt in de testconfig de tabellen al aan
+    ensure_disposable(config['testing'].SQLALCHEMY_DATABASE_URI, allow_drop)
+    few = _count_queries(1, rows)
+    many = _count_queries(rows, rows)
+    return [CountResult(endpoint, few.get(endpoint, 0), many[endpoint]) for endpoint in sorted(many)]
+
+
+def _count_queries(rows, per_page):
+    from app import create_app
+
+    # Pagina's zo groot dat alle rijen op de eerste pagina staan, in beide runs even groot
+    app = create_app('testing', PROJECTS_PER_PAGE=per_page, UPDATES_PER_PAGE=per_page, INBOX_PER_PAGE=per_page,
+                     USER_CACHE_BACKEND='none', FRAGMENT_CACHE_BACKEND='none', THROTTLE_BACKEND='none')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        ids = _seed(rows)
+        engine = db.engine
+
+    requests = count()
+    counts = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            # g hoort bij één request: elk request krijgt een eigen teller
+            key = g.setdefault('query_count_key', (request.endpoint, next(requests)))
+            counts[key] = counts.get(key, 0) + 1
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        _drive_routes(app, ids)
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+        with app.app_context():
+            db.drop_all()
+
+    result = {}
+    for (endpoint, _), statements in counts.items():
+        result[endpoint] = max(result.get(endpoint, 0), statements)
+    return result
+
+
+def _seed(rows):
+    freelancer = User(username='count-freelancer', email='freelancer@example.com', role='freelancer')
+    client = User(username='count-client', email='client@example.com', role='client')
+    # Elk project van de freelancer bij een andere client
+    others = [User(username=f'count-client-{i}', email=f'client-{i}@example.com', role='client')
+              for i in range(1, rows)]
+    for user in [freelancer, client] + others:
+        user.set_password(PASSWORD)
+    db.session.add_all([freelancer, client] + others)
+    db.session.flush()
+
+    clients = [client] + others
+    db.session.add_all([ClientFreelancerRelation(client_id=row.id, freelancer_id=freelancer.id) for row in clients])
+    projects = [Project(project_name=f'Telling {i}', client_name='Telling', description='Telling',
+                        freelancer_id=freelancer.id, client_id=row.id) for i, row in enumerate(clients)]
+    db.session.add_all(projects)
+    db.session.flush()
+
+    # Elke rij een andere gebruiker: een al geladen gebruiker zou een N+1 uit de identity map bedienen
+    updates = [Update(content=f'Update {i}', project_id=projects[0].id, author_id=row.id)
+               for i, row in enumerate(clients)]
+    db.session.add_all(updates)
+    db.session.flush()
+    db.session.add_all([Blob(sha256=f'{i:064x}', size=1) for i in range(rows)])
+    attachments = [Attachment(update_id=update.id, project_id=projects[0].id, sha256=f'{i:064x}',
+                              filename=f'telling-{i}.txt', content_type='text/plain', size=1)
+                   for i, update in enumerate(updates)]
+    db.session.add_all(attachments)
+
+    invites = [ClientInvite(email=f'nieuw-{i}@example.com', token=ClientInvite.generate_token(),
+                            freelancer_id=freelancer.id, project_id=projects[i].id) for i in range(rows)]
+    db.session.add_all(invites)
+    db.session.add_all([ClientInvite(email=f'oud-{i}@example.com', token=ClientInvite.generate_token(),
+                                     freelancer_id=freelancer.id, status='accepted') for i in range(rows)])
+    db.session.add_all([InboxItem(user_id=client.id, kind='update', actor_id=row.id, project_id=projects[0].id,
+                                  project_name=projects[0].project_name, summary=f'Update {i}')
+                        for i, row in enumerate(clients)])
+    db.session.commit()
+
+    return {'project': projects[0].id, 'token': invites[0].token, 'attachment': attachments[0].id}
@@ -0,0 +1,202 @@
+"""Query-plan controle voor alle leesroutes.
+
+Draait de echte routes via de test client tegen een lege testdatabase,
+vangt elke SELECT op die ze uitvoeren en laat de database er een EXPLAIN
+op doen. Een query die terugvalt op een volledige tabelscan of op een
+sortering zonder index wordt als fout gemeld, zodat een ontbrekende index
+opvalt vóór hij in productie pijn doet.
+"""
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from app.models import db, User, Project, Update, ClientInvite, ClientFreelancerRelation, InboxItem, Blob, Attachment
+from app.pagination import encode_cursor
+
+PASSWORD = 'query-plan-check'
+
+
+class PlanResult:
+    """EXPLAIN-resultaat van één opgevangen query"""
+
+    def __init__(self, endpoint, statement, plan, full_scans, sorts):
+        self.endpoint = endpoint
+        self.statement = statement
+        self.plan = plan
+        self.full_scans = full_scans
+        self.sorts = sorts
+
+    @property
+    def ok(self):
+        return not self.full_scans and not self.sorts
+
+
+def disposable_database(uri):
+    """True voor SQLite in het geheugen of een bestand in de tijdelijke map"""
+    url = make_url(uri)
+    if not url.drivername.startswith('sqlite'):
+        return False
+    if url.database in (None, '', ':memory:'):
+        return True
+    return os.path.realpath(url.database).startswith(os.path.realpath(tempfile.gettempdir()) + os.sep)
+
+
+def ensure_disposable(uri, allow_drop=False):
+    """Weiger een database die de controle zou leeggooien, tenzij ``allow_drop``"""
+    if not allow_drop and not disposable_database(uri):
+        shown = make_url(uri).render_as_string(hide_password=True)
+        raise RuntimeError(f'{shown} is geen tijdelijke database, maar alle tabellen zouden worden weggegooid. '
+                           'Gebruik --yes-drop als dat de bedoeling is.')
+
+
+def check_route_queries(app, allow_drop=False):
+    """Draai alle leesroutes en geef per unieke query een ``PlanResult``"""
+    ensure_disposable(app.config['SQLALCHEMY_DATABASE_URI'], allow_drop)
+    app.config['PROJECTS_PER_PAGE'] = 1
+    app.config['UPDATES_PER_PAGE'] = 1
+    app.config['INBOX_PER_PAGE'] = 1
+
+    captured = {}
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        ids = _seed()
+        engine = db.engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and has_request_context():
+            captured.setdefault(statement, (request.endpoint, parameters))
+
+    # Buiten de app context, zodat elk request zijn eigen context (en g) krijgt
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        _drive_routes(app, ids)
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+
+    with app.app_context():
+        results = []
+        with db.engine.connect() as conn:
+            for statement, (endpoint, parameters) in captured.items():
+                results.append(_explain(conn, endpoint, statement, parameters))
+        db.drop_all()
+
+    return results
+
+
+def _seed():
+    freelancer = User(username='plan-freelancer', email='freelancer@example.com', role='freelancer')
+    client = User(username='plan-client', email='client@example.com', role='client')
+    for user in (freelancer, client):
+        user.set_password(PASSWORD)
+    db.session.add_all([freelancer, client])
+    db.session.flush()
+
+    db.session.add(ClientFreelancerRelation(client_id=client.id, freelancer_id=freelancer.id))
+    projects = [Project(project_name=f'Plan {i}', client_name='Plan', description='Plan',
+                        freelancer_id=freelancer.id, client_id=client.id) for i in range(2)]
+    db.session.add_all(projects)
+    db.session.flush()
+
+    updates = [Update(content=f'Update {i}', project_id=projects[0].id, author_id=freelancer.id) for i in range(2)]
+    db.session.add_all(updates)
+    db.session.flush()
+    # Alleen de rijen: de route-check kijkt naar queries, het bestand zelf ontbreekt (404)
+    db.session.add(Blob(sha256='0' * 64, size=1))
+    attachment = Attachment(update_id=updates[0].id, project_id=projects[0].id, sha256='0' * 64,
+                            filename='plan.txt', content_type='text/plain', size=1)
+    db.session.add(attachment)
+    invite = ClientInvite(email='nieuw@example.com', token=ClientInvite.generate_token(),
+                          freelancer_id=freelancer.id, project_id=projects[0].id)
+    db.session.add(invite)
+    db.session.add(ClientInvite(email='oud@example.com', token=ClientInvite.generate_token(),
+                                freelancer_id=freelancer.id, status='accepted'))
+    db.session.add_all([InboxItem(user_id=client.id, kind='update', actor_id=freelancer.id, project_id=projects[0].id,
+                                  project_name=projects[0].project_name, summary=f'Update {i}') for i in range(2)])
+    db.session.commit()
+
+    return {'project': projects[0].id, 'token': invite.token, 'attachment': attachment.id}
+
+
+def _drive_routes(app, ids):
+    project_id = ids['project']
+
+    anonymous = app.test_client()
+    anonymous.get(f"/invites/accept/{ids['token']}")
+
+    freelancer = app.test_client()
+    freelancer.post('/auth/login', data={'email': 'freelancer@example.com', 'password': PASSWORD})
+    for url in ('/dashboard', '/dashboard/freelancer', '/invites/my-invites',
+                '/projects/new', f'/projects/{project_id}/edit'):
+        freelancer.get(url)
+    _follow_cursor(freelancer, '/dashboard', '/dashboard/more')
+    _follow_cursor(freelancer, '/dashboard?sort=activity', '/dashboard/more?sort=activity')
+    _follow_cursor(freelancer, f'/projects/{project_id}', f'/projects/{project_id}/updates')
+    freelancer.get(f"/projects/{project_id}/updates/new?cursor={encode_cursor(datetime(2000, 1, 1), 0)}")
+    for url in ('/api/v1/projects?sort=activity', f'/api/v1/projects/batch?ids={project_id}&updates=5',
+                f'/api/v1/projects/batch?ids={project_id},{project_id + 1}&updates=5&update_fields=id,author',
+                f'/api/v1/projects/{project_id}/updates', '/api/v1/invites?status=accepted'):
+        freelancer.get(url)
+
+    client = app.test_client()
+    client.post('/auth/login', data={'email': 'client@example.com', 'password': PASSWORD})
+    client.get('/dashboard/client')
+    _follow_cursor(client, '/dashboard', '/dashboard/more')
+    _follow_cursor(client, '/inbox', '/inbox/more')
+    _follow_cursor(client, '/dashboard?sort=activity', '/dashboard/more?sort=activity')
+    client.get(f'/projects/{project_id}')
+    client.get(f"/projects/{project_id}/attachments/{ids['attachment']}")
+
+
+def _follow_cursor(client, page_url, more_url):
+    """Open een pagina en daarna de "Meer laden"-pagina via zijn cursor"""
+    html = client.get(page_url).get_data(as_text=True)
+    match = re.search(r'data-cursor="([^"]+)"', html)
+    if match:
+        separator = '&' if '?' in more_url else '?'
+        client.get(f'{more_url}{separator}cursor={match.group(1)}')
+
+
+def _explain(conn, endpoint, statement, parameters):
+    if conn.dialect.name == 'postgresql':
+        return _explain_postgres(conn, endpoint, statement, parameters)
+    return _explain_sqlite(conn, endpoint, statement, parameters)
+
+
+def _explain_sqlite(conn, endpoint, statement, parameters):
+    rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    plan = [row[-1] for row in rows]
+
+    # Een SCAN over een subquery (co-routine of gematerialiseerd) leest alleen diens resultaat, geen tabel
+    subqueries = {step.split(' ', 1)[1] for step in plan if step.startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+    full_scans = [step for step in plan
+                  if step.startswith('SCAN ') and ' USING ' not in step and 'CONSTANT ROW' not in step
+                  and step[len('SCAN '):] not in subqueries]
+    sorts = [step for step in plan if step.startswith('USE TEMP B-TREE')]
+    return PlanResult(endpoint, statement, plan, full_scans, sorts)
+
+
+def _explain_postgres(conn, endpoint, statement, parameters):
+    # Zet seqscans uit: als Postgres dan nog een Seq Scan kiest, is er geen bruikbare index
+    with conn.begin():
+        conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        raw = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+
+    root = (raw if isinstance(raw, list) else json.loads(raw))[0]['Plan']
+    nodes = list(_walk_plan(root))
+    plan = [f"{node['Node Type']} {node.get('Relation Name', '')}".strip() for node in nodes]
+
+    full_scans = [step for step in plan if step.startswith('Seq Scan')]
+    sorts = [step for step in plan if step == 'Sort']
+    return PlanResult(endpoint, statement, plan, full_scans, sorts)
+
+
+def _walk_plan(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk_plan(child)
@@ -0,0 +1,146 @@
+"""Controle van de replica-routing met drie lokale SQLite-databases.
+
+Eén primary en twee replica's die als kopie beginnen; daarna krijgt het
+project in elke replica een eigen naam. Zo is aan zowel de gerenderde
+pagina als de opgevangen queries te zien welke database een request
+bediende.
+"""
+import os
+import sqlite3
+from flask import has_request_context, request
+from sqlalchemy import event
+from app.models import db, User, Project, Update, ClientInvite
+from app.replicas import STICKY_KEY
+
+PASSWORD = 'replica-check'
+
+
+class RoutingResult:
+    def __init__(self, name, ok, detail):
+        self.name = name
+        self.ok = ok
+        self.detail = detail
+
+
+def check_replica_routing(directory):
+    """Draai lees- en schrijfroutes tegen primary + 2 replica's; geef ``RoutingResult``-en"""
+    from app import create_app
+    from config import engine_options
+
+    paths = {name: os.path.join(directory, f'{name}.db') for name in ('primary', 'replica_0', 'replica_1')}
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+    urls = {name: f'sqlite:///{path}' for name, path in paths.items()}
+
+    app = create_app('testing',
+                     SQLALCHEMY_DATABASE_URI=urls['primary'],
+                     SQLALCHEMY_ENGINE_OPTIONS=engine_options(urls['primary']),
+                     REPLICA_URLS=[urls['replica_0'], urls['replica_1']],
+                     REPLICA_STICKY_SECONDS=60)
+
+    with app.app_context():
+        token = _seed()
+        engines = {name: db.engines[None if name == 'primary' else name] for name in paths}
+        for engine in engines.values():
+            engine.dispose()
+
+    # Replica's beginnen als kopie van de primary, elk met een herkenbare projectnaam
+    # (backup-API, want in WAL-mode staat nog niet alles in het hoofdbestand)
+    for name in ('replica_0', 'replica_1'):
+        with sqlite3.connect(paths['primary']) as source, sqlite3.connect(paths[name]) as target:
+            source.backup(target)
+            target.execute('UPDATE projects SET project_name = ?', (f'Project {name}',))
+
+    served = []
+
+    def listener(name):
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if has_request_context():
+                served.append((request.endpoint, name, statement.split(None, 1)[0].upper()))
+        return capture
+
+    listeners = [(engine, listener(name)) for name, engine in engines.items()]
+    for engine, capture in listeners:
+        event.listen(engine, 'before_cursor_execute', capture)
+
+    results = []
+
+    def databases(endpoint):
+        return {name for served_endpoint, name, _ in served if served_endpoint == endpoint}
+
+    def expect(name, response, endpoint, wanted, text=None):
+        used = databases(endpoint)
+        ok = response.status_code < 400 and used == wanted and (text is None or text in response.get_data(as_text=True))
+        results.append(RoutingResult(name, ok, f'status {response.status_code}, databases: {", ".join(sorted(used)) or "-"}'))
+        served.clear()
+
+    try:
+        client = app.test_client()
+        client.post('/auth/login', data={'email': 'freelancer@example.com', 'password': PASSWORD})
+        _clear_sticky(client)
+        served.clear()
+
+        response = client.get('/dashboard')
+        used = databases('main.dashboard')
+        results.append(RoutingResult('dashboard leest van een replica',
+                                     len(used) == 1 and used <= {'replica_0', 'replica_1'}
+                                     and 'Project replica_' in response.get_data(as_text=True),
+                                     f'databases: {", ".join(sorted(used)) or "-"}'))
+        served.clear()
+
+        response = client.post('/projects/1/add-update', data={'content': 'Geschreven op de primary'})
+        expect('add_update schrijft naar de primary', response, 'projects.add_update', {'primary'})
+
+        response = client.get('/projects/1')
+        expect('request na een write leest van de primary', response, 'projects.detail', {'primary'},
+               'Geschreven op de primary')
+
+        _clear_sticky(client)
+        response = client.get('/projects/1')
+        used = databases('projects.detail')
+        results.append(RoutingResult('na het sticky-venster weer een replica',
+                                     response.status_code == 200 and used and 'primary' not in used,
+                                     f'databases: {", ".join(sorted(used)) or "-"}'))
+        served.clear()
+
+        response = client.get(f'/invites/accept/{token}')
+        expect('@use_primary-view leest van de primary', response, 'invites.accept_invite', {'primary'})
+    finally:
+        for engine, capture in listeners:
+            event.remove(engine, 'before_cursor_execute', capture)
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        for path in paths.values():
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    return results
+
+
+def _seed():
+    db.drop_all()
+    db.create_all()
+    freelancer = User(username='replica-freelancer', email='freelancer@example.com', role='freelancer')
+    freelancer.set_password(PASSWORD)
+    db.session.add(freelancer)
+    db.session.flush()
+
+    project = Project(project_name='Project primary', client_name='Replica', description='Replica',
+                      freelancer_id=freelancer.id)
+    db.session.add(project)
+    db.session.flush()
+    db.session.add(Update(content='Eerste update', project_id=project.id, author_id=freelancer.id))
+
+    invite = ClientInvite(email='client@example.com', token=ClientInvite.generate_token(),
+                          freelancer_id=freelancer.id, project_id=project.id)
+    db.session.add(invite)
+    db.session.commit()
+    return invite.token
+
+
+def _clear_sticky(client):
+    with client.session_transaction() as session:
+        session.pop(STICKY_KEY, None)
@@ -0,0 +1,100 @@
+"""Leesverkeer naar read-replica's routeren.
+
+Replica's zijn gewone Flask-SQLAlchemy binds (``replica_0``, ``replica_1``,
+...) uit ``DATABASE_REPLICA_URLS``. ``RoutingSession`` kiest per query:
+
+* GET/HEAD-requests lezen van één (per request willekeurige) replica
+* flushes en DML-statements gaan altijd naar de primary, en daarna de rest
+  van het request ook
+* na een commit blijft de browser ``REPLICA_STICKY_SECONDS`` op de primary
+  (read-your-writes, ook als de replica nog wat achterloopt)
+* views met ``@use_primary`` lezen altijd van de primary, bijvoorbeeld
+  omdat ze bij een GET schrijven of geen vertraging mogen zien
+
+Zonder replica's verandert er niets.
+"""
+import random
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request, session as http_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+STICKY_KEY = '_primary_until'
+
+
+def use_primary(view):
+    """Markeer een view zodat hij alleen de primary gebruikt"""
+    view.use_primary = True
+    return view
+
+
+def replica_keys(app):
+    return app.extensions.get('replica_keys', [])
+
+
+def init_app(app):
+    """Vóór ``db.init_app``: replica's als binds registreren"""
+    from config import engine_options
+    from app.database import pool_options
+
+    urls = app.config.get('REPLICA_URLS') or []
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    keys = []
+    for index, url in enumerate(urls):
+        key = f'replica_{index}'
+        binds[key] = {'url': url, **engine_options(url), **pool_options(url)}
+        keys.append(key)
+    app.extensions['replica_keys'] = keys
+
+    if keys:
+        app.before_request(_choose_target)
+
+
+def _choose_target():
+    g.db_target = None
+    if request.method not in READ_METHODS:
+        return
+
+    view = current_app.view_functions.get(request.endpoint)
+    if getattr(view, 'use_primary', False):
+        return
+    if http_session.get(STICKY_KEY, 0) > time.time():
+        return
+
+    g.db_target = random.choice(replica_keys(current_app))
+
+
+class RoutingSession(Session):
+    """Session die leesqueries binnen een lees-request naar een replica stuurt"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        is_dml = getattr(clause, 'is_dml', False)
+        if is_dml:
+            # Core/bulk-writes via session.execute lopen niet via een flush
+            self.info['wrote'] = True
+        if bind is None and has_request_context() and g.get('db_target'):
+            if self._flushing or is_dml:
+                # Vanaf de eerste write leest dit request van de primary
+                g.db_target = None
+            else:
+                return self._db.engines[g.db_target]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    if session.info.pop('wrote', False) and has_request_context() and replica_keys(current_app):
+        http_session[STICKY_KEY] = time.time() + current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_write(session):
+    session.info.pop('wrote', None)
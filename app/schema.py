@@ -0,0 +1,124 @@
+"""Databaseschema bij het opstarten.
+
+Het schema wordt beheerd met migraties (Flask-Migrate/Alembic, map
+``migrations/``); ``flask db upgrade`` brengt een database naar de nieuwste
+versie. Wat de app zelf bij het opstarten doet, hangt af van ``SCHEMA_MODE``:
+
+* ``verify``: alleen de versie in ``alembic_version`` vergelijken met de
+  nieuwste migratie (één query, geen reflectie). Loopt de database achter,
+  dan antwoordt de app met 503 tot er gemigreerd is.
+* ``upgrade``: migraties uitvoeren; alleen voor ontwikkeling met één proces
+* ``create``: ``db.create_all()``, voor wegwerpdatabases (tests en checks)
+* ``none``: niets doen
+
+Alembic is een flinke import, dus webworkers laden het niet: de versies
+worden uit de migratiebestanden en de ``alembic_version``-tabel gelezen, en
+Flask-Migrate wordt alleen geregistreerd voor CLI-commando's en ``upgrade``.
+"""
+import os
+import re
+import click
+from sqlalchemy import inspect, text
+from app.models import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+BASELINE_REVISION = '0001'
+
+_REVISION = re.compile(r"^revision = '([^']+)'", re.M)
+_DOWN_REVISION = re.compile(r'^down_revision = (.*)$', re.M)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Autogenerate: de zoekindex (met FTS5-hulptabellen) staat niet in de modellen"""
+    return not (type_ == 'table' and name.startswith(('search_index', 'search_documents')))
+
+
+def head_revision(directory=MIGRATIONS_DIR):
+    """Nieuwste revisie: de enige waar geen andere migratie naar verwijst"""
+    versions = os.path.join(directory, 'versions')
+    revisions, parents = set(), set()
+    for name in os.listdir(versions):
+        if not name.endswith('.py'):
+            continue
+        with open(os.path.join(versions, name), encoding='utf-8') as handle:
+            source = handle.read()
+        revision = _REVISION.search(source)
+        if not revision:
+            continue
+        revisions.add(revision.group(1))
+        down_revision = _DOWN_REVISION.search(source)
+        if down_revision:
+            parents.update(re.findall(r"'([^']+)'", down_revision.group(1)))
+
+    heads = revisions - parents
+    if len(heads) != 1:
+        raise RuntimeError(f'Verwacht één head-revisie in {versions}, gevonden: {", ".join(sorted(heads)) or "geen"}')
+    return heads.pop()
+
+
+def current_revision():
+    with db.engine.connect() as connection:
+        if not inspect(connection).has_table('alembic_version'):
+            return None
+        return connection.execute(text('SELECT version_num FROM alembic_version')).scalar()
+
+
+def _unversioned():
+    """True voor een database van vóór de migraties (tabellen, maar geen versie)"""
+    return current_revision() is None and inspect(db.engine).has_table('users')
+
+
+def init_migrate(app):
+    """``flask db ...`` beschikbaar maken (importeert Alembic)"""
+    from flask_migrate import Migrate
+    Migrate(app, db, directory=MIGRATIONS_DIR, render_as_batch=True, include_object=include_object)
+
+
+def init_app(app):
+    mode = app.config.get('SCHEMA_MODE', 'verify')
+    if mode not in ('verify', 'upgrade', 'create', 'none'):
+        raise ValueError(f'Onbekende SCHEMA_MODE: {mode}')
+
+    # Binnen een click-context draait de app als CLI (flask db, flask check-..., ...)
+    if mode == 'upgrade' or click.get_current_context(silent=True) is not None:
+        init_migrate(app)
+
+    if mode == 'none':
+        return
+
+    with app.app_context():
+        if mode == 'create':
+            db.create_all()
+            return
+
+        if _unversioned():
+            app.logger.error('De database heeft tabellen maar geen schemaversie. Is hij met het '
+                             'oorspronkelijke schema aangemaakt, stempel hem dan met "flask db stamp %s" '
+                             'en draai daarna "flask db upgrade".', BASELINE_REVISION)
+        elif mode == 'upgrade':
+            import flask_migrate
+            flask_migrate.upgrade()
+
+        head = head_revision()
+        current = current_revision()
+        if current != head:
+            app.logger.error('Databaseschema is %s, verwacht %s: draai "flask db upgrade"',
+                             current or 'leeg', head)
+            app.before_request(_until_migrated(head))
+
+
+def _until_migrated(head):
+    """Before-request-hook die 503 geeft tot de database op ``head`` staat"""
+    migrated = False
+
+    def check():
+        nonlocal migrated
+        if migrated:
+            return None
+        if current_revision() == head:
+            migrated = True
+            return None
+        return 'De database wordt bijgewerkt, probeer het zo opnieuw.', 503, {'Retry-After': '30'}
+
+    return check
@@ -0,0 +1,257 @@
+"""Full-text zoeken in projecten en updates.
+
+Eén index met een document per project (naam, klant, beschrijving) en per
+update (inhoud):
+
+* SQLite: FTS5-tabel ``search_index``, gerangschikt met ``bm25``
+* Postgres: tabel ``search_documents`` met een gegenereerde ``tsvector``
+  en GIN-index, gerangschikt met ``ts_rank``
+
+De index wordt incrementeel bijgewerkt in dezelfde transactie als de
+wijziging (na elke flush). Code die met Core-statements schrijft, zoals de
+bulk-import en het archief, roept zelf ``index_projects``, ``index_updates``
+en ``unindex`` aan. Resultaten volgen dezelfde toegangsregels als
+``projects.detail``.
+"""
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.orm import Session
+from app.models import db, Project, Update
+
+PG_CONFIG = 'dutch'
+
+# Markeringen rond treffers in snippets (control chars, komen niet in tekst voor)
+HIT_START, HIT_END = '\x02', '\x03'
+
+PROJECT_FIELDS = ('project_name', 'client_name', 'description')
+
+
+class SearchHit:
+    def __init__(self, kind, ref_id, project_id, project_name, snippet, score):
+        self.kind = kind
+        self.ref_id = ref_id
+        self.project_id = project_id
+        self.project_name = project_name
+        self.score = score
+        # Escapen vóór het markeren: de snippet bevat gebruikerstekst
+        self.snippet = Markup(str(escape(snippet or ''))
+                              .replace(HIT_START, '<mark>').replace(HIT_END, '</mark>'))
+
+
+def _is_postgres(bind):
+    return bind.dialect.name == 'postgresql'
+
+
+def _table(bind):
+    return 'search_documents' if _is_postgres(bind) else 'search_index'
+
+
+def _id_column(bind):
+    # FTS5 zoekt alleen op rowid snel; in Postgres is doc_id de primary key
+    return 'doc_id' if _is_postgres(bind) else 'rowid'
+
+
+def doc_id(kind, ref_id):
+    """Vast document-id: projecten even, updates oneven"""
+    return ref_id * 2 + (1 if kind == 'update' else 0)
+
+
+# --- Schema -----------------------------------------------------------------
+
+def create_index_ddl(bind):
+    if _is_postgres(bind):
+        return [
+            f"""CREATE TABLE IF NOT EXISTS search_documents (
+                    doc_id BIGINT PRIMARY KEY,
+                    kind VARCHAR(10) NOT NULL,
+                    ref_id INTEGER NOT NULL,
+                    project_id INTEGER NOT NULL,
+                    body TEXT NOT NULL,
+                    tsv tsvector GENERATED ALWAYS AS (to_tsvector('{PG_CONFIG}', body)) STORED)""",
+            'CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING GIN (tsv)',
+            'CREATE INDEX IF NOT EXISTS ix_search_documents_project ON search_documents (project_id)',
+        ]
+    return [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+               kind UNINDEXED, ref_id UNINDEXED, project_id UNINDEXED, body,
+               tokenize = 'unicode61 remove_diacritics 2')""",
+    ]
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_index(target, connection, **kw):
+    for statement in create_index_ddl(connection):
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_index(target, connection, **kw):
+    connection.exec_driver_sql(f'DROP TABLE IF EXISTS {_table(connection)}')
+
+
+# --- Schrijven --------------------------------------------------------------
+
+def _project_body(project):
+    return '\n'.join(filter(None, (project.project_name, project.client_name, project.description)))
+
+
+def _concat_sql(bind):
+    if _is_postgres(bind):
+        return "concat_ws(E'\\n', project_name, client_name, description)"
+    return "project_name || char(10) || client_name || coalesce(char(10) || description, '')"
+
+
+def _delete(session, doc_ids):
+    if doc_ids:
+        bind = session.get_bind()
+        session.execute(text(f'DELETE FROM {_table(bind)} WHERE {_id_column(bind)} = :doc_id'),
+                        [{'doc_id': value} for value in doc_ids])
+
+
+def _insert(session, documents):
+    if documents:
+        bind = session.get_bind()
+        session.execute(text(f'INSERT INTO {_table(bind)} ({_id_column(bind)}, kind, ref_id, project_id, body) '
+                             'VALUES (:doc_id, :kind, :ref_id, :project_id, :body)'), documents)
+
+
+def _document(kind, ref_id, project_id, body):
+    return {'doc_id': doc_id(kind, ref_id), 'kind': kind, 'ref_id': ref_id,
+            'project_id': project_id, 'body': body or ''}
+
+
+def _select_sources(bind):
+    """INSERT ... SELECT-bronnen per tabel, voor set-based (her)indexeren"""
+    return {
+        'projects': f"SELECT id * 2, 'project', id, id, {_concat_sql(bind)} FROM projects",
+        'updates': "SELECT id * 2 + 1, 'update', id, project_id, content FROM updates",
+    }
+
+
+def index_projects(session, project_ids):
+    """(Her)indexeer projecten set-based, voor writes die de ORM overslaan"""
+    if not project_ids:
+        return
+    bind = session.get_bind()
+    _delete(session, [doc_id('project', project_id) for project_id in project_ids])
+    session.execute(text(
+        f"INSERT INTO {_table(bind)} ({_id_column(bind)}, kind, ref_id, project_id, body) "
+        f"{_select_sources(bind)['projects']} WHERE id IN :ids"
+    ).bindparams(bindparam('ids', expanding=True)), {'ids': list(project_ids)})
+
+
+def index_updates(session, update_ids):
+    """Indexeer updates set-based (zie ``index_projects``)"""
+    if not update_ids:
+        return
+    bind = session.get_bind()
+    _delete(session, [doc_id('update', update_id) for update_id in update_ids])
+    session.execute(text(
+        f"INSERT INTO {_table(bind)} ({_id_column(bind)}, kind, ref_id, project_id, body) "
+        f"{_select_sources(bind)['updates']} WHERE id IN :ids"
+    ).bindparams(bindparam('ids', expanding=True)), {'ids': list(update_ids)})
+
+
+def unindex(session, project_ids=(), update_ids=()):
+    """Haal projecten en updates uit de index, voor deletes die de ORM overslaan"""
+    _delete(session, [doc_id('project', project_id) for project_id in project_ids] +
+            [doc_id('update', update_id) for update_id in update_ids])
+
+
+@event.listens_for(Session, 'after_flush')
+def _index_changes(session, flush_context):
+    new_projects, new_updates = [], []
+    for obj in session.new:
+        if isinstance(obj, Project):
+            new_projects.append(obj)
+        elif isinstance(obj, Update):
+            new_updates.append(obj)
+
+    # Alleen objecten waarvan een geïndexeerd veld echt veranderd is
+    changed_projects = [obj for obj in session.dirty if isinstance(obj, Project) and any(
+        inspect(obj).attrs[field].history.has_changes() for field in PROJECT_FIELDS)]
+    changed_updates = [obj for obj in session.dirty if isinstance(obj, Update) and
+                       inspect(obj).attrs.content.history.has_changes()]
+
+    removed = [doc_id('project', obj.id) for obj in changed_projects]
+    removed += [doc_id('update', obj.id) for obj in changed_updates]
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            removed.append(doc_id('project', obj.id))
+        elif isinstance(obj, Update):
+            removed.append(doc_id('update', obj.id))
+
+    _delete(session, removed)
+    _insert(session, [
+        _document('project', obj.id, obj.id, _project_body(obj)) for obj in new_projects + changed_projects
+    ] + [
+        _document('update', obj.id, obj.project_id, obj.content) for obj in new_updates + changed_updates
+    ])
+
+
+def rebuild(session, batch_size=10000, progress=None):
+    """Gooi de index leeg en bouw hem in batches opnieuw op uit de tabellen"""
+    bind = session.get_bind()
+    table = _table(bind)
+    session.execute(text(f'DELETE FROM {table}'))
+    session.commit()
+
+    for name, select_sql in _select_sources(bind).items():
+        max_id = session.execute(text(f'SELECT max(id) FROM {name}')).scalar() or 0
+        for start in range(1, max_id + 1, batch_size):
+            session.execute(text(f'INSERT INTO {table} ({_id_column(bind)}, kind, ref_id, project_id, body) '
+                                 f'{select_sql} WHERE id BETWEEN :start AND :end'),
+                            {'start': start, 'end': start + batch_size - 1})
+            session.commit()
+            if progress:
+                progress(name, min(start + batch_size - 1, max_id), max_id)
+
+
+# --- Zoeken -----------------------------------------------------------------
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())[:10]
+
+
+def search(user, query, limit=50):
+    """Zoek binnen de projecten waar ``user`` toegang toe heeft, beste eerst"""
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    bind = db.session.get_bind()
+    if user.is_freelancer():
+        access = 'p.freelancer_id = :user_id AND p.deleted_at IS NULL'
+    elif user.is_client():
+        access = 'p.client_id = :user_id AND p.deleted_at IS NULL'
+    else:
+        return []
+
+    if _is_postgres(bind):
+        statement = f"""
+            SELECT s.kind, s.ref_id, s.project_id, p.project_name,
+                   ts_headline('{PG_CONFIG}', s.body, q,
+                               'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', MaxWords=25') AS snippet,
+                   ts_rank(s.tsv, q) AS score
+            FROM search_documents s
+            JOIN projects p ON p.id = s.project_id,
+                 to_tsquery('{PG_CONFIG}', :match) q
+            WHERE s.tsv @@ q AND {access}
+            ORDER BY score DESC
+            LIMIT :limit"""
+        match = ' & '.join(f'{term}:*' for term in terms)
+    else:
+        statement = f"""
+            SELECT s.kind, s.ref_id, s.project_id, p.project_name,
+                   snippet(search_index, 3, char(2), char(3), '…', 16) AS snippet,
+                   bm25(search_index) AS score
+            FROM search_index s
+            JOIN projects p ON p.id = s.project_id
+            WHERE search_index MATCH :match AND {access}
+            ORDER BY score
+            LIMIT :limit"""
+        match = ' '.join(f'"{term}"*' for term in terms)
+
+    rows = db.session.execute(text(statement), {'match': match, 'user_id': user.id, 'limit': limit})
+    return [SearchHit(*row) for row in rows]
@@ -0,0 +1,154 @@
+"""Synthetische data op productieschaal voor belastingstests.
+
+Maakt freelancers, clients, projecten (met client en relatie), openstaande
+uitnodigingen en updates aan met gebatchte executemany-inserts, zonder
+ORM-objecten. De activiteitskolommen van projecten worden direct goed
+ingevuld (de updates worden hier gegenereerd, dus de laatste is bekend);
+de zoekindex wordt daarna in één keer opgebouwd.
+
+Alle gebruikers hebben wachtwoord ``SEED_PASSWORD`` en e-mailadressen als
+``seed-freelancer-0@example.com``; ``app.loadtest`` logt daarmee in.
+"""
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from app.models import db, User, Project, Update, ClientInvite, ClientFreelancerRelation
+from app.hashing import password_hasher
+
+SEED_PASSWORD = 'klantsync-seed'
+
+BATCH_SIZE = 10000
+
+WORDS = ('ontwerp', 'feedback', 'oplevering', 'factuur', 'planning', 'homepage', 'logo', 'offerte',
+         'revisie', 'akkoord', 'testen', 'livegang', 'content', 'fotografie', 'campagne', 'budget',
+         'deadline', 'wireframe', 'bespreking', 'hosting', 'koppeling', 'formulier', 'teksten')
+
+
+def freelancer_email(prefix, index):
+    return f'{prefix}-freelancer-{index}@example.com'
+
+
+def client_email(prefix, index):
+    return f'{prefix}-client-{index}@example.com'
+
+
+class SeedCounts:
+    def __init__(self):
+        self.users = 0
+        self.projects = 0
+        self.relations = 0
+        self.invites = 0
+        self.updates = 0
+
+
+def generate(freelancers, clients, projects_per_freelancer, updates_per_project, invites_per_freelancer=2,
+             prefix='seed', seed=0, progress=None):
+    """Vul de database; geeft een ``SeedCounts``. ``progress(stap, gedaan, totaal)`` is optioneel."""
+    rng = random.Random(seed)
+    counts = SeedCounts()
+    pwhash = password_hasher.hash(SEED_PASSWORD)
+    start_at = datetime.utcnow() - timedelta(days=365)
+
+    def report(step, done, total):
+        if progress:
+            progress(step, done, total)
+
+    # Gebruikers
+    users = [{'username': f'{prefix}-freelancer-{index}', 'email': freelancer_email(prefix, index),
+              'password_hash': pwhash, 'role': 'freelancer', 'created_at': start_at} for index in range(freelancers)]
+    users += [{'username': f'{prefix}-client-{index}', 'email': client_email(prefix, index),
+               'password_hash': pwhash, 'role': 'client', 'created_at': start_at} for index in range(clients)]
+    _insert_batched(User, users, lambda done: report('gebruikers', done, len(users)))
+    counts.users = len(users)
+
+    freelancer_ids = _ids_by_email(User.email.like(f'{prefix}-freelancer-%'))
+    client_ids = _ids_by_email(User.email.like(f'{prefix}-client-%'))
+
+    # Projecten, met per (client, freelancer) één relatie
+    last_project_id = db.session.execute(select(func.max(Project.id))).scalar() or 0
+    projects, relations, plans = [], set(), []
+    for freelancer_id in freelancer_ids:
+        for _ in range(projects_per_freelancer):
+            client_id = rng.choice(client_ids) if client_ids else None
+            created_at = start_at + timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+            update_count = rng.randint(0, 2 * updates_per_project)
+            plans.append((freelancer_id, client_id, created_at, update_count))
+            if client_id:
+                relations.add((client_id, freelancer_id))
+
+    for freelancer_id, client_id, created_at, update_count in plans:
+        last_at = created_at + timedelta(hours=update_count)
+        last_author = (client_id if client_id and (update_count - 1) % 2 else freelancer_id) if update_count else None
+        projects.append({
+            'project_name': f'{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}',
+            'client_name': f'Klant {client_id or freelancer_id}',
+            'description': ' '.join(rng.choices(WORDS, k=12)),
+            'status': rng.choice(('actief', 'actief', 'actief', 'afgerond', 'gepauzeerd')),
+            'created_at': created_at, 'updated_at': last_at,
+            'freelancer_id': freelancer_id, 'client_id': client_id,
+            'update_count': update_count, 'last_activity_at': last_at if update_count else created_at,
+            'last_update_author_id': last_author,
+        })
+    _insert_batched(Project, projects, lambda done: report('projecten', done, len(projects)))
+    counts.projects = len(projects)
+    # Nieuwe ids in invoegvolgorde, dus in de volgorde van ``plans``
+    project_ids = db.session.execute(
+        select(Project.id).where(Project.id > last_project_id).order_by(Project.id)
+    ).scalars().all()
+
+    relation_rows = [{'client_id': client_id, 'freelancer_id': freelancer_id, 'created_at': start_at}
+                     for client_id, freelancer_id in sorted(relations)]
+    _insert_batched(ClientFreelancerRelation, relation_rows)
+    counts.relations = len(relation_rows)
+
+    # Uitnodigingen voor nog niet geregistreerde clients
+    project_ids_by_freelancer = {}
+    for project_id, (freelancer_id, *_) in zip(project_ids, plans):
+        project_ids_by_freelancer.setdefault(freelancer_id, []).append(project_id)
+    invites = [{
+        'email': f'{prefix}-invite-{freelancer_id}-{index}@example.com', 'token': ClientInvite.generate_token(),
+        'freelancer_id': freelancer_id, 'project_id': rng.choice(project_ids_by_freelancer.get(freelancer_id) or [None]),
+        'status': 'pending', 'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow(),
+        'expires_at': datetime.utcnow() + timedelta(days=7),
+    } for freelancer_id in freelancer_ids for index in range(invites_per_freelancer)]
+    _insert_batched(ClientInvite, invites)
+    counts.invites = len(invites)
+
+    # Updates, in dezelfde volgorde als de activiteitskolommen hierboven
+    total_updates = sum(plan[3] for plan in plans)
+    batch = []
+    for project_id, (freelancer_id, client_id, created_at, update_count) in zip(project_ids, plans):
+        for index in range(update_count):
+            batch.append({
+                'content': ' '.join(rng.choices(WORDS, k=rng.randint(5, 30))),
+                'created_at': created_at + timedelta(hours=index + 1),
+                'project_id': project_id,
+                'author_id': client_id if client_id and index % 2 else freelancer_id,
+            })
+            if len(batch) == BATCH_SIZE:
+                _insert(Update, batch)
+                counts.updates += len(batch)
+                report('updates', counts.updates, total_updates)
+                batch = []
+    if batch:
+        _insert(Update, batch)
+        counts.updates += len(batch)
+        report('updates', counts.updates, total_updates)
+
+    return counts
+
+
+def _insert(model, rows):
+    db.session.execute(insert(model), rows)
+    db.session.commit()
+
+
+def _insert_batched(model, rows, progress=None):
+    for start in range(0, len(rows), BATCH_SIZE):
+        _insert(model, rows[start:start + BATCH_SIZE])
+        if progress:
+            progress(min(start + BATCH_SIZE, len(rows)))
+
+
+def _ids_by_email(condition):
+    return db.session.execute(select(User.id).where(condition).order_by(User.id)).scalars().all()
@@ -0,0 +1,109 @@
+"""Opstarttijd van een worker meten.
+
+Elke meting is een vers Python-proces dat doet wat gunicorn doet: ``run``
+importeren (``create_app`` in productieconfiguratie) en daarna één request
+afhandelen. Gemeten worden de boot-tijd (import + ``create_app``) en de tijd
+tot en met het eerste antwoord. Eén extra run draait met ``-X importtime``
+voor de verdeling over modules (boot plus eerste request).
+
+De database is een SQLite-bestand op de nieuwste migratie, zodat
+``SCHEMA_MODE=verify`` de echte opstartcontrole doet.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules die een worker met LAZY_LOADING niet bij het opstarten hoort te laden
+LAZY_MODULES = ('alembic', 'flask_migrate', 'email_validator', 'app.projects.routes', 'app.auth.forms')
+
+_CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import run
+booted = time.perf_counter()
+loaded = sorted(name for name in {modules!r} if name in sys.modules)
+response = run.app.test_client().get({path!r})
+done = time.perf_counter()
+print(json.dumps({{"boot": booted - start, "first_request": done - start,
+                  "status": response.status_code, "loaded": loaded}}))
+'''
+
+
+class StartupResult:
+    """Mediane opstarttijden van één modus (lazy of eager)"""
+
+    def __init__(self, mode, boot, first_request, status, loaded, imports):
+        self.mode = mode
+        self.boot = boot
+        self.first_request = first_request
+        self.status = status
+        self.loaded = loaded
+        self.imports = imports
+
+    @property
+    def ok(self):
+        return self.status < 500 and not (self.mode == 'lazy' and self.loaded)
+
+
+def prepare_database(path):
+    """SQLite-bestand op de nieuwste migratie zetten"""
+    from app import create_app
+    from app.models import db
+
+    if os.path.exists(path):
+        os.remove(path)
+    app = create_app('testing', SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}', SCHEMA_MODE='upgrade',
+                     SQLALCHEMY_ENGINE_OPTIONS={})
+    with app.app_context():
+        db.engine.dispose()
+    return f'sqlite:///{path}'
+
+
+def measure(database_url, mode, runs=5, path='/'):
+    """Start ``runs`` verse processen en geef een ``StartupResult`` met medianen"""
+    env = dict(os.environ, FLASK_ENV='production', DATABASE_URL=database_url, SCHEMA_MODE='verify',
+               LAZY_LOADING='1' if mode == 'lazy' else '0')
+    env.pop('DATABASE_REPLICA_URLS', None)
+    code = _CHILD.format(modules=LAZY_MODULES, path=path)
+
+    samples = [_run_child([sys.executable, '-c', code], env) for _ in range(runs)]
+    profiled = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env, cwd=ROOT,
+                              capture_output=True, text=True, check=True)
+
+    return StartupResult(
+        mode,
+        boot=statistics.median(sample['boot'] for sample in samples),
+        first_request=statistics.median(sample['first_request'] for sample in samples),
+        status=max(sample['status'] for sample in samples),
+        loaded=samples[-1]['loaded'],
+        imports=parse_importtime(profiled.stderr),
+    )
+
+
+def _run_child(command, env):
+    completed = subprocess.run(command, env=env, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def parse_importtime(output):
+    """``-X importtime``-uitvoer als ``{module: (self, cumulatief)}`` in seconden"""
+    imports = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports[name.strip()] = (int(self_us) / 1e6, int(cumulative_us) / 1e6)
+    return imports
+
+
+def by_package(imports):
+    """Eigen importtijd opgeteld per top-level package, aflopend"""
+    totals = defaultdict(float)
+    for name, (own, _) in imports.items():
+        totals[name.split('.')[0]] += own
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
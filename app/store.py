@@ -0,0 +1,104 @@
+"""Gedeelde key-value store voor caches en tellers over workers heen.
+
+``create_store`` geeft een client met een Redis-achtige API (``get``,
+``set(ex=)``, ``delete``, ``incr``, ``expire``). Met ``redis://`` wordt de
+echte redis-client gebruikt (optioneel, niet in requirements.txt); met
+``memory://`` een lokale stand-in die binnen één proces hetzelfde gedrag
+heeft, handig voor ontwikkeling en lokaal testen.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+
+class MemoryStore:
+    """In-process stand-in voor een gedeelde store, met dezelfde API als redis-py
+
+    Met ``max_entries`` gedraagt hij zich als LRU: bij een volle store
+    verdwijnt de langst niet gebruikte key.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key, now):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= now:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            if self._alive(key, time.monotonic()):
+                self._data.move_to_end(key)
+                return self._data[key]
+            return None
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if ex is None:
+                self._expires.pop(key, None)
+            else:
+                self._expires[key] = time.monotonic() + ex
+            self._evict()
+        return True
+
+    def _evict(self):
+        while self.max_entries is not None and len(self._data) > self.max_entries:
+            key, _ = self._data.popitem(last=False)
+            self._expires.pop(key, None)
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                self._expires.pop(key, None)
+                if self._data.pop(key, None) is not None:
+                    removed += 1
+            return removed
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = int(self._data[key]) if self._alive(key, time.monotonic()) else 0
+            self._data[key] = value + amount
+            self._data.move_to_end(key)
+            self._evict()
+            return value + amount
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if not self._alive(key, time.monotonic()):
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+
+def create_store(url):
+    """Maak een store-client op basis van een URL (``memory://`` of ``redis://...``)"""
+    if not url or url.startswith('memory://'):
+        return MemoryStore()
+
+    if url.startswith(('redis://', 'rediss://')):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError('SHARED_STORE_URL wijst naar Redis, maar het redis-pakket is niet geïnstalleerd') from exc
+        return redis.Redis.from_url(url)
+
+    raise ValueError(f'Onbekende SHARED_STORE_URL: {url}')
+
+
+def init_app(app):
+    app.extensions['shared_store'] = create_store(app.config.get('SHARED_STORE_URL'))
+
+
+def shared_store():
+    """De gedeelde store van de huidige app"""
+    return current_app.extensions['shared_store']
@@ -0,0 +1,191 @@
+"""Toegangscontrole voor de dure auth-endpoints.
+
+Inloggen en registreren kosten per poging een PBKDF2-hash en een paar
+queries. ``@throttled`` zet daar token buckets voor: per IP, per account
+(het ingevulde emailadres of de uitnodiging) en globaal. Een poging die
+een lege bucket treft krijgt direct 429 met ``Retry-After``, nog vóór de
+view: zonder query en zonder hash.
+
+Backends (``THROTTLE_BACKEND``):
+
+* ``local``: buckets in dit proces, per key alleen ``[tokens, tijdstip]``
+  in een LRU van hoogstens ``THROTTLE_MAX_KEYS`` keys; de globale bucket
+  geldt dan per worker
+* ``shared``: tellers in de gedeelde store (``app.store``), zodat alle
+  workers samen tellen. De store heeft alleen ``incr`` als atomaire
+  operatie, dus de bucket wordt daar benaderd met een teller per venster
+  van de bucketperiode
+* ``none``: uit
+
+Limieten zijn ``"aantal/seconden"``: een bucket van ``aantal`` pogingen
+die in ``seconden`` helemaal bijvult. Geweigerde en toegelaten pogingen
+staan in ``/metrics`` (``throttle_rejected_total``, ``throttle_allowed_total``).
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request
+from app.metrics import metrics
+from app.store import shared_store
+
+SCOPES = ('ip', 'account', 'global')
+
+
+class Throttled(Exception):
+    """Een bucket is leeg; ``retry_after`` seconden tot er weer een token is"""
+
+    def __init__(self, scope, retry_after):
+        super().__init__(scope)
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+def parse_rate(value):
+    """``"20/60"`` → ``(20, 60.0)``"""
+    capacity, seconds = str(value).split('/', 1)
+    return int(capacity), float(seconds)
+
+
+class LocalBuckets:
+    """Token buckets binnen één proces, LRU-begrensd"""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, period):
+        """Neem één token; geeft 0, of het aantal seconden tot er weer een is"""
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(capacity), now]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / rate
+
+    def give_back(self, key, capacity, period):
+        """Geef een genomen token terug"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(capacity, bucket[0] + 1)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SharedBuckets:
+    """Tellers per venster in de gedeelde store (``incr`` + ``expire``)"""
+
+    prefix = 'throttle:'
+
+    def take(self, key, capacity, period):
+        now = time.time()
+        window = int(now // period)
+        store_key = f'{self.prefix}{key}:{window}'
+        store = shared_store()
+        count = store.incr(store_key)
+        if count == 1:
+            store.expire(store_key, math.ceil(period))
+        if count <= capacity:
+            return 0
+        return (window + 1) * period - now
+
+    def give_back(self, key, capacity, period):
+        # Alleen binnen hetzelfde venster; een nieuw venster begint toch weer vol
+        store_key = f'{self.prefix}{key}:{int(time.time() // period)}'
+        store = shared_store()
+        if store.get(store_key) is not None:
+            store.incr(store_key, -1)
+
+
+def client_ip(proxy_hops=0):
+    """IP van de client; achter ``proxy_hops`` vertrouwde proxies uit X-Forwarded-For"""
+    if proxy_hops:
+        forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+        if len(forwarded) >= proxy_hops:
+            return forwarded[-proxy_hops]
+    return request.remote_addr or ''
+
+
+class Throttle:
+    def __init__(self):
+        self.backend = None
+        self.limits = {}
+        self.proxy_hops = 0
+
+    def init_app(self, app):
+        name = app.config.get('THROTTLE_BACKEND', 'local')
+
+        if name == 'local':
+            self.backend = LocalBuckets(app.config.get('THROTTLE_MAX_KEYS', 100000))
+        elif name == 'shared':
+            self.backend = SharedBuckets()
+        elif name in (None, 'none'):
+            self.backend = None
+        else:
+            raise ValueError(f'Onbekende THROTTLE_BACKEND: {name}')
+
+        self.limits = {scope: parse_rate(app.config[f'THROTTLE_{scope.upper()}']) for scope in SCOPES}
+        self.proxy_hops = app.config.get('THROTTLE_PROXY_HOPS', 0)
+
+        metrics.describe('throttle_allowed_total', 'Toegelaten pogingen per groep')
+        metrics.describe('throttle_rejected_total', 'Met 429 geweigerde pogingen per groep en bucket')
+        metrics.gauge('throttle_buckets', self._bucket_count, help='Token buckets in dit proces')
+
+    def _bucket_count(self):
+        return len(self.backend) if isinstance(self.backend, LocalBuckets) else None
+
+    def check(self, group, account=None):
+        """Neem een token uit de IP-, account- en globale bucket van ``group``; Throttled bij een lege
+
+        Een geweigerde poging kost niets: tokens uit eerdere buckets gaan terug.
+        """
+        if self.backend is None:
+            return
+        taken = []
+        for scope, value in (('ip', client_ip(self.proxy_hops)), ('account', account), ('global', '*')):
+            if not value:
+                continue
+            capacity, period = self.limits[scope]
+            key = f'{group}:{scope}:{value}'
+            wait = self.backend.take(key, capacity, period)
+            if wait:
+                for previous in taken:
+                    self.backend.give_back(*previous)
+                metrics.inc('throttle_rejected_total', group=group, scope=scope)
+                raise Throttled(scope, wait)
+            taken.append((key, capacity, period))
+        metrics.inc('throttle_allowed_total', group=group)
+
+
+throttle = Throttle()
+
+
+def throttled(group, account=None):
+    """Beperk POSTs op een view; ``account(**view_args)`` geeft de account-key, zonder DB"""
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method == 'POST':
+                throttle.check(group, account(**kwargs) if account else None)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def form_email(**view_args):
+    """Account-key voor formulieren met een emailveld"""
+    return (request.form.get('email') or '').strip().lower()
@@ -0,0 +1,209 @@
+"""Cache voor de ``user_loader`` van Flask-Login.
+
+Zonder cache kost elk ingelogd request een ``SELECT`` op ``users``. De cache
+bewaart per gebruiker een snapshot van id, gebruikersnaam, email en rol
+(nooit de wachtwoordhash) en bouwt daar een gewone ``User`` van die aan de
+sessie hangt, zodat relaties als ``current_user.owned_projects`` blijven
+werken. Andere kolommen laadt SQLAlchemy pas als iemand ze leest.
+
+Lagen:
+
+* per request: ``g`` onthoudt al geladen gebruikers (identity map)
+* over requests heen: ``local`` (LRU met TTL in dit proces, standaard) of
+  ``shared`` (de gedeelde store uit ``app.store``, zodat alle workers
+  dezelfde entries en invalidaties zien)
+
+Wijzigt een gebruiker (rol, email, wachtwoord, ...), dan wordt de entry na
+de commit verwijderd. Bij ``local`` gebeurt dat alleen in het proces dat
+de wijziging deed; andere workers zien hem pas als hun entry verloopt.
+Daarom verloopt ``local`` na ``USER_CACHE_LOCAL_TTL`` seconden (standaard
+30). Moet een wijziging direct overal gelden, gebruik dan ``shared``.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import g
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from app.models import db, User
+from app.store import shared_store
+
+# Wat de cache van een gebruiker bewaart; genoeg voor login, templates en rolchecks
+SNAPSHOT_COLUMNS = ('id', 'username', 'email', 'role')
+
+
+class LocalBackend:
+    """LRU met TTL binnen één proces"""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return dict(data)
+
+    def set(self, user_id, data):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, dict(data))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SharedBackend:
+    """Entries als JSON in de gedeelde store, met TTL"""
+
+    prefix = 'user:'
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    def get(self, user_id):
+        raw = shared_store().get(f'{self.prefix}{user_id}')
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        # Entries van vóór SNAPSHOT_COLUMNS hadden alle kolommen
+        return {key: data[key] for key in SNAPSHOT_COLUMNS if key in data}
+
+    def set(self, user_id, data):
+        shared_store().set(f'{self.prefix}{user_id}', json.dumps(data), ex=self.ttl)
+
+    def delete(self, user_id):
+        shared_store().delete(f'{self.prefix}{user_id}')
+
+
+class UserCache:
+    """Laadt gebruikers voor Flask-Login met zo min mogelijk DB round-trips"""
+
+    def __init__(self):
+        self.backend = None
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        name = app.config.get('USER_CACHE_BACKEND', 'local')
+        ttl = app.config.get('USER_CACHE_TTL', 300)
+
+        if name == 'local':
+            # Invalidaties blijven in dit proces, dus korter dan de gedeelde TTL
+            self.backend = LocalBackend(app.config.get('USER_CACHE_SIZE', 1024),
+                                        min(ttl, app.config.get('USER_CACHE_LOCAL_TTL', 30)))
+        elif name == 'shared':
+            self.backend = SharedBackend(ttl)
+        elif name in (None, 'none'):
+            self.backend = None
+        else:
+            raise ValueError(f'Onbekende USER_CACHE_BACKEND: {name}')
+
+    def load(self, user_id):
+        """Gebruiker voor ``user_id``, of ``None`` als hij niet bestaat"""
+        loaded = g.setdefault('_loaded_users', {})
+        if user_id not in loaded:
+            loaded[user_id] = self._load(user_id)
+        return loaded[user_id]
+
+    def _load(self, user_id):
+        if self.backend is None:
+            return db.session.get(User, user_id)
+
+        data = self.backend.get(user_id)
+        if data is not None:
+            self._count('hits')
+            return self._attach(data)
+
+        self._count('misses')
+        user = db.session.get(User, user_id)
+        if user is not None:
+            self.backend.set(user_id, _snapshot(user))
+        return user
+
+    def _attach(self, data):
+        # Bouw een 'geladen' User zonder query en hang hem aan de sessie
+        user = User(**data)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def cached(self, user_id):
+        """Gebruiker uit de cache, zonder sessie en zonder query; None bij een miss (ASGI-modus)"""
+        if self.backend is None:
+            return None
+        data = self.backend.get(user_id)
+        if data is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        user = User(**data)
+        make_transient_to_detached(user)
+        return user
+
+    def remember(self, user):
+        if self.backend is not None:
+            self.backend.set(user.id, _snapshot(user))
+
+    def invalidate(self, user_id):
+        if self.backend is not None:
+            self.backend.delete(user_id)
+            self._count('invalidations')
+
+    def _count(self, name):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        """Tellers om te meten hoeveel DB round-trips de cache bespaart"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _snapshot(user):
+    return {key: getattr(user, key) for key in SNAPSHOT_COLUMNS}
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _remember_changed_user(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    # Pas na de commit: anders kan een ander request de oude rij opnieuw cachen
+    for user_id in session.info.pop('changed_user_ids', ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('changed_user_ids', None)
@@ -0,0 +1,10 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+
+from app.asgi import create_asgi_app
+
+# ASGI-modus: uvicorn asgi:app (zie app/asgi.py)
+config_name = os.environ.get('FLASK_ENV', 'development')
+app = create_asgi_app(config_name)
@@ -1,8 +1,40 @@
 import os
-from dotenv import load_dotenv
 
+# .env wordt geladen door run.py (gunicorn) en door de flask-CLI zelf
 basedir = os.path.abspath(os.path.dirname(__file__))
-load_dotenv(os.path.join(basedir, '.env'))
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS voor een database-URI
+    
+    Postgres: elke gunicorn-thread kan één verbinding vasthouden, dus de vaste
+    pool is ``GUNICORN_THREADS`` groot. Wat er van ``DB_MAX_CONNECTIONS`` per
+    worker (``WEB_CONCURRENCY``) overblijft, mag als overflow gebruikt worden.
+    Eén verbinding per worker blijft vrij voor de LISTEN-thread van app.events.
+    """
+    if not uri:
+        return {}
+    if uri.startswith('sqlite'):
+        # sqlite3 wacht tot ``timeout`` seconden op een lock (busy_timeout)
+        return {'connect_args': {'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5))}}
+    
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    threads = int(os.environ.get('GUNICORN_THREADS', 8))
+    budget = max(1, int(os.environ.get('DB_MAX_CONNECTIONS', 20)) // workers - 1)
+    pool_size = min(threads, budget)
+    
+    options = {
+        'pool_size': pool_size,
+        'max_overflow': budget - pool_size,
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+    if uri.startswith('postgresql'):
+        statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-change-in-production'
@@ -10,12 +42,146 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     PERMANENT_SESSION_LIFETIME = 3600
+    
+    # Paginagrootte voor dashboards, update-tijdlijnen en de inbox
+    PROJECTS_PER_PAGE = int(os.environ.get('PROJECTS_PER_PAGE', 24))
+    UPDATES_PER_PAGE = int(os.environ.get('UPDATES_PER_PAGE', 20))
+    INBOX_PER_PAGE = int(os.environ.get('INBOX_PER_PAGE', 20))
+    
+    # Maximaal aantal regels per bulk-import van clients
+    IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', 10000))
+    
+    # JSON API (app.api): updates per batch-POST, projecten en updates per project per batch-GET
+    API_BATCH_MAX_UPDATES = int(os.environ.get('API_BATCH_MAX_UPDATES', 500))
+    API_BATCH_MAX_PROJECTS = int(os.environ.get('API_BATCH_MAX_PROJECTS', 100))
+    API_MAX_LATEST_UPDATES = int(os.environ.get('API_MAX_LATEST_UPDATES', 50))
+    
+    # Gedeelde store voor caches over workers heen (memory:// of redis://...)
+    SHARED_STORE_URL = os.environ.get('SHARED_STORE_URL', 'memory://')
+    
+    # Cache voor de user_loader: 'local' (per proces), 'shared' (via de store) of 'none'
+    USER_CACHE_BACKEND = os.environ.get('USER_CACHE_BACKEND', 'local')
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+    # Bij 'local' ziet een andere worker een wijziging (rol, wachtwoord) pas na deze seconden
+    USER_CACHE_LOCAL_TTL = int(os.environ.get('USER_CACHE_LOCAL_TTL', 30))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    
+    # Wachtwoord-hashing: iteraties (leeg = Werkzeug-standaard) en process pool (0 = in de request-thread)
+    PASSWORD_HASH_ITERATIONS = os.environ.get('PASSWORD_HASH_ITERATIONS')
+    PASSWORD_HASH_POOL_SIZE = int(os.environ.get('PASSWORD_HASH_POOL_SIZE', 0))
+    PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 32))
+    PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    
+    # Login/registratie begrenzen (app.throttle): "aantal/seconden" per IP, per account en globaal.
+    # local = per worker, shared = via SHARED_STORE_URL, none = uit
+    THROTTLE_BACKEND = os.environ.get('THROTTLE_BACKEND', 'local')
+    THROTTLE_IP = os.environ.get('THROTTLE_IP', '20/60')
+    THROTTLE_ACCOUNT = os.environ.get('THROTTLE_ACCOUNT', '5/300')
+    THROTTLE_GLOBAL = os.environ.get('THROTTLE_GLOBAL', '50/1')
+    THROTTLE_MAX_KEYS = int(os.environ.get('THROTTLE_MAX_KEYS', 100000))
+    # Aantal vertrouwde proxies (nginx, load balancer) vóór de app; 0 = REMOTE_ADDR gebruiken
+    THROTTLE_PROXY_HOPS = int(os.environ.get('THROTTLE_PROXY_HOPS', 0))
+    
+    # Live updates (SSE): 'local' (per proces) of 'postgres' (LISTEN/NOTIFY); leeg = automatisch
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND')
+    # Seconden tussen keepalives, en maximale duur van één stream (de browser verbindt daarna opnieuw)
+    SSE_HEARTBEAT = int(os.environ.get('SSE_HEARTBEAT', 15))
+    SSE_MAX_DURATION = int(os.environ.get('SSE_MAX_DURATION', 300))
+    # Hoe de detailpagina nieuwe updates ophaalt: 'sse' (open stream) of 'poll' (om de LIVE_POLL_INTERVAL
+    # seconden een korte request). Onder gunicorn houdt elke stream een thread vast; leeg = automatisch:
+    # 'sse' in de ASGI-modus (uvicorn), anders 'poll'
+    LIVE_UPDATES = os.environ.get('LIVE_UPDATES')
+    LIVE_POLL_INTERVAL = int(os.environ.get('LIVE_POLL_INTERVAL', 15))
+    
+    # Release-id in ETags en fragment-cachekeys, zodat een deploy met nieuwe templates alles ververst
+    RELEASE_VERSION = os.environ.get('RELEASE_VERSION') or os.environ.get('SOURCE_VERSION', '')
+    
+    # Cache voor gerenderde projectkaarten: 'local' (per proces), 'shared' (via de store) of 'none'
+    FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND', 'local')
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 3600))
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 4096))
+    
+    # Bearer-token voor /metrics; leeg = endpoint uit
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Queries, SQL-tijd en rendertijd per endpoint in /metrics; statements boven SLOW_QUERY_MS worden gelogd (0 = uit)
+    REQUEST_METRICS = os.environ.get('REQUEST_METRICS', '1') == '1'
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 250))
+    
+    SQLITE_FALLBACK = False
+    
+    # Read-replica's (komma-gescheiden URL's); leesrequests gaan daarheen, writes naar de primary
+    REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    # Zo lang na een write leest dezelfde browser nog van de primary
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    
+    # Schema bij het opstarten: 'verify' (alleen versie controleren), 'upgrade', 'create' of 'none'
+    SCHEMA_MODE = os.environ.get('SCHEMA_MODE', 'verify')
+    
+    # Job-queue (flask jobs work): seconden tussen polls, jobs per batch, pogingen, basis voor de backoff
+    JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 2))
+    JOBS_BATCH_SIZE = int(os.environ.get('JOBS_BATCH_SIZE', 10))
+    JOBS_MAX_ATTEMPTS = int(os.environ.get('JOBS_MAX_ATTEMPTS', 5))
+    JOBS_RETRY_BASE = int(os.environ.get('JOBS_RETRY_BASE', 30))
+    # Een job die zo lang running staat, hoort bij een gestopte worker en wordt opnieuw ingepland
+    JOBS_LOCK_TIMEOUT = int(os.environ.get('JOBS_LOCK_TIMEOUT', 600))
+    # Verlopen uitnodigingen markeren: elke zoveel seconden, in blokken van zoveel rijen
+    INVITE_SWEEP_INTERVAL = int(os.environ.get('INVITE_SWEEP_INTERVAL', 300))
+    INVITE_SWEEP_BATCH = int(os.environ.get('INVITE_SWEEP_BATCH', 1000))
+    
+    # Archief (app.archive): afgeronde projecten die zoveel dagen niet gewijzigd zijn.
+    # ARCHIVE_INTERVAL > 0 laat de worker periodiek archiveren; anders via `flask archive run`.
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 100))
+    ARCHIVE_INTERVAL = int(os.environ.get('ARCHIVE_INTERVAL', 0))
+    
+    # Verwijderde projecten (app.purge): updates per transactie, en hoe vaak de worker
+    # naloopt of er projecten zonder (levende) purge-job zijn blijven staan
+    PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', 1000))
+    PURGE_INTERVAL = int(os.environ.get('PURGE_INTERVAL', 3600))
+    
+    # Bijlagen (app.attachments). BLOB_STORE_URL leeg = <instance>/blobs op lokale schijf,
+    # file:///pad voor een andere map, s3://bucket/prefix voor S3 (vraagt boto3).
+    BLOB_STORE_URL = os.environ.get('BLOB_STORE_URL')
+    ATTACHMENT_MAX_SIZE = int(os.environ.get('ATTACHMENT_MAX_SIZE', 100 * 1024 * 1024))  # per update, in bytes
+    ATTACHMENT_MAX_FILES = int(os.environ.get('ATTACHMENT_MAX_FILES', 10))
+    # Downloads door de proxy laten leveren: USE_X_SENDFILE=1 (Apache, lighttpd) of
+    # ATTACHMENT_ACCEL_REDIRECT=/_blobs voor een nginx internal location op de blob-map
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '0') == '1'
+    ATTACHMENT_ACCEL_REDIRECT = os.environ.get('ATTACHMENT_ACCEL_REDIRECT')
+    # Blobs zonder bijlagen opruimen: elke zoveel seconden, als ze zo lang niet gebruikt zijn
+    ATTACHMENT_GC_INTERVAL = int(os.environ.get('ATTACHMENT_GC_INTERVAL', 3600))
+    ATTACHMENT_GC_GRACE = int(os.environ.get('ATTACHMENT_GC_GRACE', 3600))
+    
+    # Uitgaande mail; zonder MAIL_SERVER worden mails alleen gelogd
+    MAIL_SERVER = os.environ.get('MAIL_SERVER')
+    MAIL_BACKEND = os.environ.get('MAIL_BACKEND') or ('smtp' if MAIL_SERVER else 'log')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', '1') == '1'
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_SENDER = os.environ.get('MAIL_SENDER', 'KlantSync <noreply@klantsync.nl>')
+    MAIL_TIMEOUT = int(os.environ.get('MAIL_TIMEOUT', 10))
+    # Basis-URL voor links in mails (de worker heeft geen request)
+    APP_BASE_URL = os.environ.get('APP_BASE_URL', 'http://localhost:5000')
+    
+    # Blueprints pas bij het eerste request importeren (snellere worker-start)
+    LAZY_LOADING = os.environ.get('LAZY_LOADING', '0') == '1'
+    
+    # ASGI-modus (uvicorn asgi:app): threads voor de sync views, pool van de async engine.
+    # ASYNC_DATABASE_URL leeg = DATABASE_URL met aiosqlite/asyncpg als driver.
+    ASGI_SYNC_THREADS = int(os.environ.get('ASGI_SYNC_THREADS', os.environ.get('GUNICORN_THREADS', 8)))
+    ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')
+    ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 10))
+    ASYNC_DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
 
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'klantsync.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SESSION_COOKIE_SECURE = False
+    # Lokaal met één proces: migraties direct bij het opstarten uitvoeren
+    SCHEMA_MODE = os.environ.get('SCHEMA_MODE', 'upgrade')
 
 class ProductionConfig(Config):
     DEBUG = False
@@ -24,12 +190,28 @@ class ProductionConfig(Config):
         DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
     SESSION_COOKIE_SECURE = True
+    PASSWORD_HASH_POOL_SIZE = int(os.environ.get('PASSWORD_HASH_POOL_SIZE', 2))
+    LAZY_LOADING = os.environ.get('LAZY_LOADING', '1') == '1'
     
     if not SQLALCHEMY_DATABASE_URI:
+        # Noodoplossing; create_app logt hier een waarschuwing over
         SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'klantsync.db')
+        SQLITE_FALLBACK = True
+    
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+class TestingConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    PASSWORD_HASH_ITERATIONS = 1000
+    # Losse testdatabase; standaard SQLite in het geheugen
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SCHEMA_MODE = 'create'
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
\ No newline at end of file
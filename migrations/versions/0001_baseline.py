@@ -0,0 +1,94 @@
+"""Basisschema zoals db.create_all() het aanmaakte
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table('projects',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_name', sa.String(length=100), nullable=False),
+        sa.Column('client_name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('freelancer_id', sa.Integer(), nullable=False),
+        sa.Column('client_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['client_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['freelancer_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_projects_client_id', 'projects', ['client_id'])
+    op.create_index('ix_projects_freelancer_id', 'projects', ['freelancer_id'])
+
+    op.create_table('client_freelancer_relations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('client_id', sa.Integer(), nullable=False),
+        sa.Column('freelancer_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['client_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['freelancer_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('client_id', 'freelancer_id', name='unique_client_freelancer')
+    )
+    op.create_index('ix_client_freelancer_relations_client_id', 'client_freelancer_relations', ['client_id'])
+    op.create_index('ix_client_freelancer_relations_freelancer_id', 'client_freelancer_relations', ['freelancer_id'])
+
+    op.create_table('updates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('client_invites',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('token', sa.String(length=100), nullable=False),
+        sa.Column('freelancer_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['freelancer_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_client_invites_email', 'client_invites', ['email'])
+    op.create_index('ix_client_invites_token', 'client_invites', ['token'], unique=True)
+
+
+def downgrade():
+    op.drop_table('client_invites')
+    op.drop_table('updates')
+    op.drop_table('client_freelancer_relations')
+    op.drop_table('projects')
+    op.drop_table('users')
@@ -0,0 +1,41 @@
+"""Samengestelde indexen voor dashboards, tijdlijnen en uitnodigingen
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (freelancer_id, created_at, id) dekt ook zoeken op alleen freelancer_id
+    op.drop_index('ix_projects_freelancer_id', table_name='projects')
+    op.drop_index('ix_projects_client_id', table_name='projects')
+    op.create_index('ix_projects_freelancer_created', 'projects', ['freelancer_id', 'created_at', 'id'])
+    op.create_index('ix_projects_client_created', 'projects', ['client_id', 'created_at', 'id'])
+
+    op.create_index('ix_updates_author_id', 'updates', ['author_id'])
+    op.create_index('ix_updates_project_created', 'updates', ['project_id', 'created_at', 'id'])
+
+    op.create_index('ix_client_invites_project_id', 'client_invites', ['project_id'])
+    op.create_index('ix_client_invites_freelancer_status_created', 'client_invites',
+                    ['freelancer_id', 'status', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_client_invites_freelancer_status_created', table_name='client_invites')
+    op.drop_index('ix_client_invites_project_id', table_name='client_invites')
+    op.drop_index('ix_updates_project_created', table_name='updates')
+    op.drop_index('ix_updates_author_id', table_name='updates')
+    op.drop_index('ix_projects_client_created', table_name='projects')
+    op.drop_index('ix_projects_freelancer_created', table_name='projects')
+    op.create_index('ix_projects_client_id', 'projects', ['client_id'])
+    op.create_index('ix_projects_freelancer_id', 'projects', ['freelancer_id'])
@@ -0,0 +1,51 @@
+"""Gedenormaliseerde activiteit per project (aantal updates, laatste activiteit)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects') as batch_op:
+        batch_op.add_column(sa.Column('update_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_activity_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('last_update_author_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_projects_last_update_author_id', 'users', ['last_update_author_id'], ['id'])
+
+    # Zelfde berekening als app.activity.refresh_statement (flask activity backfill)
+    op.execute("""
+        UPDATE projects SET
+            update_count = (SELECT count(*) FROM updates WHERE updates.project_id = projects.id),
+            last_activity_at = coalesce(
+                (SELECT max(updates.created_at) FROM updates WHERE updates.project_id = projects.id),
+                projects.created_at, CURRENT_TIMESTAMP),
+            last_update_author_id = (
+                SELECT updates.author_id FROM updates WHERE updates.project_id = projects.id
+                ORDER BY updates.created_at DESC, updates.id DESC LIMIT 1)
+    """)
+
+    with op.batch_alter_table('projects') as batch_op:
+        batch_op.alter_column('last_activity_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index('ix_projects_freelancer_activity', ['freelancer_id', 'last_activity_at', 'id'])
+        batch_op.create_index('ix_projects_client_activity', ['client_id', 'last_activity_at', 'id'])
+
+
+def downgrade():
+    with op.batch_alter_table('projects') as batch_op:
+        batch_op.drop_index('ix_projects_client_activity')
+        batch_op.drop_index('ix_projects_freelancer_activity')
+        batch_op.drop_constraint('fk_projects_last_update_author_id', type_='foreignkey')
+        batch_op.drop_column('last_update_author_id')
+        batch_op.drop_column('last_activity_at')
+        batch_op.drop_column('update_count')
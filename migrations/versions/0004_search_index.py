@@ -0,0 +1,54 @@
+"""Full-text zoekindex over projecten en updates
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Zelfde DDL als app.search.create_index_ddl, hier bevroren
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            CREATE TABLE search_documents (
+                doc_id BIGINT PRIMARY KEY,
+                kind VARCHAR(10) NOT NULL,
+                ref_id INTEGER NOT NULL,
+                project_id INTEGER NOT NULL,
+                body TEXT NOT NULL,
+                tsv tsvector GENERATED ALWAYS AS (to_tsvector('dutch', body)) STORED)
+        """)
+        op.execute('CREATE INDEX ix_search_documents_tsv ON search_documents USING GIN (tsv)')
+        op.execute('CREATE INDEX ix_search_documents_project ON search_documents (project_id)')
+        table, id_column = 'search_documents', 'doc_id'
+        project_body = "concat_ws(E'\\n', project_name, client_name, description)"
+    else:
+        op.execute("""
+            CREATE VIRTUAL TABLE search_index USING fts5(
+                kind UNINDEXED, ref_id UNINDEXED, project_id UNINDEXED, body,
+                tokenize = 'unicode61 remove_diacritics 2')
+        """)
+        table, id_column = 'search_index', 'rowid'
+        project_body = "project_name || char(10) || client_name || coalesce(char(10) || description, '')"
+
+    # Bestaande data indexeren; daarna houdt app.search de index bij
+    op.execute(f"INSERT INTO {table} ({id_column}, kind, ref_id, project_id, body) "
+               f"SELECT id * 2, 'project', id, id, {project_body} FROM projects")
+    op.execute(f"INSERT INTO {table} ({id_column}, kind, ref_id, project_id, body) "
+               "SELECT id * 2 + 1, 'update', id, project_id, content FROM updates")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP TABLE search_documents')
+    else:
+        op.execute('DROP TABLE search_index')
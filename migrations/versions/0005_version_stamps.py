@@ -0,0 +1,39 @@
+"""Versiestempels voor ETags en fragment-caching
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects') as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE projects SET updated_at = coalesce(last_activity_at, created_at, CURRENT_TIMESTAMP)')
+    with op.batch_alter_table('projects') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+    with op.batch_alter_table('client_invites') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE client_invites SET updated_at = coalesce(created_at, CURRENT_TIMESTAMP)')
+    with op.batch_alter_table('client_invites') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('client_invites') as batch_op:
+        batch_op.drop_column('updated_at')
+    with op.batch_alter_table('projects') as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('revision')
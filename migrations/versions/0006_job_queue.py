@@ -0,0 +1,53 @@
+"""Job-queue, bezorgstatus van uitnodigingen en index voor de verloopronde
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_jobs_status_run_at', 'jobs', ['status', 'run_at'])
+
+    # Bestaande uitnodigingen zijn nooit gemaild (alleen de link): bezorgstatus blijft leeg
+    with op.batch_alter_table('client_invites') as batch_op:
+        batch_op.add_column(sa.Column('delivery_status', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('delivery_attempts', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('delivery_error', sa.String(length=255), nullable=True))
+    op.create_index('ix_client_invites_status_expires', 'client_invites', ['status', 'expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_client_invites_status_expires', table_name='client_invites')
+    with op.batch_alter_table('client_invites') as batch_op:
+        batch_op.drop_column('delivery_error')
+        batch_op.drop_column('delivery_attempts')
+        batch_op.drop_column('delivery_status')
+    op.drop_index('ix_jobs_status_run_at', table_name='jobs')
+    op.drop_table('jobs')
@@ -0,0 +1,46 @@
+"""Archief voor afgeronde projecten
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'project_archives',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('freelancer_id', sa.Integer(), nullable=False),
+        sa.Column('client_id', sa.Integer(), nullable=True),
+        sa.Column('project_name', sa.String(length=100), nullable=False),
+        sa.Column('client_name', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('update_count', sa.Integer(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['client_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['freelancer_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_project_archives_freelancer_archived', 'project_archives', ['freelancer_id', 'archived_at'])
+    op.create_index('ix_project_archives_client_archived', 'project_archives', ['client_id', 'archived_at'])
+    op.create_index('ix_projects_finished_updated', 'projects', ['updated_at'],
+                    sqlite_where=sa.text("status = 'afgerond'"), postgresql_where=sa.text("status = 'afgerond'"))
+
+
+def downgrade():
+    op.drop_index('ix_projects_finished_updated', table_name='projects')
+    op.drop_index('ix_project_archives_client_archived', table_name='project_archives')
+    op.drop_index('ix_project_archives_freelancer_archived', table_name='project_archives')
+    op.drop_table('project_archives')
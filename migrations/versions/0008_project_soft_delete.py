@@ -0,0 +1,29 @@
+"""Soft-delete voor projecten
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects') as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_projects_deleted', 'projects', ['deleted_at'],
+                    sqlite_where=sa.text('deleted_at IS NOT NULL'), postgresql_where=sa.text('deleted_at IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_projects_deleted', table_name='projects')
+    with op.batch_alter_table('projects') as batch_op:
+        batch_op.drop_column('deleted_at')
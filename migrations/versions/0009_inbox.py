@@ -0,0 +1,46 @@
+"""Activiteiten-inbox per gebruiker
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'inbox_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('actor_id', sa.Integer(), nullable=True),
+        sa.Column('project_id', sa.Integer(), nullable=True),
+        sa.Column('ref_id', sa.Integer(), nullable=True),
+        sa.Column('project_name', sa.String(length=100), nullable=True),
+        sa.Column('summary', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('read_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['actor_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_inbox_items_user_created', 'inbox_items', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_inbox_items_user_unread', 'inbox_items', ['user_id'],
+                    sqlite_where=sa.text('read_at IS NULL'), postgresql_where=sa.text('read_at IS NULL'))
+    op.create_index('ix_inbox_items_project', 'inbox_items', ['project_id'])
+
+
+def downgrade():
+    op.drop_index('ix_inbox_items_project', table_name='inbox_items')
+    op.drop_index('ix_inbox_items_user_unread', table_name='inbox_items')
+    op.drop_index('ix_inbox_items_user_created', table_name='inbox_items')
+    op.drop_table('inbox_items')
@@ -0,0 +1,50 @@
+"""Bijlagen bij updates met blobs per sha256
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 21:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('sha256'),
+    )
+    op.create_table(
+        'attachments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('update_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('content_type', sa.String(length=100), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['sha256'], ['blobs.sha256']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_attachments_update_id', 'attachments', ['update_id'])
+    op.create_index('ix_attachments_project_id', 'attachments', ['project_id'])
+    op.create_index('ix_attachments_sha256', 'attachments', ['sha256'])
+
+
+def downgrade():
+    op.drop_index('ix_attachments_sha256', table_name='attachments')
+    op.drop_index('ix_attachments_project_id', table_name='attachments')
+    op.drop_index('ix_attachments_update_id', table_name='attachments')
+    op.drop_table('attachments')
+    op.drop_table('blobs')
@@ -0,0 +1,26 @@
+"""Bijlagen per update op id-volgorde uit de index
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 23:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (update_id, id) dekt ook zoeken op alleen update_id
+    op.drop_index('ix_attachments_update_id', table_name='attachments')
+    op.create_index('ix_attachments_update', 'attachments', ['update_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_attachments_update', table_name='attachments')
+    op.create_index('ix_attachments_update_id', 'attachments', ['update_id'])